@@ -0,0 +1,31 @@
+"""Gunicorn settings for multi-process serving.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is imported once in the master (preload_app) and forked into
+WEB_CONCURRENCY workers. Each worker drops the inherited pool and sizes its
+own from DB_CONNECTION_BUDGET / WEB_CONCURRENCY; the after-fork reset is
+registered with os.register_at_fork in utils/session_manager, so it needs
+no post_fork hook here.
+
+Workers are threaded because each open /api/events stream occupies a
+thread for its lifetime; EVENTS_MAX_STREAMS keeps them from taking every
+thread of a worker.
+"""
+import os
+from config.config import WEB_CONCURRENCY, WORKER_THREADS
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = WEB_CONCURRENCY
+worker_class = 'gthread'
+threads = WORKER_THREADS
+preload_app = True
+timeout = int(os.getenv('WORKER_TIMEOUT', 60))
+graceful_timeout = 30
+max_requests = int(os.getenv('MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def worker_exit(server, worker):
+    from utils import session_manager
+    session_manager.dispose_engine()
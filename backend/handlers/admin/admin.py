@@ -0,0 +1,53 @@
+import pstats
+from flask import request, jsonify, current_app, Response, send_from_directory
+from config.config import PROFILE_DIR
+from utils import profiling
+from utils.compression import get_compression_stats
+from utils.metrics import render as render_metrics
+from utils.slow_query import top_queries, reset as reset_slow_queries
+
+# Compression ratio and CPU cost per route - GET /admin/compression-stats
+def compression_stats():
+    return jsonify(get_compression_stats()), 200
+
+# Top slow queries - GET /admin/slow-queries?top=20&sort=total_ms
+def slow_queries():
+    try:
+        top = int(request.args.get('top', 20))
+    except ValueError:
+        return jsonify({'error': 'top must be an integer.'}), 400
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in ('total_ms', 'max_ms', 'mean_ms', 'count'):
+        return jsonify({'error': 'sort must be one of total_ms, max_ms, mean_ms, count.'}), 400
+    return jsonify(top_queries(top, sort)), 200
+
+# Clear the slow-query log - DELETE /admin/slow-queries
+def clear_slow_queries():
+    reset_slow_queries()
+    return jsonify({'message': 'Slow-query log cleared.'}), 200
+
+# Import and startup timings - GET /admin/startup
+def startup_timings():
+    return jsonify(current_app.config.get('STARTUP_TIMINGS', {})), 200
+
+# List recent profiles - GET /admin/profiles
+def list_profiles():
+    return jsonify(profiling.list_profiles()), 200
+
+# Download a profile - GET /admin/profiles/<name>?format=text&sort=cumulative&limit=50
+def get_profile(name):
+    if not profiling.profile_exists(name):
+        return jsonify({'error': 'Profile not found.'}), 404
+    if request.args.get('format') == 'text':
+        sort = request.args.get('sort', pstats.SortKey.CUMULATIVE.value)
+        if sort not in profiling.SORT_KEYS:
+            return jsonify({'error': f"sort must be one of: {', '.join(sorted(profiling.SORT_KEYS))}."}), 400
+        limit = request.args.get('limit', '50')
+        if not (limit.isascii() and limit.isdigit()):
+            return jsonify({'error': 'limit must be a non-negative integer.'}), 400
+        return Response(profiling.profile_text(name, sort, int(limit)), mimetype='text/plain')
+    return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+# Prometheus metrics - GET /metrics
+def prometheus_metrics():
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,115 @@
+import re
+from flask import request, jsonify, current_app
+from werkzeug.exceptions import NotFound, MethodNotAllowed
+from utils.session_manager import shared_session
+from config.config import BATCH_MAX_REQUESTS
+
+# "${step_id.path.to.value}" references the JSON result of an earlier step
+_REF_PATTERN = re.compile(r'\$\{([A-Za-z0-9_\-]+)((?:\.[A-Za-z0-9_\-]+)*)\}')
+
+
+class BatchError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _lookup(results, step_id, path):
+    if step_id not in results:
+        raise BatchError(f'Unknown reference to step "{step_id}".')
+    value = results[step_id]
+    for key in [p for p in path.split('.') if p]:
+        if isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        elif isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            raise BatchError(f'Reference "${{{step_id}{path}}}" does not resolve.')
+    return value
+
+
+def _resolve(value, results):
+    """Substitute ${step.field} references in strings, lists and dicts."""
+    if isinstance(value, str):
+        whole = _REF_PATTERN.fullmatch(value)
+        if whole:
+            # Keep the referenced value's type (e.g. an int id)
+            return _lookup(results, whole.group(1), whole.group(2))
+        return _REF_PATTERN.sub(lambda m: str(_lookup(results, m.group(1), m.group(2))), value)
+    if isinstance(value, list):
+        return [_resolve(v, results) for v in value]
+    if isinstance(value, dict):
+        return {k: _resolve(v, results) for k, v in value.items()}
+    return value
+
+
+def dispatch(method, path, query=None, body=None):
+    """Run the view registered for method/path in-process and return (status, json)."""
+    response = dispatch_response(method, path, query, body)
+    return response.status_code, response.get_json(silent=True)
+
+
+def dispatch_response(method, path, query=None, body=None):
+    """Like dispatch, but return the whole response (e.g. for its headers)."""
+    adapter = current_app.url_map.bind('localhost')
+    try:
+        endpoint, view_args = adapter.match(path, method=method)
+    except NotFound:
+        raise BatchError(f'No route for {method} {path}.', 404)
+    except MethodNotAllowed:
+        raise BatchError(f'Method {method} not allowed for {path}.', 405)
+
+    with current_app.test_request_context(path, method=method, query_string=query, json=body):
+        rv = current_app.view_functions[endpoint](**view_args)
+        return current_app.make_response(rv)
+
+
+# Run several API calls in one transaction - POST /batch
+def run_batch():
+    data = request.get_json(silent=True) or {}
+    sub_requests = data.get('requests') if isinstance(data, dict) else data
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({'error': 'requests must be a non-empty array.'}), 400
+    if len(sub_requests) > BATCH_MAX_REQUESTS:
+        return jsonify({'error': f'At most {BATCH_MAX_REQUESTS} requests per batch.'}), 400
+
+    results = {}
+    responses = []
+    try:
+        with shared_session() as shared:
+            for index, sub in enumerate(sub_requests):
+                if not isinstance(sub, dict) or not sub.get('path'):
+                    raise BatchError(f'Request {index} needs a path.')
+                step_id = str(sub.get('id', index))
+                method = str(sub.get('method', 'GET')).upper()
+                path = _resolve(sub['path'], results)
+                if path.rstrip('/') == '/api/batch':
+                    raise BatchError('Batches cannot be nested.')
+
+                continue_on_error = bool(sub.get('continue_on_error'))
+                if continue_on_error:
+                    # A failing step must not leave its half-done writes for the next flush
+                    shared.begin_step()
+                status, body = dispatch(
+                    method,
+                    path,
+                    _resolve(sub.get('query'), results),
+                    _resolve(sub.get('body'), results)
+                )
+                if continue_on_error:
+                    shared.end_step(keep=status < 400)
+                results[step_id] = body
+                responses.append({'id': step_id, 'status': status, 'body': body})
+
+                if shared.failed or (status >= 400 and not continue_on_error):
+                    # Abandon the whole transaction on the first failing step
+                    shared.failed = True
+                    return jsonify({
+                        'error': f'Request "{step_id}" failed; batch rolled back.',
+                        'responses': responses
+                    }), status if status >= 400 else 500
+        return jsonify({'responses': responses}), 200
+    except BatchError as e:
+        return jsonify({'error': str(e), 'responses': responses}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e), 'responses': responses}), 500
@@ -1,24 +1,24 @@
 from flask import request, jsonify
-from datetime import datetime
+from sqlalchemy.orm import undefer
+from sqlalchemy.orm.exc import StaleDataError
 from models.dailylogs import DailyLog
-from models.dailylogschanges import DailyLogChange
+from models.timesheet import Timesheet
 from utils.session_manager import get_session
-from utils.helpers import calculate_total_hours, format_timedelta_to_time, get_day_of_week, safe_close
+from utils.helpers import (
+    calculate_total_hours, format_timedelta_to_time, get_day_of_week, safe_close, version_conflict
+)
+from utils.projection import requested_fields, projected_rows, projected_row, pick
+from utils import archive, audit_buffer, payroll, schemas
 
 # Create daily log - POST /dailylogs
 def create_daily_log():
     session = get_session()
     try:
-        data = request.get_json()
-        required_fields = ['timesheet_id', 'log_date']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
-
         try:
-            log_date = datetime.strptime(data['log_date'], "%Y-%m-%d").date()
-        except ValueError:
-            return jsonify({'error': 'Invalid log_date format. Use YYYY-MM-DD.'}), 400
+            data = schemas.load(schemas.DAILY_LOG_CREATE, request.get_json())
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        log_date = data['log_date']
 
         # Check for existing log for this timesheet and date
         existing_log = session.query(DailyLog).filter_by(
@@ -35,15 +35,6 @@ def create_daily_log():
         afternoon_in = data.get('afternoon_in')
         afternoon_out = data.get('afternoon_out')
 
-        fmt = "%H:%M"
-        try:
-            morning_in = datetime.strptime(morning_in, fmt).time() if morning_in else None
-            morning_out = datetime.strptime(morning_out, fmt).time() if morning_out else None
-            afternoon_in = datetime.strptime(afternoon_in, fmt).time() if afternoon_in else None
-            afternoon_out = datetime.strptime(afternoon_out, fmt).time() if afternoon_out else None
-        except ValueError:
-            return jsonify({'error': 'Invalid time format. Use HH:MM.'}), 400
-
         total_td = calculate_total_hours(morning_in, morning_out, afternoon_in, afternoon_out)
         total_time_str = format_timedelta_to_time(total_td)
 
@@ -61,6 +52,9 @@ def create_daily_log():
         session.add(log)
         session.commit()
         return jsonify(log.as_dict()), 201
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
     except Exception as e:
        session.rollback()
        print("Error in create_daily_log:", e)  # <--- Add this line
@@ -72,32 +66,28 @@ def create_daily_log():
 def update_daily_log(log_id):
     session = get_session()
     try:
-        log = session.query(DailyLog).get(log_id)
+        log = session.query(DailyLog).options(undefer(DailyLog.description)).get(log_id)
         if not log:
             return jsonify({'error': 'Daily log not found'}), 404
 
-        data = request.get_json()
+        try:
+            data = schemas.load(schemas.DAILY_LOG_UPDATE, request.get_json(), partial=True)
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        version = data.get('version')
+        # Clients send back the version they read; anything else is a lost update
+        if version is not None and version != log.version:
+            return version_conflict(log)
+
         old_description = log.description
 
-        if 'log_date' in data:
-            try:
-                log.log_date = datetime.strptime(data['log_date'], "%Y-%m-%d").date()
-                log.day_of_week = get_day_of_week(log.log_date)
-            except ValueError:
-                return jsonify({'error': 'Invalid log_date format. Use YYYY-MM-DD.'}), 400
+        if data.get('log_date'):
+            log.log_date = data['log_date']
+            log.day_of_week = get_day_of_week(log.log_date)
 
-        fmt = "%H:%M"
-        try:
-            if 'morning_in' in data:
-                log.morning_in = datetime.strptime(data['morning_in'], fmt).time() if data['morning_in'] else None
-            if 'morning_out' in data:
-                log.morning_out = datetime.strptime(data['morning_out'], fmt).time() if data['morning_out'] else None
-            if 'afternoon_in' in data:
-                log.afternoon_in = datetime.strptime(data['afternoon_in'], fmt).time() if data['afternoon_in'] else None
-            if 'afternoon_out' in data:
-                log.afternoon_out = datetime.strptime(data['afternoon_out'], fmt).time() if data['afternoon_out'] else None
-        except ValueError:
-            return jsonify({'error': 'Invalid time format. Use HH:MM.'}), 400
+        for field in ('morning_in', 'morning_out', 'afternoon_in', 'afternoon_out'):
+            if field in data:
+                setattr(log, field, data[field])
 
         # Recalculate total hours
         total_td = calculate_total_hours(log.morning_in, log.morning_out, log.afternoon_in, log.afternoon_out)
@@ -105,38 +95,56 @@ def update_daily_log(log_id):
 
         if 'description' in data:
             if data['description'] != old_description:
-                # Save change in DailyLogChange
-                change = DailyLogChange(
-                    daily_log_id=log.id,
-                    new_description=data['description']
-                )
-                session.add(change)
+                # Save change in DailyLogChange (possibly write-behind)
+                audit_buffer.record_change(session, log.id, data['description'])
             log.description = data['description']
 
         session.commit()
         return jsonify(log.as_dict()), 200
+    except StaleDataError:
+        # Someone else committed between our read and our UPDATE
+        session.rollback()
+        return version_conflict(session.get(DailyLog, log_id))
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
     except Exception as e:
         session.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get all daily logs - GET /dailylogs
+# Get all daily logs - GET /dailylogs?fields=id,log_date,...
 def get_daily_logs():
     session = get_session()
     try:
-        logs = session.query(DailyLog).all()
+        try:
+            fields = requested_fields(DailyLog)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            return jsonify(projected_rows(session, DailyLog, fields)), 200
+        logs = session.query(DailyLog).options(undefer(DailyLog.description)).all()
         return jsonify([log.as_dict() for log in logs]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get daily log by ID - GET /dailylogs/<id>
+# Get daily log by ID - GET /dailylogs/<id>?fields=
 def get_daily_log(log_id):
     session = get_session()
     try:
-        log = session.query(DailyLog).get(log_id)
+        try:
+            fields = requested_fields(DailyLog)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            log = projected_row(session, DailyLog, fields, DailyLog.id == log_id)
+            if not log:
+                return jsonify({'error': 'Daily log not found'}), 404
+            return jsonify(log), 200
+        log = session.query(DailyLog).options(undefer(DailyLog.description)).get(log_id)
         if not log:
             return jsonify({'error': 'Daily log not found'}), 404
         return jsonify(log.as_dict()), 200
@@ -156,19 +164,110 @@ def delete_daily_log(log_id):
         session.delete(log)
         session.commit()
         return jsonify({'message': 'Daily log deleted successfully.'}), 200
+    except StaleDataError:
+        session.rollback()
+        return version_conflict(session.get(DailyLog, log_id))
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
     except Exception as e:
         session.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get daily logs by timesheet - GET /timesheets/<timesheet_id>/dailylogs
+# Get daily logs by timesheet - GET /timesheets/<timesheet_id>/dailylogs?fields=
 def get_daily_logs_by_timesheet(timesheet_id):
     session = get_session()
     try:
-        logs = session.query(DailyLog).filter_by(timesheet_id=timesheet_id).all()
-        return jsonify([log.as_dict() for log in logs]), 200
+        try:
+            fields = requested_fields(DailyLog)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            logs = projected_rows(session, DailyLog, fields, DailyLog.timesheet_id == timesheet_id)
+        else:
+            logs = [log.as_dict() for log in session.query(DailyLog)
+                    .options(undefer(DailyLog.description))
+                    .filter_by(timesheet_id=timesheet_id)]
+        if not logs:
+            # Timesheets past the hot window live in the archive
+            return jsonify([pick(log, fields) for log in archive.find_daily_logs(timesheet_id)]), 200
+        return jsonify(logs), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
-        safe_close(session)
\ No newline at end of file
+        safe_close(session)
+
+# Save a batch of daily logs - POST /daily-logs/save
+def save_daily_logs():
+    session = get_session()
+    try:
+        try:
+            logs = schemas.load_many(schemas.SAVE_DAILY_LOG, request.get_json())
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+
+        for log_data in logs:
+            log_id = log_data['id']
+            if isinstance(log_id, str) and log_id.startswith('temp-'):
+                # Create new log
+                if not log_data.get('week_starting') or not log_data.get('date'):
+                    return jsonify({'error': f'Daily log {log_id}: week_starting and date are required.'}), 400
+                timesheet = session.query(Timesheet).filter_by(
+                    employee_id=log_data.get('employee_id'),
+                    week_starting=log_data['week_starting']
+                ).first()
+                if not timesheet:
+                    return jsonify({'error': f'Timesheet not found for employee_id {log_data.get("employee_id")} and week {log_data["week_starting"].isoformat()}'}), 404
+
+                new_log = DailyLog(
+                    timesheet_id=timesheet.id,
+                    log_date=log_data['date'],
+                    day_of_week=get_day_of_week(log_data['date']),
+                    morning_in=log_data.get('time_in_am'),
+                    morning_out=log_data.get('time_out_am'),
+                    afternoon_in=log_data.get('time_in_pm'),
+                    afternoon_out=log_data.get('time_out_pm'),
+                    description=log_data.get('description'),
+                    total_hours=format_timedelta_to_time(calculate_total_hours(
+                        log_data.get('time_in_am'),
+                        log_data.get('time_out_am'),
+                        log_data.get('time_in_pm'),
+                        log_data.get('time_out_pm')
+                    ))
+                )
+                session.add(new_log)
+            else:
+                # Update existing log
+                log = session.query(DailyLog).get(log_id)
+                if not log:
+                    return jsonify({'error': f'Daily log with id {log_id} not found.'}), 404
+                version = log_data.get('version')
+                if version is not None and version != log.version:
+                    session.rollback()
+                    return version_conflict(log)
+
+                log.morning_in = log_data.get('time_in_am') or log.morning_in
+                log.morning_out = log_data.get('time_out_am') or log.morning_out
+                log.afternoon_in = log_data.get('time_in_pm') or log.afternoon_in
+                log.afternoon_out = log_data.get('time_out_pm') or log.afternoon_out
+                log.description = log_data.get('description') or log.description
+                log.total_hours = format_timedelta_to_time(calculate_total_hours(
+                    log.morning_in, log.morning_out, log.afternoon_in, log.afternoon_out
+                ))
+
+        session.commit()
+        return jsonify({'message': 'Logs saved successfully.'}), 200
+    except StaleDataError:
+        # The whole batch is rolled back; the client reloads and retries
+        session.rollback()
+        return jsonify({'error': 'One of the logs was changed by someone else. Reload and try again.'}), 409
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
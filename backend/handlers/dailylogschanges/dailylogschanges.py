@@ -1,22 +1,53 @@
 from flask import request, jsonify
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
 from models.dailylogschanges import DailyLogChange
+from models.dailylogs import DailyLog
+from models.timesheet import Timesheet
 from utils.session_manager import get_session
 from utils.helpers import sanitize_description, safe_close
+from utils.projection import requested_fields, projected_rows, projected_row
+from utils.listing import list_query, fetch_page, parse_datetime
+from utils import audit_buffer, schemas
+
+def _changes_of_employee(op, employee_id):
+    return DailyLogChange.daily_log_id.in_(
+        select(DailyLog.id)
+        .join(Timesheet, Timesheet.id == DailyLog.timesheet_id)
+        .where(Timesheet.employee_id == employee_id)
+    )
+
+# Filters and sorts accepted by GET /dailylogchanges
+LOG_CHANGE_LIST = {
+    'model': DailyLogChange,
+    'filters': {
+        'daily_log_id': (int, ('eq',)),
+        'employee_id': (int, ('eq',), _changes_of_employee),
+        'changed_at': (parse_datetime, ('gte', 'lte')),
+    },
+    'sorts': {'id': int, 'changed_at': parse_datetime},
+    'default_sort': 'id',
+}
 
 ## Create a change - POST /dailylogchanges
 def add_log_change():
     session = get_session()
     try:
-        data = request.get_json()
-        log_id = data.get("daily_log_id")
-        new_desc = sanitize_description(data.get("new_description"))
-
-        if not log_id or not new_desc:
-            return jsonify({"error": "daily_log_id and new_description are required"}), 400
+        try:
+            data = schemas.load(schemas.LOG_CHANGE_CREATE, request.get_json())
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        # Buffered rows are only inserted later, so a bad id has to be caught here
+        if not session.query(DailyLog.id).filter_by(id=data["daily_log_id"]).first():
+            return jsonify({"error": "Daily log not found"}), 404
 
-        change = DailyLogChange(daily_log_id=log_id, new_description=new_desc)
-        session.add(change)
+        change = audit_buffer.record_change(session, data["daily_log_id"], data["new_description"])
         session.commit()
+        if change is None:
+            return jsonify({"message": "Description unchanged; no change recorded."}), 200
+        if change.id is None:
+            # Buffered: written by the next flush
+            return jsonify(change.as_dict()), 202
         return jsonify(change.as_dict()), 201
     except Exception as e:
         session.rollback()
@@ -24,22 +55,40 @@ def add_log_change():
     finally:
         safe_close(session)
 
-# Get all changes - GET /dailylogchanges
+# List changes - GET /dailylogchanges?employee_id=&daily_log_id=&changed_at[gte]=&sort=-changed_at&limit=&cursor=&fields=
 def get_all_log_changes():
+    """One page of changes; X-Next-Cursor carries the cursor for the next page."""
     session = get_session()
     try:
-        changes = session.query(DailyLogChange).all()
-        return jsonify([ch.as_dict() for ch in changes]), 200
+        try:
+            fields = requested_fields(DailyLogChange)
+            query = list_query(LOG_CHANGE_LIST, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        rows, next_cursor = fetch_page(session, LOG_CHANGE_LIST, query, fields)
+        response = jsonify(rows)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get change by ID - GET /dailylogchanges/<id>
+# Get change by ID - GET /dailylogchanges/<id>?fields=
 def get_log_change(change_id):
     session = get_session()
     try:
-        change = session.query(DailyLogChange).get(change_id)
+        try:
+            fields = requested_fields(DailyLogChange)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            change = projected_row(session, DailyLogChange, fields, DailyLogChange.id == change_id)
+            if not change:
+                return jsonify({"error": "Change not found"}), 404
+            return jsonify(change), 200
+        change = session.query(DailyLogChange).options(undefer(DailyLogChange.new_description)).get(change_id)
         if not change:
             return jsonify({"error": "Change not found"}), 404
         return jsonify(change.as_dict()), 200
@@ -56,7 +105,10 @@ def update_log_change(change_id):
         if not change:
             return jsonify({"error": "Change not found"}), 404
 
-        data = request.get_json()
+        try:
+            data = schemas.load(schemas.LOG_CHANGE_UPDATE, request.get_json(), partial=True)
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
         if "new_description" in data:
             change.new_description = sanitize_description(data["new_description"])
         session.commit()
@@ -83,11 +135,21 @@ def delete_log_change(change_id):
     finally:
         safe_close(session)
 
-# Get change history for a daily log - GET /dailylogs/<daily_log_id>/changes
+# Get change history for a daily log - GET /dailylogs/<daily_log_id>/changes?fields=
 def get_log_changes(daily_log_id):
     session = get_session()
     try:
-        changes = session.query(DailyLogChange).filter_by(daily_log_id=daily_log_id).all()
+        try:
+            fields = requested_fields(DailyLogChange)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            return jsonify(projected_rows(session, DailyLogChange, fields,
+                                          DailyLogChange.daily_log_id == daily_log_id)), 200
+        changes = session.query(DailyLogChange) \
+            .options(undefer(DailyLogChange.new_description)) \
+            .filter_by(daily_log_id=daily_log_id) \
+            .all()
         return jsonify([ch.as_dict() for ch in changes]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
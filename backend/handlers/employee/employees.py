@@ -2,25 +2,29 @@ from flask import request, jsonify
 from models.employee import Employee
 from models.timesheet import Timesheet
 from models.dailylogs import DailyLog
+from models.dailylogschanges import DailyLogChange
+from config.config import PARTITION_LOGS
 from utils.session_manager import get_session
-from utils.helpers import is_valid_email, safe_close
+from utils.helpers import safe_close
+from utils.projection import requested_fields, projected_rows, projected_row, pick
+from utils import employee_closure, employee_import, schemas
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
 from datetime import datetime, timedelta
 
 # Create employee
 def create_employee():
     session = get_session()
     try:
-        data = request.get_json()
-        name = data.get('employee_name')
-        email = data.get('email')
+        try:
+            data = schemas.load(schemas.EMPLOYEE_CREATE, request.get_json())
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        name = data['employee_name']
+        email = data['email']
         reports_to = data.get('reports_to')
         manager_name = data.get('manager_name')
 
-        if not name or not email:
-            return jsonify({'error': 'employee_name and email are required.'}), 400
-        if not is_valid_email(email):
-            return jsonify({'error': 'Invalid email format'}), 422
-
         manager_id = None
         if manager_name:
             manager = session.query(Employee).filter_by(employee_name=manager_name).first()
@@ -37,6 +41,9 @@ def create_employee():
 
         new_employee = Employee(employee_name=name, email=email, reports_to=manager_id)
         session.add(new_employee)
+        if employee_closure.enabled():
+            session.flush()
+            employee_closure.add_employee(session, new_employee.id, manager_id)
         session.commit()
 
         return jsonify({
@@ -51,10 +58,16 @@ def create_employee():
     finally:
         safe_close(session)
 
-# Get all employees
+# Get all employees - GET /employees?fields=
 def get_employees():
     session = get_session()
     try:
+        try:
+            fields = requested_fields(Employee)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            return jsonify(projected_rows(session, Employee, fields)), 200
         employees = session.query(Employee).all()
         return jsonify([{
             'id': emp.id,
@@ -99,27 +112,33 @@ def update_employee_by_email():
         if not emp:
             return jsonify({'error': 'Employee not found.'}), 404
 
-        data = request.get_json()
-        new_email = data.get('email', emp.email)
-        if new_email and not is_valid_email(new_email):
-            return jsonify({'error': 'Invalid email format'}), 422
-
+        try:
+            data = schemas.load(schemas.EMPLOYEE_UPDATE, request.get_json(), partial=True)
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
         emp.employee_name = data.get('employee_name', emp.employee_name)
-        emp.email = new_email
+        emp.email = data.get('email', emp.email)
 
         reports_to_email = data.get('reports_to_email')
         manager_name = data.get('manager_name')
 
+        manager = None
         if reports_to_email:
             manager = session.query(Employee).filter_by(email=reports_to_email).first()
             if not manager or manager.id == emp.id:
                 return jsonify({'error': 'Invalid manager'}), 400
-            emp.reports_to = manager.id
         elif manager_name:
             manager = session.query(Employee).filter_by(employee_name=manager_name).first()
             if not manager or manager.id == emp.id:
                 return jsonify({'error': 'Invalid manager'}), 400
+
+        if manager and manager.id != emp.reports_to:
+            # Reporting to someone in your own subtree would create a cycle
+            if _reports_to(session, manager.id, emp.id):
+                return jsonify({'error': 'Invalid manager: they report to this employee.'}), 400
             emp.reports_to = manager.id
+            if employee_closure.enabled():
+                employee_closure.move_subtree(session, emp.id, manager.id)
 
         session.commit()
         return jsonify({
@@ -134,6 +153,122 @@ def update_employee_by_email():
     finally:
         safe_close(session)
 
+# Import an org dump - POST /employees/bulk (JSON list or text/csv)
+def import_employees_bulk():
+    """All rows are inserted in one transaction, or none and a per-row error report."""
+    session = get_session()
+    try:
+        try:
+            if request.mimetype == 'text/csv':
+                rows = employee_import.parse_csv(request.get_data(as_text=True))
+            else:
+                rows = request.get_json(silent=True)
+                if isinstance(rows, dict):
+                    rows = rows.get('employees')
+            levels, errors = employee_import.plan(session, rows)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if errors:
+            session.rollback()
+            return jsonify({
+                'error': f'{len(errors)} row(s) have errors; nothing was imported.',
+                'rows': errors
+            }), 400
+
+        created = employee_import.insert_levels(session, levels)
+        session.commit()
+        return jsonify({'created': len(created), 'levels': len(levels), 'employees': created}), 201
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
+
+def offboard_employees(session, emails, reassign_to_id=None):
+    """Delete employees by email with set-based statements.
+
+    Direct reports outside the deleted set are moved to reassign_to_id (or
+    left without a manager) in one UPDATE. The employees' daily logs,
+    timesheets and the employees themselves are then removed with one
+    DELETE each, so the counts are the rows actually deleted. Log changes
+    go with their logs through the foreign key cascade, except under
+    PARTITION_LOGS, where there is no foreign key and they are deleted
+    first. Returns (counts, missing_emails).
+    """
+    found = session.query(Employee.id, Employee.email).filter(Employee.email.in_(emails)).all()
+    ids = [row.id for row in found]
+    found_emails = {row.email for row in found}
+    missing = [email for email in emails if email not in found_emails]
+    if not ids:
+        return None, missing
+
+    timesheet_ids = select(Timesheet.id).where(Timesheet.employee_id.in_(ids))
+    if PARTITION_LOGS:
+        log_ids = select(DailyLog.id).where(DailyLog.timesheet_id.in_(timesheet_ids))
+        session.query(DailyLogChange) \
+            .filter(DailyLogChange.daily_log_id.in_(log_ids)) \
+            .delete(synchronize_session=False)
+
+    logs_deleted = session.query(DailyLog) \
+        .filter(DailyLog.timesheet_id.in_(timesheet_ids)) \
+        .delete(synchronize_session=False)
+    timesheets_deleted = session.query(Timesheet) \
+        .filter(Timesheet.employee_id.in_(ids)) \
+        .delete(synchronize_session=False)
+
+    if employee_closure.enabled():
+        employee_closure.remove_employees(session, ids, reassign_to_id)
+
+    reassigned = session.query(Employee) \
+        .filter(Employee.reports_to.in_(ids), ~Employee.id.in_(ids)) \
+        .update({Employee.reports_to: reassign_to_id}, synchronize_session=False)
+
+    deleted = session.query(Employee) \
+        .filter(Employee.id.in_(ids)) \
+        .delete(synchronize_session=False)
+
+    return {
+        'employees_deleted': deleted,
+        'subordinates_reassigned': reassigned,
+        'timesheets_deleted': timesheets_deleted,
+        'daily_logs_deleted': logs_deleted
+    }, missing
+
+def _manager_chain_ids(session, employee_id):
+    """Ids of employee_id and everyone above it, via a recursive CTE."""
+    chain = session.query(Employee.id, Employee.reports_to) \
+        .filter(Employee.id == employee_id) \
+        .cte(name='chain', recursive=True)
+    chain = chain.union_all(
+        session.query(Employee.id, Employee.reports_to).join(chain, Employee.id == chain.c.reports_to)
+    )
+    return {row[0] for row in session.query(chain.c.id).all()}
+
+def _reports_to(session, employee_id, manager_id):
+    """True when employee_id is manager_id or sits anywhere below it."""
+    if employee_closure.enabled():
+        return employee_closure.is_descendant(session, employee_id, manager_id)
+    return manager_id in _manager_chain_ids(session, employee_id)
+
+def _manager_hierarchy(session, employee_id, reports_to):
+    """Managers above the employee, nearest first, as dicts."""
+    if employee_closure.enabled():
+        managers = employee_closure.ancestors(session, employee_id)
+    else:
+        managers = []
+        while reports_to:
+            manager = session.query(Employee).get(reports_to)
+            if not manager:
+                break
+            managers.append(manager)
+            reports_to = manager.reports_to
+    return [{
+        'id': manager.id,
+        'employee_name': manager.employee_name,
+        'email': manager.email,
+        'reports_to': manager.reports_to
+    } for manager in managers]
+
 # Delete employee by email
 def delete_employee_by_email():
     session = get_session()
@@ -141,16 +276,12 @@ def delete_employee_by_email():
         email = request.args.get('email')
         if not email:
             return jsonify({'error': 'email query param required.'}), 400
-        emp = session.query(Employee).filter_by(email=email).first()
-        if not emp:
-            return jsonify({'error': 'Employee not found.'}), 404
 
-        # Set subordinates' manager to None
-        subordinates = session.query(Employee).filter(Employee.reports_to == emp.id).all()
-        for sub in subordinates:
-            sub.reports_to = None
+        # Subordinates are set to no manager in the same statement batch
+        counts, _ = offboard_employees(session, [email])
+        if not counts:
+            return jsonify({'error': 'Employee not found.'}), 404
 
-        session.delete(emp)
         session.commit()
         return jsonify({'message': 'Employee deleted successfully. Subordinates updated.'}), 200
     except Exception as e:
@@ -159,14 +290,63 @@ def delete_employee_by_email():
     finally:
         safe_close(session)
 
-# Get subordinates
+# Offboard many employees - POST /employees/offboard
+def offboard_employees_bulk():
+    session = get_session()
+    try:
+        data = request.get_json() or {}
+        emails = data.get('emails')
+        reassign_to_email = data.get('reassign_to_email')
+        if not isinstance(emails, list) or not emails:
+            return jsonify({'error': 'emails must be a non-empty list.'}), 400
+        emails = list(dict.fromkeys(emails))
+
+        reassign_to_id = None
+        if reassign_to_email:
+            if reassign_to_email in emails:
+                return jsonify({'error': 'reassign_to_email cannot be one of the offboarded employees.'}), 400
+            manager = session.query(Employee).filter_by(email=reassign_to_email).first()
+            if not manager:
+                return jsonify({'error': 'Manager not found.'}), 404
+            # Moving reports under someone who sits below an offboarded employee would create a cycle
+            offboarded_ids = session.query(Employee.id).filter(Employee.email.in_(emails))
+            chain = _manager_chain_ids(session, manager.id)
+            if any(row.id in chain for row in offboarded_ids):
+                return jsonify({'error': 'reassign_to_email reports to one of the offboarded employees.'}), 400
+            reassign_to_id = manager.id
+
+        counts, missing = offboard_employees(session, emails, reassign_to_id)
+        if not counts:
+            return jsonify({'error': 'No matching employees found.', 'not_found': missing}), 404
+
+        session.commit()
+        counts['not_found'] = missing
+        return jsonify(counts), 200
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
+
+# Get subordinates - GET /employees/<manager_id>/subordinates?fields=
 def get_subordinates(manager_id):
     session = get_session()
     try:
+        try:
+            fields = requested_fields(Employee)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         manager = session.query(Employee).get(manager_id)
         if not manager:
             return jsonify({'error': 'Manager not found.'}), 404
 
+        if fields:
+            return jsonify({
+                'manager_id': manager.id,
+                'manager_name': manager.employee_name,
+                'subordinates': projected_rows(session, Employee, fields, Employee.reports_to == manager.id)
+            }), 200
+
         subordinates = manager.subordinates
         return jsonify({
             'manager_id': manager.id,
@@ -183,10 +363,16 @@ def get_subordinates(manager_id):
     finally:
         safe_close(session)
 
-# Get employees without manager
+# Get employees without manager - GET /employees/without-manager?fields=
 def get_employees_without_manager():
     session = get_session()
     try:
+        try:
+            fields = requested_fields(Employee)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            return jsonify(projected_rows(session, Employee, fields, Employee.reports_to == None)), 200
         employees = session.query(Employee).filter(Employee.reports_to == None).all()
         return jsonify([{
             'id': emp.id,
@@ -210,19 +396,7 @@ def get_manager_hierarchy_by_email():
         if not emp:
             return jsonify({'error': 'Employee not found.'}), 404
 
-        hierarchy = []
-        current = emp
-        while current.reports_to:
-            manager = session.query(Employee).get(current.reports_to)
-            if not manager:
-                break
-            hierarchy.append({
-                'id': manager.id,
-                'employee_name': manager.employee_name,
-                'email': manager.email,
-                'reports_to': manager.reports_to
-            })
-            current = manager
+        hierarchy = _manager_hierarchy(session, emp.id, emp.reports_to)
 
         return jsonify({
             'employee_id': emp.id,
@@ -242,13 +416,23 @@ def get_employee_tree(employee_id):
         if not root:
             return jsonify({'error': 'Employee not found.'}), 404
 
+        if employee_closure.enabled():
+            # The whole subtree in one indexed lookup, assembled in memory
+            members = [root] + [emp for emp, _ in employee_closure.descendants(session, root.id)]
+            children = {}
+            for emp in members[1:]:
+                children.setdefault(emp.reports_to, []).append(emp)
+            subordinates_of = lambda emp: children.get(emp.id, [])
+        else:
+            subordinates_of = lambda emp: emp.subordinates
+
         def build_tree(emp):
             return {
                 'id': emp.id,
                 'employee_name': emp.employee_name,
                 'email': emp.email,
                 'reports_to': emp.reports_to,
-                'subordinates': [build_tree(sub) for sub in emp.subordinates]
+                'subordinates': [build_tree(sub) for sub in subordinates_of(emp)]
             }
 
         tree = build_tree(root)
@@ -272,19 +456,7 @@ def get_employee_dashboard():
             return jsonify({'error': 'Employee not found.'}), 404
 
         # Manager hierarchy
-        hierarchy = []
-        current = emp
-        while current.reports_to:
-            manager = session.query(Employee).get(current.reports_to)
-            if not manager:
-                break
-            hierarchy.append({
-                'id': manager.id,
-                'employee_name': manager.employee_name,
-                'email': manager.email,
-                'reports_to': manager.reports_to
-            })
-            current = manager
+        hierarchy = _manager_hierarchy(session, emp.id, emp.reports_to)
 
         # Parse week_starting date
         timesheets_data = []
@@ -301,7 +473,7 @@ def get_employee_dashboard():
                 timesheet_ids = [ts.id for ts in timesheets]
                 timesheets_data = [ts.as_dict() for ts in timesheets]
                 if timesheet_ids:
-                    logs = session.query(DailyLog).filter(
+                    logs = session.query(DailyLog).options(undefer(DailyLog.description)).filter(
                         DailyLog.timesheet_id.in_(timesheet_ids),
                         DailyLog.log_date >= week_start,
                         DailyLog.log_date <= week_end
@@ -314,7 +486,8 @@ def get_employee_dashboard():
             timesheet_ids = [ts.id for ts in timesheets]
             timesheets_data = [ts.as_dict() for ts in timesheets]
             if timesheet_ids:
-                logs = session.query(DailyLog).filter(DailyLog.timesheet_id.in_(timesheet_ids)).all()
+                logs = session.query(DailyLog).options(undefer(DailyLog.description)) \
+                    .filter(DailyLog.timesheet_id.in_(timesheet_ids)).all()
                 daily_logs_data = [log.as_dict() for log in logs]
 
         return jsonify({
@@ -331,4 +504,30 @@ def get_employee_dashboard():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
-        safe_close(session)
\ No newline at end of file
+        safe_close(session)
+
+# Get employee profile with manager hierarchy - GET /employees/profile-with-hierarchy?email=&fields=
+def get_employee_profile_with_hierarchy():
+    email = request.args.get('email')
+    session = get_session()
+    try:
+        try:
+            fields = requested_fields(Employee)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # id and reports_to are read even when not requested, to walk up the hierarchy
+        columns = [name for name in Employee.__table__.columns.keys()
+                   if fields is None or name in fields or name in ('id', 'reports_to')]
+        emp = projected_row(session, Employee, columns, Employee.email.ilike(email))
+        if not emp:
+            return jsonify({'error': 'Employee not found.'}), 404
+
+        # Build manager hierarchy
+        hierarchy = _manager_hierarchy(session, emp['id'], emp['reports_to'])
+
+        return jsonify({
+            'employee': pick(emp, fields),
+            'manager_hierarchy': [pick(manager, fields) for manager in hierarchy]
+        }), 200
+    finally:
+        safe_close(session)
@@ -0,0 +1,58 @@
+from flask import request, jsonify, Response
+from sqlalchemy import select
+from models.employee import Employee
+from handlers.weeks.weeks import _team_cte, _MAX_TEAM_DEPTH
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.tenancy import current_tenant
+from utils import events
+
+def _followed_employees(employee_id, team_of):
+    """Employee ids the stream is limited to, None for all; raises LookupError if one is unknown."""
+    if employee_id is None and team_of is None:
+        return None
+    session = get_session()
+    try:
+        ids = set()
+        for emp_id in (employee_id, team_of):
+            if emp_id is not None:
+                if not session.query(Employee.id).filter_by(id=emp_id).first():
+                    raise LookupError(f'Employee {emp_id} not found.')
+                ids.add(emp_id)
+        if team_of is not None:
+            team = _team_cte(team_of, _MAX_TEAM_DEPTH)
+            ids.update(row[0] for row in session.execute(select(team.c.id)))
+        return ids
+    finally:
+        safe_close(session)
+
+# Live timesheet, daily-log and log-change events - GET /events?employee_id=&team_of=
+def stream_events():
+    if not events.enabled():
+        return jsonify({'error': 'Live events are disabled (EVENTS_BACKEND=off).'}), 503
+    try:
+        try:
+            employee_id = int(request.args['employee_id']) if request.args.get('employee_id') else None
+            team_of = int(request.args['team_of']) if request.args.get('team_of') else None
+        except ValueError:
+            return jsonify({'error': 'employee_id and team_of must be integers.'}), 400
+
+        try:
+            # Team membership is read once; streams end periodically and pick up changes on reconnect
+            employee_ids = _followed_employees(employee_id, team_of)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+
+        sub = events.subscribe(current_tenant(), employee_ids)
+        if sub is None:
+            response = jsonify({'error': 'Too many open event streams on this worker; try again shortly.'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        return Response(events.stream(sub), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # Keep reverse proxies from buffering the stream
+            'X-Accel-Buffering': 'no',
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,55 @@
+from flask import request, jsonify
+from sqlalchemy import select
+from models.log_finding import LogFinding
+from handlers.weeks.weeks import _team_cte, _MAX_TEAM_DEPTH
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.projection import requested_fields
+from utils.listing import list_query, fetch_page, parse_date
+from utils.log_analytics import RULES
+
+def _rule(value):
+    if value not in RULES:
+        raise ValueError(value)
+    return value
+
+def _findings_of_team(op, manager_id):
+    team = _team_cte(manager_id, _MAX_TEAM_DEPTH)
+    return LogFinding.employee_id.in_(select(team.c.id))
+
+# Filters and sorts accepted by GET /findings
+FINDING_LIST = {
+    'model': LogFinding,
+    'filters': {
+        'employee_id': (int, ('eq',)),
+        'manager_id': (int, ('eq',), _findings_of_team),
+        'rule': (_rule, ('eq',)),
+        'week_starting': (parse_date, ('eq', 'gte', 'lte')),
+    },
+    'sorts': {'id': int, 'week_starting': parse_date},
+    'default_sort': '-week_starting',
+}
+
+# Analytics findings for an employee or a manager's team - GET /findings?employee_id=|manager_id=&rule=&week_starting[gte]=
+def get_findings():
+    """One page of findings; X-Next-Cursor carries the cursor for the next page.
+
+    Findings are written by useful/analyze_logs.py; rule is one of
+    utils.log_analytics.RULES.
+    """
+    session = get_session()
+    try:
+        try:
+            fields = requested_fields(LogFinding)
+            query = list_query(FINDING_LIST, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'rules': list(RULES)}), 400
+        rows, next_cursor = fetch_page(session, FINDING_LIST, query, fields)
+        response = jsonify(rows)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
@@ -0,0 +1,54 @@
+from flask import request, jsonify, send_file
+from utils import job_queue
+from utils.tenancy import current_tenant
+
+# Submit a background job - POST /jobs
+def submit_job():
+    try:
+        data = request.get_json() or {}
+        kind = data.get('kind')
+        if not kind:
+            return jsonify({'error': 'kind is required.', 'kinds': sorted(job_queue.JOB_KINDS)}), 400
+        if kind not in job_queue.JOB_KINDS:
+            return jsonify({'error': f'Unknown job kind "{kind}".', 'kinds': sorted(job_queue.JOB_KINDS)}), 400
+        try:
+            priority = int(data.get('priority', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'priority must be an integer.'}), 400
+
+        params = dict(data.get('params') or {})
+        if current_tenant():
+            # The worker runs the job against the submitting tenant's data
+            params['tenant'] = current_tenant()
+
+        try:
+            job_id = job_queue.submit(kind, params, priority)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(job_queue.get_job(job_id)), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Poll job status - GET /jobs/<id>
+def get_job_status(job_id):
+    try:
+        job = job_queue.get_job(job_id)
+        if not job or job['params'].get('tenant') != current_tenant():
+            return jsonify({'error': 'Job not found.'}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Download job result - GET /jobs/<id>/result
+def download_job_result(job_id):
+    try:
+        job = job_queue.get_job(job_id)
+        if not job or job['params'].get('tenant') != current_tenant():
+            return jsonify({'error': 'Job not found.'}), 404
+        path = job_queue.result_path(job_id)
+        if not path:
+            return jsonify({'error': f'Job is {job["status"]}.', 'status': job['status']}), 409
+        return send_file(path, mimetype='application/json', as_attachment=True,
+                         download_name=f'{job["kind"]}-{job_id}.json')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,124 @@
+from flask import request, jsonify
+from sqlalchemy import select
+from models.employee import Employee
+from models.payroll import PayrollPeriod, PayrollSnapshot
+from handlers.weeks.weeks import _team_cte, _MAX_TEAM_DEPTH
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.projection import requested_fields
+from utils.listing import list_query, fetch_page, parse_date
+from utils import payroll, schemas
+
+def _snapshots_of_team(op, manager_id):
+    team = _team_cte(manager_id, _MAX_TEAM_DEPTH)
+    return PayrollSnapshot.employee_id.in_(select(team.c.id))
+
+# Filters and sorts accepted by GET /payroll/periods/<id>/snapshots
+SNAPSHOT_LIST = {
+    'model': PayrollSnapshot,
+    'filters': {
+        'employee_id': (int, ('eq',)),
+        'manager_id': (int, ('eq',), _snapshots_of_team),
+        'week_starting': (parse_date, ('eq', 'gte', 'lte')),
+    },
+    'sorts': {'id': int, 'week_starting': parse_date},
+    'default_sort': 'id',
+}
+
+# Close a payroll period - POST /payroll/periods
+def close_payroll_period():
+    """Lock timesheets with week_starting in [start_date, end_date] and snapshot their totals."""
+    session = get_session()
+    try:
+        try:
+            data = schemas.load(schemas.PAYROLL_CLOSE, request.get_json() or {})
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        start, end = data['start_date'], data['end_date']
+
+        try:
+            period, snapshots = payroll.close_period(session, start, end)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except payroll.PeriodClosedError as e:
+            session.rollback()
+            return jsonify({'error': str(e)}), 409
+        session.commit()
+        return jsonify({**period.as_dict(), 'snapshots': snapshots}), 201
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
+
+# List closed payroll periods - GET /payroll/periods
+def get_payroll_periods():
+    session = get_session()
+    try:
+        periods = session.query(PayrollPeriod).order_by(PayrollPeriod.start_date).all()
+        return jsonify([period.as_dict() for period in periods]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
+
+# Snapshot rows of a closed period - GET /payroll/periods/<id>/snapshots?employee_id=|manager_id=&week_starting[gte]=
+def get_payroll_snapshots(period_id):
+    """One page of snapshot rows; X-Next-Cursor carries the cursor for the next page."""
+    session = get_session()
+    try:
+        if not session.get(PayrollPeriod, period_id):
+            return jsonify({'error': 'Payroll period not found.'}), 404
+        try:
+            fields = requested_fields(PayrollSnapshot)
+            query = list_query(SNAPSHOT_LIST, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query['criteria'].append(PayrollSnapshot.period_id == period_id)
+        rows, next_cursor = fetch_page(session, SNAPSHOT_LIST, query, fields)
+        response = jsonify(rows)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
+
+# Hours per employee and week - GET /reports/hours?start=YYYY-MM-DD&end=YYYY-MM-DD&employee_id=|manager_id=
+def get_hours_report():
+    """Closed weeks are read from payroll snapshots, open weeks summed from daily logs."""
+    session = get_session()
+    try:
+        try:
+            args = schemas.load(schemas.HOURS_REPORT, request.args)
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        start, end = args['start'], args['end']
+        if end < start:
+            return jsonify({'error': 'end must not be before start.'}), 400
+        employee_id = args.get('employee_id')
+        manager_id = args.get('manager_id')
+
+        employee_ids = None
+        if employee_id is not None or manager_id is not None:
+            for emp_id in (employee_id, manager_id):
+                if emp_id is not None and not session.query(Employee.id).filter_by(id=emp_id).first():
+                    return jsonify({'error': f'Employee {emp_id} not found.'}), 404
+            employee_ids = {employee_id} if employee_id is not None else set()
+            if manager_id is not None:
+                team = _team_cte(manager_id, _MAX_TEAM_DEPTH)
+                employee_ids.update(session.execute(select(team.c.id)).scalars())
+
+        rows, periods = payroll.hours_report(session, start, end, employee_ids)
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'closed_periods': [{'id': p.id, 'start_date': p.start_date.isoformat(), 'end_date': p.end_date.isoformat()}
+                               for p in periods],
+            'rows': [{**row, 'week_starting': row['week_starting'].isoformat()} for row in rows],
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
@@ -0,0 +1,50 @@
+from flask import request, jsonify
+from config.config import SYNC_PAGE_SIZE, SYNC_MAX_PAGE_SIZE
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils import change_log
+
+# Rows changed since a token - GET /sync?since=<token>&limit=
+def get_sync():
+    """Delta sync for employees, timesheets and daily logs.
+
+    Without `since` the response only carries the current token: take it,
+    download the full lists once, then keep calling with the latest token
+    (re-applying a change the lists already had is harmless). Follow
+    `has_more` until it is false.
+    """
+    session = get_session()
+    try:
+        try:
+            limit = int(request.args.get('limit', SYNC_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer.'}), 400
+        if not 1 <= limit <= SYNC_MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {SYNC_MAX_PAGE_SIZE}.'}), 400
+
+        since = request.args.get('since')
+        if not since:
+            return jsonify({
+                'changes': {},
+                'token': change_log.encode_token(change_log.head(session)),
+                'has_more': False,
+                'full_sync_required': True
+            }), 200
+
+        try:
+            position = change_log.decode_token(since)
+        except ValueError:
+            return jsonify({'error': 'Invalid since token.'}), 400
+        if not change_log.is_retained(session, position):
+            return jsonify({'error': 'This token is older than the retained change log; sync from scratch.'}), 410
+
+        changes, position, has_more = change_log.read_changes(session, position, limit)
+        return jsonify({
+            'changes': changes,
+            'token': change_log.encode_token(position),
+            'has_more': has_more
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
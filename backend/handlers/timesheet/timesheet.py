@@ -1,95 +1,151 @@
 from flask import request, jsonify
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm.exc import StaleDataError
 from models.timesheet import Timesheet
 from models.employee import Employee
 from utils.session_manager import get_session
-from utils.helpers import safe_close
-from datetime import datetime
+from utils.helpers import safe_close, version_conflict
+from utils.projection import requested_fields, projected_rows, projected_row, pick
+from utils.listing import list_query, fetch_page, parse_date
+from utils import archive, events, payroll, schemas
+
+# Filters and sorts accepted by GET /timesheets
+TIMESHEET_LIST = {
+    'model': Timesheet,
+    'filters': {
+        'employee_id': (int, ('eq',)),
+        'week_starting': (parse_date, ('eq', 'gte', 'lte')),
+    },
+    'sorts': {'id': int, 'week_starting': parse_date},
+    'default_sort': 'id',
+}
+
+def get_or_create_timesheet(session, employee_id, week_starting_date):
+    """Return (timesheet, created) for an employee/week without a check-then-insert race.
+
+    Relies on INSERT ... ON CONFLICT DO NOTHING against uq_employee_week, so
+    concurrent callers for the same week all end up with the same row.
+    Raises payroll.PeriodClosedError when creating one in a closed period.
+    """
+    stmt = insert(Timesheet.__table__).values(
+        employee_id=employee_id,
+        week_starting=week_starting_date
+    ).on_conflict_do_nothing(constraint='uq_employee_week').returning(Timesheet.__table__.c.id)
+    new_id = session.execute(stmt).scalar()
+    if new_id is not None:
+        # A Core insert, so the payroll flush guard does not see it either
+        payroll.guard_writes(session, [week_starting_date])
+        # Likewise for the live feed's flush hook
+        events.record(session, {'type': 'timesheet', 'action': 'created', 'id': new_id,
+                                'employee_id': employee_id, 'version': 1})
+        return session.query(Timesheet).get(new_id), True
+    ts = session.query(Timesheet).filter_by(employee_id=employee_id, week_starting=week_starting_date).one()
+    return ts, False
 
 # Create a timesheet - POST /timesheets
 def create_timesheet():
     session = get_session()
     try:
-        data = request.get_json()
-        employee_name = data.get("employee_name")
-        week_starting = data.get("week_starting")
-
-        if not employee_name or not week_starting:
-            return jsonify({"error": "employee_name and week_starting are required"}), 400
-
         try:
-            week_starting_date = datetime.strptime(week_starting, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid week_starting format. Use YYYY-MM-DD."}), 400
+            data = schemas.load(schemas.TIMESHEET_CREATE, request.get_json())
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        employee_name = data["employee_name"]
+        week_starting_date = data["week_starting"]
 
         employee = session.query(Employee).filter(Employee.employee_name.ilike(employee_name)).first()
         if not employee:
             return jsonify({"error": "Employee not found"}), 404
 
-        # --- Check for existing timesheet ---
-        existing_ts = session.query(Timesheet).filter_by(
-            employee_id=employee.id,
-            week_starting=week_starting_date
-        ).first()
-        if existing_ts:
-            return jsonify(existing_ts.as_dict()), 200  # Already exists, return it
-
-        # --- Create new timesheet ---
-        new_ts = Timesheet(employee_id=employee.id, week_starting=week_starting_date)
-        session.add(new_ts)
+        # --- Get or create atomically; existing timesheets are returned as-is ---
+        ts, created = get_or_create_timesheet(session, employee.id, week_starting_date)
         session.commit()
-        return jsonify(new_ts.as_dict()), 201
+        return jsonify(ts.as_dict()), 201 if created else 200
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
     except Exception as e:
         session.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get all timesheets - GET /timesheets
+# List timesheets - GET /timesheets?employee_id=&week_starting[gte]=&sort=-week_starting&limit=&cursor=&fields=
 def get_timesheets():
+    """One page of timesheets; X-Next-Cursor carries the cursor for the next page."""
     session = get_session()
     try:
-        timesheets = session.query(Timesheet).all()
-        return jsonify([ts.as_dict() for ts in timesheets]), 200
+        try:
+            fields = requested_fields(Timesheet)
+            query = list_query(TIMESHEET_LIST, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        rows, next_cursor = fetch_page(session, TIMESHEET_LIST, query, fields)
+        response = jsonify(rows)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get timesheet by ID - GET /timesheets/<id>
+# Get timesheet by ID - GET /timesheets/<id>?fields=
 def get_timesheet(ts_id):
     session = get_session()
     try:
-        ts = session.query(Timesheet).get(ts_id)
+        try:
+            fields = requested_fields(Timesheet)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields:
+            ts = projected_row(session, Timesheet, fields, Timesheet.id == ts_id)
+        else:
+            ts = session.query(Timesheet).get(ts_id)
+            ts = ts.as_dict() if ts else None
         if not ts:
+            archived = archive.find_timesheet_by_id(ts_id)
+            if archived:
+                return jsonify(pick(archived, fields)), 200
             return jsonify({"error": "Timesheet not found"}), 404
-        return jsonify(ts.as_dict()), 200
+        return jsonify(ts), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get timesheets by week - GET /timesheets-by-week?week_starting=YYYY-MM-DD
+# Get timesheets by week - GET /timesheets-by-week?week_starting=YYYY-MM-DD&fields=
 def get_timesheets_by_week():
     session = get_session()
     try:
-        week_starting = request.args.get("week_starting")
-        if not week_starting:
-            return jsonify({"error": "week_starting query param required"}), 400
         try:
-            week_starting_date = datetime.strptime(week_starting, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid week_starting format. Use YYYY-MM-DD."}), 400
-        timesheets = session.query(Timesheet).filter_by(week_starting=week_starting_date).all()
-        return jsonify([ts.as_dict() for ts in timesheets]), 200
+            fields = requested_fields(Timesheet)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            week_starting_date = schemas.load(schemas.TIMESHEET_WEEK, request.args)["week_starting"]
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        if fields:
+            result = projected_rows(session, Timesheet, fields, Timesheet.week_starting == week_starting_date)
+        else:
+            result = [ts.as_dict() for ts in session.query(Timesheet).filter_by(week_starting=week_starting_date)]
+        if archive.is_outside_hot_window(week_starting_date):
+            result.extend(pick(ts, fields) for ts in archive.find_timesheets_by_week(week_starting_date))
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get timesheets by employee name - GET /timesheets/by-employee-name?employee_name=John Doe
+# Get timesheets by employee name - GET /timesheets/by-employee-name?employee_name=John Doe&fields=
 def get_timesheets_by_employee_name():
     session = get_session()
     try:
+        try:
+            fields = requested_fields(Timesheet)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         employee_name = request.args.get("employee_name")
         if not employee_name:
             return jsonify({"error": "employee_name query param required"}), 400
@@ -98,36 +154,50 @@ def get_timesheets_by_employee_name():
         if not employee:
             return jsonify({"error": "Employee not found"}), 404
 
-        timesheets = session.query(Timesheet).filter_by(employee_id=employee.id).all()
-        return jsonify([ts.as_dict() for ts in timesheets]), 200
+        if fields:
+            result = projected_rows(session, Timesheet, fields, Timesheet.employee_id == employee.id)
+        else:
+            result = [ts.as_dict() for ts in session.query(Timesheet).filter_by(employee_id=employee.id)]
+        result.extend(pick(ts, fields) for ts in archive.find_timesheets_by_employee(employee.id))
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
         safe_close(session)
 
-# Get timesheet by employee name and week - GET /timesheets/by-employee-name-week?employee_name=John Doe&week_starting=YYYY-MM-DD
+# Get timesheet by employee name and week - GET /timesheets/by-employee-name-week?employee_name=John Doe&week_starting=YYYY-MM-DD&fields=
 def get_timesheet_by_employee_name_and_week():
     session = get_session()
     try:
-        employee_name = request.args.get("employee_name")
-        week_starting = request.args.get("week_starting")
-        if not employee_name or not week_starting:
-            return jsonify({"error": "employee_name and week_starting query params required"}), 400
-
         try:
-            week_starting_date = datetime.strptime(week_starting, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid week_starting format. Use YYYY-MM-DD."}), 400
+            fields = requested_fields(Timesheet)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            key = schemas.load(schemas.TIMESHEET_KEY, request.args)
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        employee_name = key["employee_name"]
+        week_starting_date = key["week_starting"]
 
         employee = session.query(Employee).filter(Employee.employee_name.ilike(employee_name)).first()
         if not employee:
             return jsonify({"error": "Employee not found"}), 404
 
-        ts = session.query(Timesheet).filter_by(employee_id=employee.id, week_starting=week_starting_date).first()
+        if fields:
+            ts = projected_row(session, Timesheet, fields,
+                               Timesheet.employee_id == employee.id, Timesheet.week_starting == week_starting_date)
+        else:
+            ts = session.query(Timesheet).filter_by(employee_id=employee.id, week_starting=week_starting_date).first()
+            ts = ts.as_dict() if ts else None
         if not ts:
+            if archive.is_outside_hot_window(week_starting_date):
+                archived = archive.find_timesheet(employee.id, week_starting_date)
+                if archived:
+                    return jsonify(pick(archived, fields)), 200
             return jsonify({"error": "Timesheet not found"}), 404
 
-        return jsonify(ts.as_dict()), 200
+        return jsonify(ts), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -137,19 +207,13 @@ def get_timesheet_by_employee_name_and_week():
 def update_timesheet_by_employee_name_and_week():
     session = get_session()
     try:
-        data = request.get_json()
-        employee_name = data.get("employee_name")
-        week_starting = data.get("week_starting")
-        new_week_starting = data.get("new_week_starting")
-
-        if not employee_name or not week_starting or not new_week_starting:
-            return jsonify({"error": "employee_name, week_starting, and new_week_starting are required"}), 400
-
         try:
-            week_starting_date = datetime.strptime(week_starting, '%Y-%m-%d').date()
-            new_week_starting_date = datetime.strptime(new_week_starting, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+            data = schemas.load(schemas.TIMESHEET_UPDATE, request.get_json())
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        employee_name = data["employee_name"]
+        week_starting_date = data["week_starting"]
+        new_week_starting_date = data["new_week_starting"]
 
         employee = session.query(Employee).filter(Employee.employee_name.ilike(employee_name)).first()
         if not employee:
@@ -158,10 +222,21 @@ def update_timesheet_by_employee_name_and_week():
         ts = session.query(Timesheet).filter_by(employee_id=employee.id, week_starting=week_starting_date).first()
         if not ts:
             return jsonify({"error": "Timesheet not found"}), 404
+        ts_id = ts.id
+
+        version = data.get('version')
+        if version is not None and version != ts.version:
+            return version_conflict(ts)
 
         ts.week_starting = new_week_starting_date
         session.commit()
         return jsonify(ts.as_dict()), 200
+    except StaleDataError:
+        session.rollback()
+        return version_conflict(session.get(Timesheet, ts_id))
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
     except Exception as e:
         session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -172,15 +247,12 @@ def update_timesheet_by_employee_name_and_week():
 def delete_timesheet_by_employee_name_and_week():
     session = get_session()
     try:
-        employee_name = request.args.get("employee_name")
-        week_starting = request.args.get("week_starting")
-        if not employee_name or not week_starting:
-            return jsonify({"error": "employee_name and week_starting query params required"}), 400
-
         try:
-            week_starting_date = datetime.strptime(week_starting, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid week_starting format. Use YYYY-MM-DD."}), 400
+            key = schemas.load(schemas.TIMESHEET_KEY, request.args)
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        employee_name = key["employee_name"]
+        week_starting_date = key["week_starting"]
 
         employee = session.query(Employee).filter(Employee.employee_name.ilike(employee_name)).first()
         if not employee:
@@ -190,9 +262,16 @@ def delete_timesheet_by_employee_name_and_week():
         if not ts:
             return jsonify({"error": "Timesheet not found"}), 404
 
+        ts_id = ts.id
         session.delete(ts)
         session.commit()
         return jsonify({"message": "Timesheet deleted successfully."}), 200
+    except StaleDataError:
+        session.rollback()
+        return version_conflict(session.get(Timesheet, ts_id))
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
     except Exception as e:
         session.rollback()
         return jsonify({'error': str(e)}), 500
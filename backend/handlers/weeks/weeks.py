@@ -0,0 +1,215 @@
+from datetime import timedelta
+from flask import request, jsonify
+from sqlalchemy import func, select, literal
+from sqlalchemy.orm import undefer
+from models.employee import Employee
+from models.employee_closure import EmployeeClosure
+from models.timesheet import Timesheet
+from models.dailylogs import DailyLog
+from models.dailylogschanges import DailyLogChange
+from handlers.timesheet.timesheet import get_or_create_timesheet
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils import archive, employee_closure, payroll, schemas
+
+def _archived_week_view(employee_id, week_starting_date, include_changes):
+    """Same payload as get_week_view, served from the cold archive."""
+    timesheet = archive.find_timesheet(employee_id, week_starting_date)
+    if not timesheet:
+        return None
+    logs = archive.find_daily_logs(timesheet['id'])
+    changes = archive.find_log_changes([log['id'] for log in logs], archive.archived_month(timesheet['id']))
+    changes_by_log = {}
+    for ch in sorted(changes, key=lambda c: c['changed_at']):
+        changes_by_log.setdefault(ch['daily_log_id'], []).append(ch)
+    for log in logs:
+        log['change_count'] = len(changes_by_log.get(log['id'], []))
+        log['has_changes'] = log['change_count'] > 0
+        if include_changes:
+            log['changes'] = changes_by_log.get(log['id'], [])
+    return {'timesheet': timesheet, 'created': False, 'archived': True, 'daily_logs': logs}
+
+def week_logs_query(session, ts_id, week_starting_date):
+    """A timesheet's logs with their change counts, for get_week_view.
+
+    The count is a correlated subquery rather than a GROUP BY over the
+    logs, which Postgres rejects once daily_logs has the composite
+    (id, log_date) key of PARTITION_LOGS; the log_date bound lets it skip
+    every other month's partition.
+    """
+    change_count = select(func.count(DailyLogChange.id)) \
+        .where(DailyLogChange.daily_log_id == DailyLog.id) \
+        .correlate(DailyLog) \
+        .scalar_subquery()
+    return session.query(DailyLog, change_count) \
+        .options(undefer(DailyLog.description)) \
+        .filter(DailyLog.timesheet_id == ts_id,
+                DailyLog.log_date.between(week_starting_date, week_starting_date + timedelta(days=6))) \
+        .order_by(DailyLog.log_date)
+
+# Get the whole week view - GET /weeks/<employee_id>/<week_starting>?include_changes=true
+def get_week_view(employee_id, week_starting):
+    session = get_session()
+    try:
+        try:
+            week_starting_date = schemas.load(schemas.TIMESHEET_WEEK, {'week_starting': week_starting})['week_starting']
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        include_changes = request.args.get('include_changes', '').lower() in ('1', 'true', 'yes')
+
+        if not session.query(Employee.id).filter_by(id=employee_id).first():
+            return jsonify({"error": "Employee not found"}), 404
+
+        if archive.is_outside_hot_window(week_starting_date):
+            archived_view = _archived_week_view(employee_id, week_starting_date, include_changes)
+            if archived_view:
+                return jsonify(archived_view), 200
+
+        ts, created = get_or_create_timesheet(session, employee_id, week_starting_date)
+
+        # Logs and their change counts in a single query
+        rows = week_logs_query(session, ts.id, week_starting_date).all()
+
+        logs = []
+        for log, change_count in rows:
+            log_data = log.as_dict()
+            log_data['change_count'] = change_count
+            log_data['has_changes'] = change_count > 0
+            logs.append(log_data)
+
+        if include_changes:
+            log_ids = [log['id'] for log in logs if log['has_changes']]
+            changes_by_log = {log_id: [] for log_id in log_ids}
+            if log_ids:
+                changes = session.query(DailyLogChange) \
+                    .options(undefer(DailyLogChange.new_description)) \
+                    .filter(DailyLogChange.daily_log_id.in_(log_ids)) \
+                    .order_by(DailyLogChange.changed_at) \
+                    .all()
+                for ch in changes:
+                    changes_by_log[ch.daily_log_id].append(ch.as_dict())
+            for log in logs:
+                log['changes'] = changes_by_log.get(log['id'], [])
+
+        timesheet = ts.as_dict()
+        session.commit()
+        return jsonify({
+            'timesheet': timesheet,
+            'created': created,
+            'daily_logs': logs
+        }), 201 if created else 200
+    except payroll.PeriodClosedError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 423
+    except Exception as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
+
+
+# Upper bound for depth so a reports_to cycle cannot recurse forever
+_MAX_TEAM_DEPTH = 50
+
+_TEAM_LOG_COLUMNS = [
+    'id', 'timesheet_id', 'log_date', 'day_of_week', 'morning_in', 'morning_out',
+    'afternoon_in', 'afternoon_out', 'total_hours', 'description', 'version'
+]
+
+
+def _team_cte(manager_id, max_depth):
+    """Everyone below manager_id down to max_depth levels, with their depth."""
+    if employee_closure.enabled():
+        closure = EmployeeClosure.__table__
+        return select(closure.c.descendant_id.label('id'), closure.c.depth) \
+            .where(closure.c.ancestor_id == manager_id, closure.c.depth.between(1, max_depth)) \
+            .cte(name='team')
+    employees = Employee.__table__
+    team = select(employees.c.id, literal(1).label('depth')) \
+        .where(employees.c.reports_to == manager_id) \
+        .cte(name='team', recursive=True)
+    return team.union_all(
+        select(employees.c.id, (team.c.depth + 1).label('depth'))
+        .join(team, employees.c.reports_to == team.c.id)
+        .where(team.c.depth < max_depth)
+    )
+
+
+def team_logs_statement(team, week_starting_date):
+    """Daily logs of the team's timesheets for the week, with the employee id.
+
+    Bounded on log_date too, so a partitioned daily_logs is read from the
+    week's month(s) only.
+    """
+    timesheets = Timesheet.__table__
+    logs = DailyLog.__table__
+    return select(*[logs.c[name] for name in _TEAM_LOG_COLUMNS], timesheets.c.employee_id) \
+        .select_from(team) \
+        .join(timesheets, (timesheets.c.employee_id == team.c.id)
+              & (timesheets.c.week_starting == week_starting_date)) \
+        .join(logs, (logs.c.timesheet_id == timesheets.c.id)
+              & logs.c.log_date.between(week_starting_date, week_starting_date + timedelta(days=6))) \
+        .order_by(timesheets.c.employee_id, logs.c.log_date)
+
+
+def _columnar(rows, columns):
+    """Rows as {column: [values]}; dates and times become ISO strings."""
+    data = {}
+    values_by_column = list(zip(*rows)) if rows else [()] * len(columns)
+    for name, values in zip(columns, values_by_column):
+        sample = next((v for v in values if v is not None), None)
+        if hasattr(sample, 'isoformat'):
+            data[name] = [v.isoformat() if v is not None else None for v in values]
+        else:
+            data[name] = list(values)
+    return data
+
+# Whole team's week in one call - GET /employees/<id>/team-week?week_starting=YYYY-MM-DD&depth=
+def get_team_week(employee_id):
+    session = get_session()
+    try:
+        try:
+            args = schemas.load(schemas.TEAM_WEEK, request.args)
+        except schemas.SchemaError as e:
+            return schemas.schema_error(e)
+        week_starting_date = args['week_starting']
+        depth = args.get('depth')
+        if depth is None:
+            depth = _MAX_TEAM_DEPTH
+        elif not 1 <= depth <= _MAX_TEAM_DEPTH:
+            return jsonify({"error": f"depth must be an integer between 1 and {_MAX_TEAM_DEPTH}."}), 400
+
+        if not session.query(Employee.id).filter_by(id=employee_id).first():
+            return jsonify({"error": "Employee not found"}), 404
+
+        employees = Employee.__table__
+        timesheets = Timesheet.__table__
+        team = _team_cte(employee_id, depth)
+
+        # Members and their timesheet for the week (if any)
+        member_rows = session.execute(
+            select(employees.c.id, employees.c.employee_name, employees.c.email,
+                   employees.c.reports_to, team.c.depth, timesheets.c.id, timesheets.c.version)
+            .select_from(team)
+            .join(employees, employees.c.id == team.c.id)
+            .outerjoin(timesheets, (timesheets.c.employee_id == team.c.id)
+                       & (timesheets.c.week_starting == week_starting_date))
+            .order_by(team.c.depth, employees.c.id)
+        ).all()
+
+        # Their logs for the week, one indexed lookup per timesheet
+        log_rows = session.execute(team_logs_statement(team, week_starting_date)).all()
+
+        return jsonify({
+            'manager_id': employee_id,
+            'week_starting': week_starting_date.isoformat(),
+            'depth': depth,
+            'employees': _columnar(member_rows, [
+                'id', 'employee_name', 'email', 'reports_to', 'depth', 'timesheet_id', 'timesheet_version'
+            ]),
+            'daily_logs': _columnar(log_rows, _TEAM_LOG_COLUMNS + ['employee_id'])
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        safe_close(session)
@@ -0,0 +1,87 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, text
+from sqlalchemy.sql import func
+from models.base import Base
+
+# Tables whose writes are recorded for /api/sync
+SYNC_TABLES = ('employees', 'timesheets', 'daily_logs')
+
+# -----------------------------
+# ChangeLog Table
+# -----------------------------
+class ChangeLog(Base):
+    """One row per written or deleted row of a SYNC_TABLES table, filled by triggers.
+
+    txid is the writing transaction's id (0 on SQLite, which has a single
+    writer); sync reads in (txid, seq) order so a late commit can never be
+    skipped past.
+    """
+    __tablename__ = 'change_log'
+
+    seq = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    txid = Column(BigInteger, nullable=False)
+    table_name = Column(String(32), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    action = Column(String(6), nullable=False)  # upsert | delete
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_change_log_txid_seq', 'txid', 'seq'),
+    )
+
+    def as_dict(self):
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+
+
+def _postgres_trigger_ddl(table, prefix):
+    # Statement-level with transition tables: a bulk UPDATE logs its rows in one INSERT
+    statements = []
+    for event, transition, rows in (('INSERT', 'NEW', 'new_rows'), ('UPDATE', 'NEW', 'new_rows'), ('DELETE', 'OLD', 'old_rows')):
+        name = f"tms_{table}_{event.lower()}_changes"
+        statements.append(f'DROP TRIGGER IF EXISTS {name} ON {prefix}{table}')
+        statements.append(
+            f'CREATE TRIGGER {name} AFTER {event} ON {prefix}{table} '
+            f'REFERENCING {transition} TABLE AS {rows} '
+            f'FOR EACH STATEMENT EXECUTE FUNCTION {prefix}tms_record_changes()'
+        )
+    return statements
+
+
+def _sqlite_trigger_ddl(table):
+    statements = []
+    for event, row, action in (('INSERT', 'NEW', 'upsert'), ('UPDATE', 'NEW', 'upsert'), ('DELETE', 'OLD', 'delete')):
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS tms_{table}_{event.lower()}_changes AFTER {event} ON {table} "
+            f"BEGIN INSERT INTO change_log (txid, table_name, row_id, action) "
+            f"VALUES (0, '{table}', {row}.id, '{action}'); END"
+        )
+    return statements
+
+
+def install_change_triggers(conn, schema=None):
+    """Create (or replace) the triggers that fill change_log for SYNC_TABLES.
+
+    With schema, the function and triggers are created in that schema and
+    write to its own change_log.
+    """
+    if conn.dialect.name == 'sqlite':
+        for table in SYNC_TABLES:
+            for statement in _sqlite_trigger_ddl(table):
+                conn.execute(text(statement))
+        return
+    prefix = f'"{schema}".' if schema else ''
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {prefix}tms_record_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO {prefix}change_log (txid, table_name, row_id, action)
+                SELECT txid_current(), TG_TABLE_NAME, id, 'delete' FROM old_rows;
+            ELSE
+                INSERT INTO {prefix}change_log (txid, table_name, row_id, action)
+                SELECT txid_current(), TG_TABLE_NAME, id, 'upsert' FROM new_rows;
+            END IF;
+            RETURN NULL;
+        END $$
+    """))
+    for table in SYNC_TABLES:
+        for statement in _postgres_trigger_ddl(table, prefix):
+            conn.execute(text(statement))
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, Date, String, Time, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Date, String, Time, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship, deferred
 
 from models.base import Base
+from config.config import PARTITION_LOGS
 from models.dailylogschanges import DailyLogChange  # <-- Add this line
 
 class DailyLog(Base):
@@ -9,24 +10,43 @@ class DailyLog(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     timesheet_id = Column(Integer, ForeignKey('timesheets.id', ondelete="CASCADE"), nullable=False)
-    log_date = Column(Date, nullable=False)
+    # Partitioned tables must include the partition key in the primary key
+    log_date = Column(Date, nullable=False, primary_key=PARTITION_LOGS)
     day_of_week = Column(String(10))
     morning_in = Column(Time)
     morning_out = Column(Time)
     afternoon_in = Column(Time)
     afternoon_out = Column(Time)
     total_hours = Column(Time)
-    description = Column(Text)
+    # Largest column; loaded on first access unless a query undefers it
+    description = deferred(Column(Text))
+    # Bumped by the ORM on every UPDATE; a stale write matches no row
+    version = Column(Integer, nullable=False, server_default='1')
+
+    if PARTITION_LOGS:
+        __table_args__ = (
+            Index('ix_daily_logs_timesheet_date', 'timesheet_id', 'log_date'),
+            {'postgresql_partition_by': 'RANGE (log_date)'},
+        )
+        # Rows are still identified by id alone in the ORM
+        __mapper_args__ = {'primary_key': [id], 'version_id_col': version}
+    else:
+        __table_args__ = (
+            Index('ix_daily_logs_timesheet_date', 'timesheet_id', 'log_date'),
+        )
+        __mapper_args__ = {'version_id_col': version}
 
     # Relationship to Timesheet
     timesheet = relationship('Timesheet', back_populates='daily_logs')
 
     # Relationship to DailyLogChange
+    # Without a foreign key (partitioned mode) the ORM must delete changes itself
     changes = relationship(
         'DailyLogChange',
         back_populates='daily_log',
+        primaryjoin='DailyLog.id == foreign(DailyLogChange.daily_log_id)',
         cascade="all, delete-orphan",
-        passive_deletes=True
+        passive_deletes=not PARTITION_LOGS
     )
 
     def as_dict(self):
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, deferred
 from models.base import Base
 from sqlalchemy.sql import func
+from config.config import PARTITION_LOGS
 
 # -----------------------------
 # DailyLogChange Table
@@ -10,12 +11,35 @@ class DailyLogChange(Base):
     __tablename__ = 'daily_log_changes'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    daily_log_id = Column(Integer, ForeignKey('daily_logs.id', ondelete="CASCADE"), nullable=False)
-    new_description = Column(Text, nullable=False)
-    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+    if PARTITION_LOGS:
+        # Postgres cannot reference daily_logs.id alone once daily_logs is partitioned
+        daily_log_id = Column(Integer, nullable=False)
+    else:
+        daily_log_id = Column(Integer, ForeignKey('daily_logs.id', ondelete="CASCADE"), nullable=False)
+    # Loaded on first access unless a query undefers it
+    new_description = deferred(Column(Text, nullable=False))
+    changed_at = Column(DateTime, nullable=False, server_default=func.now(), primary_key=PARTITION_LOGS)
+
+    if PARTITION_LOGS:
+        __table_args__ = (
+            Index('ix_daily_log_changes_daily_log_id', 'daily_log_id'),
+            Index('ix_daily_log_changes_changed_at', 'changed_at', 'id'),
+            {'postgresql_partition_by': 'RANGE (changed_at)'},
+        )
+        __mapper_args__ = {'primary_key': [id]}
+    else:
+        __table_args__ = (
+            Index('ix_daily_log_changes_daily_log_id', 'daily_log_id'),
+            # changed_at filters and keyset pages sorted by changed_at
+            Index('ix_daily_log_changes_changed_at', 'changed_at', 'id'),
+        )
 
     # Relationship to DailyLog
-    daily_log = relationship('DailyLog', back_populates='changes')
+    daily_log = relationship(
+        'DailyLog',
+        back_populates='changes',
+        primaryjoin='DailyLog.id == foreign(DailyLogChange.daily_log_id)'
+    )
 
     def as_dict(self):
         return {column.name: getattr(self, column.name) for column in self.__table__.columns}
\ No newline at end of file
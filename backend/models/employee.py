@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from models.base import Base
 
@@ -10,8 +10,13 @@ class Employee(Base):
     email = Column(String(100), nullable=False, unique=True)
     reports_to = Column(Integer, ForeignKey('employees.id', ondelete="SET NULL"), nullable=True)
 
+    # Walking the org chart downwards (recursive CTEs) looks employees up by manager
+    __table_args__ = (
+        Index('ix_employees_reports_to', 'reports_to'),
+    )
+
     # Self-referencing relationship: manager and subordinates
-    manager = relationship('Employee', remote_side=[id], backref=backref('subordinates', lazy='dynamic'))
+    manager = relationship('Employee', remote_side=[id], backref=backref('subordinates', lazy='dynamic', passive_deletes=True))
 
     # Relationship to Timesheet
     timesheets = relationship(
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from models.base import Base
+
+# -----------------------------
+# EmployeeClosure Table
+# -----------------------------
+class EmployeeClosure(Base):
+    """One row per (ancestor, descendant) pair in the org chart.
+
+    Every employee is its own ancestor at depth 0; a direct report is at
+    depth 1, their reports at depth 2, and so on.
+    """
+    __tablename__ = 'employee_closure'
+
+    # The primary key doubles as the "everyone under X" index
+    ancestor_id = Column(Integer, ForeignKey('employees.id', ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey('employees.id', ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # "Everyone above X", nearest first
+        Index('ix_employee_closure_descendant_depth', 'descendant_id', 'depth'),
+    )
+
+    def as_dict(self):
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
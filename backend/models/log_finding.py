@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, ForeignKey, Index
+from sqlalchemy.sql import func
+from models.base import Base
+
+# -----------------------------
+# LogFinding Table
+# -----------------------------
+class LogFinding(Base):
+    """One rule hit from the daily-log analytics run (utils/log_analytics.py).
+
+    Per-day rules point at a daily log; weekly_overtime points at the
+    timesheet only, with log_date and daily_log_id left empty. hours is the
+    measured value the rule tripped on (worked hours, or the punch time).
+    Timesheet and log ids carry no foreign key so archiving or
+    partitioning those tables does not touch findings.
+    """
+    __tablename__ = 'log_findings'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    employee_id = Column(Integer, ForeignKey('employees.id', ondelete="CASCADE"), nullable=False)
+    timesheet_id = Column(Integer, nullable=False)
+    daily_log_id = Column(Integer)
+    week_starting = Column(Date, nullable=False)
+    log_date = Column(Date)
+    rule = Column(String(24), nullable=False)
+    hours = Column(Float)
+    detected_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_log_findings_employee_week', 'employee_id', 'week_starting', 'id'),
+        # Re-runs replace a week range; also serves company-wide date filters
+        Index('ix_log_findings_week', 'week_starting', 'id'),
+    )
+
+    def as_dict(self):
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
@@ -0,0 +1,59 @@
+from datetime import date
+from sqlalchemy import text
+
+# Tables that are range partitioned by month, and their partition key
+PARTITIONED_TABLES = {
+    'daily_logs': 'log_date',
+    'daily_log_changes': 'changed_at',
+}
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def add_months(d, months):
+    month = d.month - 1 + months
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def ensure_partitions(conn, table, first_month, last_month):
+    """Create monthly partitions of table covering first_month..last_month.
+
+    Also makes sure a DEFAULT partition exists so out-of-range rows are not
+    rejected. Returns the names of partitions that were created.
+    """
+    created = []
+    default = f"{table}_default"
+    key = PARTITIONED_TABLES[table]
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(table, month)
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar()
+        if not exists:
+            bounds = {'start': month, 'end': add_months(month, 1)}
+            in_default = conn.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {key} >= :start AND {key} < :end)"
+            ), bounds).scalar()
+            create = (f"CREATE TABLE {name} PARTITION OF {table} "
+                      f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+            if in_default:
+                # Postgres refuses a partition whose rows already sit in the
+                # default one: detach it, create the month, move the rows over
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+                conn.execute(text(create))
+                conn.execute(text(
+                    f"INSERT INTO {table} SELECT * FROM {default} WHERE {key} >= :start AND {key} < :end"
+                ), bounds)
+                conn.execute(text(f"DELETE FROM {default} WHERE {key} >= :start AND {key} < :end"), bounds)
+                conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+            else:
+                conn.execute(text(create))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
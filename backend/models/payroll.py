@@ -0,0 +1,77 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.sql import func
+from models.base import Base
+
+# -----------------------------
+# PayrollPeriod Table
+# -----------------------------
+class PayrollPeriod(Base):
+    """A closed payroll range: timesheets with week_starting in [start_date, end_date] are frozen."""
+    __tablename__ = 'payroll_periods'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    closed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_payroll_periods_range', 'start_date', 'end_date'),
+    )
+
+    def as_dict(self):
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+
+
+# -----------------------------
+# PayrollSnapshot Table
+# -----------------------------
+class PayrollSnapshot(Base):
+    """Per employee and week totals of a closed period, written once at close.
+
+    employee_id has no foreign key and the name is copied, so payroll
+    history outlives offboarding. UPDATE and DELETE are rejected by the
+    triggers from install_snapshot_guard.
+    """
+    __tablename__ = 'payroll_snapshots'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    period_id = Column(Integer, ForeignKey('payroll_periods.id'), nullable=False)
+    employee_id = Column(Integer, nullable=False)
+    employee_name = Column(String(100))
+    timesheet_id = Column(Integer, nullable=False)
+    week_starting = Column(Date, nullable=False)
+    days_logged = Column(Integer, nullable=False)
+    total_hours = Column(Float, nullable=False)
+
+    __table_args__ = (
+        # Periods never overlap, so an employee has one snapshot per week; also the report index
+        UniqueConstraint('employee_id', 'week_starting', name='uq_payroll_snapshot_employee_week'),
+        Index('ix_payroll_snapshots_period_week', 'period_id', 'week_starting'),
+    )
+
+    def as_dict(self):
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+
+
+def install_snapshot_guard(conn, schema=None):
+    """Create (or replace) the triggers that make payroll_snapshots insert-only."""
+    if conn.dialect.name == 'sqlite':
+        for event in ('UPDATE', 'DELETE'):
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS tms_payroll_snapshots_no_{event.lower()} "
+                f"BEFORE {event} ON payroll_snapshots "
+                f"BEGIN SELECT RAISE(ABORT, 'payroll snapshots are immutable'); END"
+            ))
+        return
+    prefix = f'"{schema}".' if schema else ''
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {prefix}tms_reject_snapshot_change() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            RAISE EXCEPTION 'payroll snapshots are immutable';
+        END $$
+    """))
+    conn.execute(text(f'DROP TRIGGER IF EXISTS tms_payroll_snapshots_immutable ON {prefix}payroll_snapshots'))
+    conn.execute(text(
+        f'CREATE TRIGGER tms_payroll_snapshots_immutable BEFORE UPDATE OR DELETE ON {prefix}payroll_snapshots '
+        f'FOR EACH STATEMENT EXECUTE FUNCTION {prefix}tms_reject_snapshot_change()'
+    ))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey,UniqueConstraint 
+from sqlalchemy import Column, Integer, Date, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 
@@ -8,11 +8,16 @@ class Timesheet(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     employee_id = Column(Integer, ForeignKey('employees.id', ondelete="CASCADE"), nullable=False)
     week_starting = Column(Date, nullable=False)
+    # Bumped by the ORM on every UPDATE; a stale write matches no row
+    version = Column(Integer, nullable=False, server_default='1')
 
         # Ensure each employee can only have one timesheet per week_starting
     __table_args__ = (
         UniqueConstraint('employee_id', 'week_starting', name='uq_employee_week'),
+        # Week filters and keyset pages sorted by week_starting (uq_employee_week covers per-employee ones)
+        Index('ix_timesheets_week_starting', 'week_starting', 'id'),
     )
+    __mapper_args__ = {'version_id_col': version}
 
     # Relationship to Employee
     employee = relationship('Employee', back_populates='timesheets')
@@ -0,0 +1,109 @@
+from importlib import import_module
+from flask import Blueprint
+
+
+class LazyView:
+    """View that imports its handler on first call instead of at startup."""
+
+    def __init__(self, import_name):
+        self.import_name = import_name
+        self.__name__ = import_name.rsplit('.', 1)[-1]
+        self._view = None
+
+    def __call__(self, *args, **kwargs):
+        if self._view is None:
+            module_name, func_name = self.import_name.rsplit('.', 1)
+            self._view = getattr(import_module(module_name), func_name)
+        return self._view(*args, **kwargs)
+
+
+# (rule, endpoint, handler, methods) per blueprint
+ROUTES = {
+    'employees': [
+        ('/api/employees', 'add_employee', 'handlers.employee.employees.create_employee', ['POST']),
+        ('/api/employees', 'list_employees', 'handlers.employee.employees.get_employees', ['GET']),
+        ('/api/employees/update-by-email', 'update_employee_by_email', 'handlers.employee.employees.update_employee_by_email', ['PUT']),
+        ('/api/employees/delete-by-email', 'delete_employee_by_email', 'handlers.employee.employees.delete_employee_by_email', ['DELETE']),
+        ('/api/employees/offboard', 'offboard_employees', 'handlers.employee.employees.offboard_employees_bulk', ['POST']),
+        ('/api/employees/bulk', 'import_employees', 'handlers.employee.employees.import_employees_bulk', ['POST']),
+        ('/api/employees/<int:manager_id>/subordinates', 'list_subordinates', 'handlers.employee.employees.get_subordinates', ['GET']),
+        ('/api/employees/without-manager', 'list_employees_without_manager', 'handlers.employee.employees.get_employees_without_manager', ['GET']),
+        ('/api/employees/<int:employee_id>/tree', 'employee_tree', 'handlers.employee.employees.get_employee_tree', ['GET']),
+        ('/api/employees/dashboard', 'employee_dashboard', 'handlers.employee.employees.get_employee_dashboard', ['GET']),
+        ('/api/employees/profile-with-hierarchy', 'employee_profile_with_hierarchy', 'handlers.employee.employees.get_employee_profile_with_hierarchy', ['GET']),
+    ],
+    'timesheets': [
+        ('/api/timesheets', 'add_timesheet', 'handlers.timesheet.timesheet.create_timesheet', ['POST']),
+        ('/api/timesheets', 'list_timesheets', 'handlers.timesheet.timesheet.get_timesheets', ['GET']),
+        ('/api/timesheets/<int:ts_id>', 'get_timesheet', 'handlers.timesheet.timesheet.get_timesheet', ['GET']),
+        ('/api/timesheets/by-employee-name', 'timesheets_by_employee_name', 'handlers.timesheet.timesheet.get_timesheets_by_employee_name', ['GET']),
+        ('/api/timesheets/by-employee-name-week', 'timesheet_by_employee_name_and_week', 'handlers.timesheet.timesheet.get_timesheet_by_employee_name_and_week', ['GET']),
+        ('/api/timesheets/by-employee-name-week', 'update_timesheet_by_employee_name_and_week', 'handlers.timesheet.timesheet.update_timesheet_by_employee_name_and_week', ['PUT']),
+        ('/api/timesheets/by-employee-name-week', 'delete_timesheet_by_employee_name_and_week', 'handlers.timesheet.timesheet.delete_timesheet_by_employee_name_and_week', ['DELETE']),
+        ('/api/timesheets-by-week', 'timesheets_by_week', 'handlers.timesheet.timesheet.get_timesheets_by_week', ['GET']),
+        ('/api/weeks/<int:employee_id>/<week_starting>', 'week_view', 'handlers.weeks.weeks.get_week_view', ['GET']),
+        ('/api/employees/<int:employee_id>/team-week', 'team_week', 'handlers.weeks.weeks.get_team_week', ['GET']),
+    ],
+    'daily_logs': [
+        ('/api/daily-logs', 'add_daily_log', 'handlers.dailylogs.dailylogs.create_daily_log', ['POST']),
+        ('/api/daily-logs', 'list_daily_logs', 'handlers.dailylogs.dailylogs.get_daily_logs', ['GET']),
+        ('/api/daily-logs/<int:log_id>', 'get_daily_log', 'handlers.dailylogs.dailylogs.get_daily_log', ['GET']),
+        ('/api/daily-logs/<int:log_id>', 'update_daily_log', 'handlers.dailylogs.dailylogs.update_daily_log', ['PUT']),
+        ('/api/daily-logs/<int:log_id>', 'delete_daily_log', 'handlers.dailylogs.dailylogs.delete_daily_log', ['DELETE']),
+        ('/api/timesheets/<int:timesheet_id>/daily-logs', 'logs_by_timesheet', 'handlers.dailylogs.dailylogs.get_daily_logs_by_timesheet', ['GET']),
+        ('/api/daily-logs/save', 'save_daily_logs', 'handlers.dailylogs.dailylogs.save_daily_logs', ['POST']),
+    ],
+    'log_changes': [
+        ('/api/daily-log-changes', 'add_log_change', 'handlers.dailylogschanges.dailylogschanges.add_log_change', ['POST']),
+        ('/api/daily-log-changes', 'list_log_changes', 'handlers.dailylogschanges.dailylogschanges.get_all_log_changes', ['GET']),
+        ('/api/daily-log-changes/<int:change_id>', 'get_log_change', 'handlers.dailylogschanges.dailylogschanges.get_log_change', ['GET']),
+        ('/api/daily-log-changes/<int:change_id>', 'update_log_change', 'handlers.dailylogschanges.dailylogschanges.update_log_change', ['PUT']),
+        ('/api/daily-log-changes/<int:change_id>', 'delete_log_change', 'handlers.dailylogschanges.dailylogschanges.delete_log_change', ['DELETE']),
+        ('/api/daily-logs/<int:daily_log_id>/changes', 'view_log_changes', 'handlers.dailylogschanges.dailylogschanges.get_log_changes', ['GET']),
+    ],
+    'events': [
+        ('/api/events', 'stream_events', 'handlers.events.events.stream_events', ['GET']),
+    ],
+    'sync': [
+        ('/api/sync', 'sync', 'handlers.sync.sync.get_sync', ['GET']),
+    ],
+    'payroll': [
+        ('/api/payroll/periods', 'close_payroll_period', 'handlers.payroll.payroll.close_payroll_period', ['POST']),
+        ('/api/payroll/periods', 'list_payroll_periods', 'handlers.payroll.payroll.get_payroll_periods', ['GET']),
+        ('/api/payroll/periods/<int:period_id>/snapshots', 'payroll_snapshots', 'handlers.payroll.payroll.get_payroll_snapshots', ['GET']),
+        ('/api/reports/hours', 'hours_report', 'handlers.payroll.payroll.get_hours_report', ['GET']),
+    ],
+    'findings': [
+        ('/api/findings', 'list_findings', 'handlers.findings.findings.get_findings', ['GET']),
+    ],
+    'batch': [
+        ('/api/batch', 'batch', 'handlers.batch.batch.run_batch', ['POST']),
+    ],
+    'jobs': [
+        ('/api/jobs', 'add_job', 'handlers.jobs.jobs.submit_job', ['POST']),
+        ('/api/jobs/<int:job_id>', 'job_status', 'handlers.jobs.jobs.get_job_status', ['GET']),
+        ('/api/jobs/<int:job_id>/result', 'job_result', 'handlers.jobs.jobs.download_job_result', ['GET']),
+    ],
+    'admin': [
+        ('/api/admin/compression-stats', 'compression_stats', 'handlers.admin.admin.compression_stats', ['GET']),
+        ('/api/admin/slow-queries', 'slow_queries', 'handlers.admin.admin.slow_queries', ['GET']),
+        ('/api/admin/slow-queries', 'clear_slow_queries', 'handlers.admin.admin.clear_slow_queries', ['DELETE']),
+        ('/api/admin/startup', 'startup_timings', 'handlers.admin.admin.startup_timings', ['GET']),
+        ('/api/admin/profiles', 'list_profiles', 'handlers.admin.admin.list_profiles', ['GET']),
+        ('/api/admin/profiles/<name>', 'get_profile', 'handlers.admin.admin.get_profile', ['GET']),
+        ('/metrics', 'metrics', 'handlers.admin.admin.prometheus_metrics', ['GET']),
+    ],
+}
+
+
+def build_blueprint(name):
+    bp = Blueprint(name, __name__)
+    for rule, endpoint, handler, methods in ROUTES[name]:
+        bp.add_url_rule(rule, endpoint, LazyView(handler), methods=methods)
+    return bp
+
+
+def register_blueprints(app, names=None):
+    """Register handler blueprints; handler modules load on their first request."""
+    for name in names or ROUTES:
+        app.register_blueprint(build_blueprint(name))
@@ -0,0 +1,28 @@
+"""Add the optimistic-locking version column to an existing database.
+
+    python useful/add_version_columns.py
+
+New databases get the column from create_tables.py. On Postgres 11+ adding
+a column with a constant default is a catalog-only change, so this does not
+rewrite daily_logs (on a partitioned table it propagates to every partition).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, inspect, text
+from config.config import SQLALCHEMY_DATABASE_URI
+
+TABLES = ['timesheets', 'daily_logs']
+
+if __name__ == '__main__':
+    engine = create_engine(SQLALCHEMY_DATABASE_URI)
+    with engine.begin() as conn:
+        for table in TABLES:
+            columns = {c['name'] for c in inspect(conn).get_columns(table)}
+            if 'version' in columns:
+                print(f"{table}: version column already present")
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            print(f"{table}: added version column")
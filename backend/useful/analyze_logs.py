@@ -0,0 +1,54 @@
+"""Flag overtime and punch anomalies in daily logs into log_findings.
+
+    python useful/analyze_logs.py [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--tenant acme]
+
+Covers timesheets whose week_starting falls in [start, end], by default
+last Monday-to-Sunday week, so a weekly cron run needs no arguments.
+Findings already stored for the range are replaced. Rules and thresholds
+are in utils/log_analytics.py and config (OVERTIME_*, UNUSUAL_*).
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import ANALYTICS_CHUNK_TIMESHEETS
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.tenancy import tenant_context
+from utils import log_analytics
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', type=_date)
+    parser.add_argument('--end', type=_date)
+    parser.add_argument('--chunk', type=int, default=ANALYTICS_CHUNK_TIMESHEETS, help='timesheets per chunk')
+    parser.add_argument('--tenant', help='Tenant to analyze when TENANT_MODE is set')
+    args = parser.parse_args()
+
+    start, end = log_analytics.previous_week()
+    start, end = args.start or start, args.end or end
+
+    with tenant_context(args.tenant):
+        session = get_session()
+        try:
+            started = time.perf_counter()
+            counts = log_analytics.analyze(session, start, end, args.chunk)
+            session.commit()
+            elapsed = time.perf_counter() - started
+            print(f"Analyzed {counts.pop('logs')} daily logs for weeks {start}..{end} in {elapsed:.1f}s")
+            for rule, count in counts.items():
+                print(f"  {rule}: {count}")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            safe_close(session)
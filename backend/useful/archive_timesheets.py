@@ -0,0 +1,36 @@
+"""Move timesheets older than ARCHIVE_HORIZON_DAYS into monthly Parquet files.
+
+    python useful/archive_timesheets.py [--horizon-days 730] [--tenant acme]
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import ARCHIVE_DIR, ARCHIVE_HORIZON_DAYS
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.archive import archive_timesheets
+from utils.tenancy import tenant_context
+import models.employee
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--horizon-days', type=int, default=ARCHIVE_HORIZON_DAYS)
+    parser.add_argument('--tenant', help='Tenant to archive when TENANT_MODE is set')
+    args = parser.parse_args()
+
+    with tenant_context(args.tenant):
+        session = get_session()
+        try:
+            archived = archive_timesheets(session, date.today() - timedelta(days=args.horizon_days))
+            for month, count in sorted(archived.items()):
+                print(f"{month}: archived {count} timesheets")
+            print(f"Archived {sum(archived.values())} timesheets into {ARCHIVE_DIR}")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            safe_close(session)
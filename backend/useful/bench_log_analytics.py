@@ -0,0 +1,104 @@
+"""Time the daily-log analytics run on a synthetic year of logs.
+
+    python useful/bench_log_analytics.py [--employees 10000] [--weeks 52] [--database-url URL]
+
+Seeds a fresh database (a throwaway SQLite file unless --database-url is
+given; use an empty Postgres database for production-like numbers) with a
+timesheet per employee per week and five daily logs each, about 2% of
+them broken in some way, then times log_analytics.analyze over the whole
+range. The target is under a minute for 10,000 employees over 52 weeks.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NORMAL = (dtime(9), dtime(12, 30), dtime(13, 30), dtime(17, 30))
+BROKEN = [
+    (dtime(9), None, dtime(13, 30), dtime(17, 30)),            # missed punch
+    (dtime(9), dtime(13, 45), dtime(13, 30), dtime(17, 30)),   # overlapping sessions
+    (dtime(7), dtime(12, 30), dtime(13, 30), dtime(21, 0)),    # daily overtime
+    (dtime(5, 15), dtime(12, 30), dtime(13, 30), dtime(17, 30)),  # unusual hours
+    (dtime(12, 30), dtime(9), dtime(13, 30), dtime(17, 30)),   # reversed session
+]
+
+
+def seed(engine, employees, weeks, first_week, seed_value=7):
+    from sqlalchemy import insert
+    from models.base import Base
+    from models.employee import Employee
+    from models.timesheet import Timesheet
+    from models.dailylogs import DailyLog
+    import models.log_finding
+
+    rng = random.Random(seed_value)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Employee.__table__), [
+            {'id': n, 'employee_name': f'Employee {n}', 'email': f'e{n}@analytics.test', 'reports_to': None}
+            for n in range(1, employees + 1)])
+        ts_id = 0
+        for w in range(weeks):
+            week = first_week + timedelta(weeks=w)
+            timesheets, logs = [], []
+            for n in range(1, employees + 1):
+                ts_id += 1
+                timesheets.append({'id': ts_id, 'employee_id': n, 'week_starting': week})
+                for day in range(5):
+                    punches = rng.choice(BROKEN) if rng.random() < 0.02 else NORMAL
+                    logs.append({
+                        'timesheet_id': ts_id, 'log_date': week + timedelta(days=day), 'day_of_week': 'Monday',
+                        'morning_in': punches[0], 'morning_out': punches[1],
+                        'afternoon_in': punches[2], 'afternoon_out': punches[3],
+                        'total_hours': dtime(7, 30), 'description': f'Work item {ts_id}-{day}'
+                    })
+            conn.execute(insert(Timesheet.__table__), timesheets)
+            for start in range(0, len(logs), 10000):
+                conn.execute(insert(DailyLog.__table__), logs[start:start + 10000])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=10000)
+    parser.add_argument('--weeks', type=int, default=52)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='tms-analytics-')}/bench.db"
+    # Settings are read at import time
+    os.environ['DATABASE_URL'] = url
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+
+    from sqlalchemy import create_engine
+    first_week = date(2025, 1, 6)
+    engine = create_engine(url)
+    started = time.perf_counter()
+    seed(engine, args.employees, args.weeks, first_week)
+    print(f"Seeded {args.employees} employees x {args.weeks} weeks in {time.perf_counter() - started:.1f}s")
+    engine.dispose()
+
+    from utils.session_manager import get_session
+    from utils.helpers import safe_close
+    from utils import log_analytics
+
+    session = get_session()
+    try:
+        started = time.perf_counter()
+        counts = log_analytics.analyze(session, first_week, first_week + timedelta(weeks=args.weeks - 1))
+        session.commit()
+        elapsed = time.perf_counter() - started
+    finally:
+        safe_close(session)
+    logs = counts.pop('logs')
+    print(f"Analyzed {logs} daily logs in {elapsed:.1f}s ({logs / elapsed:,.0f} logs/s)")
+    for rule, count in counts.items():
+        print(f"  {rule}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Compare heap vs monthly-partitioned daily_logs on a synthetic dataset.
+
+Builds both layouts in scratch schemas (bench_heap, bench_part), loads the
+same rows with generate_series, then times dashboard/report style queries
+and VACUUM. Nothing in the application schema is touched.
+
+    python useful/bench_partitioning.py --rows 50000000 --months 36
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from config.config import SQLALCHEMY_DATABASE_URI
+from models.partitioning import add_months
+
+TABLE_DDL = """
+CREATE TABLE {schema}.daily_logs (
+    id BIGINT NOT NULL,
+    timesheet_id INTEGER NOT NULL,
+    log_date DATE NOT NULL,
+    morning_in TIME,
+    morning_out TIME,
+    afternoon_in TIME,
+    afternoon_out TIME,
+    total_hours TIME,
+    description TEXT,
+    PRIMARY KEY (id, log_date)
+) {partition_clause}
+"""
+
+QUERIES = {
+    'dashboard week (one employee)': (
+        "SELECT * FROM {schema}.daily_logs "
+        "WHERE timesheet_id = :ts AND log_date BETWEEN :week_start AND :week_start + 6"
+    ),
+    'monthly hours report': (
+        "SELECT timesheet_id, sum(EXTRACT(EPOCH FROM total_hours)) FROM {schema}.daily_logs "
+        "WHERE log_date >= :month_start AND log_date < :month_end GROUP BY timesheet_id"
+    ),
+    'last 7 days count': (
+        "SELECT count(*) FROM {schema}.daily_logs WHERE log_date >= :recent"
+    ),
+}
+
+
+def setup(conn, schema, rows, months, first_month, partitioned):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {schema}"))
+    clause = "PARTITION BY RANGE (log_date)" if partitioned else ""
+    conn.execute(text(TABLE_DDL.format(schema=schema, partition_clause=clause)))
+    if partitioned:
+        for i in range(months):
+            start, end = add_months(first_month, i), add_months(first_month, i + 1)
+            conn.execute(text(
+                f"CREATE TABLE {schema}.daily_logs_{i} PARTITION OF {schema}.daily_logs "
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            ))
+    days = (add_months(first_month, months) - first_month).days
+    conn.execute(text(
+        f"INSERT INTO {schema}.daily_logs "
+        "SELECT g, (g % 200000) + 1, CAST(:first AS date) + ((g * 7919) % :days)::int, "
+        "'09:00', '12:30', '13:30', '17:30', '07:30', md5(g::text) "
+        "FROM generate_series(1, :rows) g"
+    ), {'first': first_month, 'days': days, 'rows': rows})
+    conn.execute(text(f"CREATE INDEX ON {schema}.daily_logs (timesheet_id, log_date)"))
+    conn.execute(text(f"ANALYZE {schema}.daily_logs"))
+
+
+def time_query(conn, sql, params, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_vacuum(engine, target):
+    # VACUUM cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        start = time.perf_counter()
+        conn.execute(text(f"VACUUM (ANALYZE) {target}"))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch schemas')
+    args = parser.parse_args()
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URI)
+    first_month = add_months(date(date.today().year, date.today().month, 1), -args.months + 1)
+    last_month = add_months(first_month, args.months - 1)
+    params = {
+        'ts': 4242,
+        'week_start': last_month,
+        'month_start': last_month,
+        'month_end': add_months(last_month, 1),
+        'recent': add_months(last_month, 1) - timedelta(days=7),
+    }
+
+    results = {}
+    for schema, partitioned in (('bench_heap', False), ('bench_part', True)):
+        print(f"Loading {args.rows:,} rows into {schema} ...")
+        with engine.begin() as conn:
+            start = time.perf_counter()
+            setup(conn, schema, args.rows, args.months, first_month, partitioned)
+            print(f"  loaded in {time.perf_counter() - start:.1f}s")
+        with engine.connect() as conn:
+            for name, sql in QUERIES.items():
+                results[(name, schema)] = time_query(conn, sql.format(schema=schema), params, args.repeat)
+        with engine.begin() as conn:
+            # Simulate a month of edits landing in the newest data only
+            conn.execute(text(
+                f"UPDATE {schema}.daily_logs SET description = description || '.' "
+                "WHERE log_date >= :month_start AND log_date < :month_end"
+            ), params)
+        vacuum_target = f"{schema}.daily_logs_{args.months - 1}" if partitioned else f"{schema}.daily_logs"
+        results[('vacuum after month of edits', schema)] = time_vacuum(engine, vacuum_target)
+
+    print(f"\n{'workload':36} {'heap':>10} {'partitioned':>12} {'speedup':>8}")
+    for name in list(QUERIES) + ['vacuum after month of edits']:
+        heap, part = results[(name, 'bench_heap')], results[(name, 'bench_part')]
+        print(f"{name:36} {heap * 1000:>8.1f}ms {part * 1000:>10.1f}ms {heap / part:>7.1f}x")
+
+    if not args.keep:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA bench_heap CASCADE"))
+            conn.execute(text("DROP SCHEMA bench_part CASCADE"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Time GET /api/employees/<id>/team-week on a synthetic org chart.
+
+    python useful/bench_team_week.py [--employees 2000] [--fanout 8] [--database-url URL]
+
+Seeds a fresh database (a throwaway SQLite file unless --database-url is
+given; use an empty Postgres database for production-like numbers) with a
+tree of --employees people under one manager, a timesheet and five daily
+logs each for one week, then times the endpoint through the Flask test
+client. The target is under 300 ms for a 2,000-person subtree.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(engine, employees, fanout, week):
+    from sqlalchemy import insert
+    from models.base import Base
+    from models.employee import Employee
+    from models.timesheet import Timesheet
+    from models.dailylogs import DailyLog
+
+    Base.metadata.create_all(engine)
+    # Employee 1 is the manager; employee n reports to (n - 2) // fanout + 1
+    people = [{'id': 1, 'employee_name': 'Manager', 'email': 'manager@bench.test', 'reports_to': None}]
+    for n in range(2, employees + 2):
+        people.append({'id': n, 'employee_name': f'Employee {n}', 'email': f'e{n}@bench.test',
+                       'reports_to': (n - 2) // fanout + 1})
+    timesheets = [{'id': n, 'employee_id': n, 'week_starting': week} for n in range(2, employees + 2)]
+    logs = []
+    for n in range(2, employees + 2):
+        for day in range(5):
+            logs.append({
+                'timesheet_id': n, 'log_date': week + timedelta(days=day), 'day_of_week': 'Monday',
+                'morning_in': dtime(9), 'morning_out': dtime(12, 30), 'afternoon_in': dtime(13, 30),
+                'afternoon_out': dtime(17, 30), 'total_hours': dtime(7, 30), 'description': f'Work item {n}-{day}'
+            })
+    with engine.begin() as conn:
+        conn.execute(insert(Employee.__table__), people)
+        conn.execute(insert(Timesheet.__table__), timesheets)
+        for start in range(0, len(logs), 5000):
+            conn.execute(insert(DailyLog.__table__), logs[start:start + 5000])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='tms-team-')}/bench.db"
+    # Settings are read at import time
+    os.environ['DATABASE_URL'] = url
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+
+    from sqlalchemy import create_engine
+    week = date(2026, 1, 5)
+    engine = create_engine(url)
+    seed(engine, args.employees, args.fanout, week)
+    engine.dispose()
+
+    from app import app
+    client = app.test_client()
+    path = f"/api/employees/1/team-week?week_starting={week.isoformat()}"
+    response = client.get(path)
+    assert response.status_code == 200, response.get_json()
+    payload = response.get_json()
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"{url.split(':', 1)[0]}: {len(payload['employees']['id'])} employees, "
+          f"{len(payload['daily_logs']['id'])} logs, {len(response.data) / 1024:.0f} KiB")
+    print(f"median {statistics.median(timings):.1f} ms, p95 {timings[int(len(timings) * 0.95) - 1]:.1f} ms, "
+          f"max {timings[-1]:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
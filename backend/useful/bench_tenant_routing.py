@@ -0,0 +1,90 @@
+"""Measure the per-session cost of tenant routing in get_session().
+
+    python useful/bench_tenant_routing.py [--iterations 20000] [--tenants 200] [--max-engines 32]
+
+Each mode runs in its own process (settings are read at import time) against
+throwaway SQLite files, timing get_session() + connection checkout + close:
+
+  off          single engine, no tenancy
+  schema       one shared pool, per-tenant schema_translate_map
+  database-hot one engine per tenant, all tenants fit in the LRU
+  database-lru more tenants than TENANT_MAX_ENGINES, so engines keep being
+               evicted and re-created (worst case)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def run_mode(iterations, tenants):
+    from utils import session_manager
+    from utils.tenancy import tenant_context
+
+    names = [f"t{i}" for i in range(tenants)]
+    # Warm up: create engines and the first pooled connection of each
+    for name in names:
+        with tenant_context(name if os.environ['TENANT_MODE'] != 'off' else None):
+            session = session_manager.get_session()
+            session.connection()
+            session.close()
+
+    # Best of five rounds, to keep scheduler noise out of a microsecond-scale number
+    best = None
+    for _ in range(5):
+        started = time.perf_counter()
+        for i in range(iterations):
+            tenant = names[i % tenants] if os.environ['TENANT_MODE'] != 'off' else None
+            with tenant_context(tenant):
+                session = session_manager.get_session()
+                session.connection()
+                session.close()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {'us_per_session': round(best / iterations * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--max-engines', type=int, default=32)
+    parser.add_argument('--inner', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.inner:
+        print(json.dumps(run_mode(args.iterations, args.tenants)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='tms-tenants-')
+    base = {
+        'DATABASE_URL': f"sqlite:///{workdir}/main.db",
+        'TENANT_DATABASE_URL': f"sqlite:///{workdir}/{{tenant}}.db",
+        'SLOW_QUERY_MS': '0',
+    }
+    modes = [
+        ('off', {'TENANT_MODE': 'off'}, 1),
+        ('schema', {'TENANT_MODE': 'schema'}, args.tenants),
+        ('database-hot', {'TENANT_MODE': 'database', 'TENANT_MAX_ENGINES': str(args.tenants)}, args.tenants),
+        ('database-lru', {'TENANT_MODE': 'database', 'TENANT_MAX_ENGINES': str(args.max_engines)}, args.tenants),
+    ]
+    baseline = None
+    print(f"{'mode':<14}{'tenants':>9}{'us/session':>12}{'overhead':>11}")
+    for name, env, tenants in modes:
+        out = subprocess.run(
+            [sys.executable, __file__, '--inner', '--iterations', str(args.iterations), '--tenants', str(tenants)],
+            env=dict(os.environ, **base, **env), cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout
+        us = json.loads(out.strip().splitlines()[-1])['us_per_session']
+        baseline = baseline or us
+        print(f"{name:<14}{tenants:>9}{us:>12.2f}{us - baseline:>+10.2f}us")
+
+
+if __name__ == '__main__':
+    main()
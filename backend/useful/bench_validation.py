@@ -0,0 +1,105 @@
+"""Compare per-request validation cost: the old inline checks against utils/schemas.
+
+    python useful/bench_validation.py [--iterations 20000] [--batch 50]
+
+Runs the validation the handlers did before the schema layer (required
+field loops, strptime in try/except, re.match with a pattern string) and
+schemas.load / load_many over the same payloads, and prints microseconds
+per request for each. No database or Flask request is involved; both sides
+only parse and coerce the body.
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DAILY_LOG = {'timesheet_id': 42, 'log_date': '2026-01-05', 'morning_in': '09:00', 'morning_out': '12:30',
+             'afternoon_in': '13:30', 'afternoon_out': '17:30', 'description': 'Sprint work', 'version': 3}
+TIMESHEET = {'employee_name': 'Jane Doe', 'week_starting': '2026-01-05'}
+EMPLOYEE = {'employee_name': 'Jane Doe', 'email': 'jane.doe@example.com', 'reports_to': 7}
+SAVE_ITEM = {'id': 'temp-1', 'employee_id': 7, 'week_starting': '2026-01-05', 'date': '2026-01-06',
+             'time_in_am': '09:00', 'time_out_am': '12:30', 'time_in_pm': '13:30', 'time_out_pm': '17:30',
+             'description': 'Sprint work'}
+
+
+# The checks as the handlers wrote them before utils/schemas.py
+def legacy_daily_log(data):
+    for field in ['timesheet_id', 'log_date']:
+        if not data.get(field):
+            raise ValueError(f'{field} is required')
+    try:
+        log_date = datetime.strptime(data['log_date'], "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError('Invalid log_date format. Use YYYY-MM-DD.')
+    fmt = "%H:%M"
+    times = {}
+    for field in ('morning_in', 'morning_out', 'afternoon_in', 'afternoon_out'):
+        value = data.get(field)
+        times[field] = datetime.strptime(value, fmt).time() if value else None
+    version = data.get('version')
+    if version is not None and (isinstance(version, bool) or not str(version).isdigit()):
+        raise ValueError('version must be an integer.')
+    return log_date, times
+
+
+def legacy_timesheet(data):
+    if not data.get('employee_name') or not data.get('week_starting'):
+        raise ValueError('employee_name and week_starting are required')
+    return datetime.strptime(data['week_starting'], '%Y-%m-%d').date()
+
+
+def legacy_employee(data):
+    if not data.get('employee_name') or not data.get('email'):
+        raise ValueError('employee_name and email are required.')
+    if not re.match(r"^[^@]+@[^@]+\.[^@]+$", data['email']):
+        raise ValueError('Invalid email format')
+
+
+def legacy_save_batch(items):
+    for item in items:
+        datetime.strptime(item['week_starting'], '%Y-%m-%d').date()
+        datetime.strptime(item['date'], '%Y-%m-%d').date()
+        for field in ('time_in_am', 'time_out_am', 'time_in_pm', 'time_out_pm'):
+            if item.get(field):
+                datetime.strptime(item[field], '%H:%M').time()
+
+
+def per_call_us(fn, iterations):
+    # Best of three runs, so a scheduler hiccup does not decide the result
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=50, help='items per /daily-logs/save payload')
+    args = parser.parse_args()
+
+    from utils import schemas
+
+    batch = [dict(SAVE_ITEM, id=f'temp-{n}') for n in range(args.batch)]
+    cases = [
+        ('daily log create', lambda: legacy_daily_log(DAILY_LOG),
+         lambda: schemas.load(schemas.DAILY_LOG_CREATE, DAILY_LOG)),
+        ('timesheet create', lambda: legacy_timesheet(TIMESHEET),
+         lambda: schemas.load(schemas.TIMESHEET_CREATE, TIMESHEET)),
+        ('employee create', lambda: legacy_employee(EMPLOYEE),
+         lambda: schemas.load(schemas.EMPLOYEE_CREATE, EMPLOYEE)),
+        (f'save batch of {args.batch}', lambda: legacy_save_batch(batch),
+         lambda: schemas.load_many(schemas.SAVE_DAILY_LOG, batch)),
+    ]
+
+    print(f"{'payload':<22}{'inline us':>12}{'schema us':>12}{'speedup':>10}")
+    for name, legacy, schema in cases:
+        iterations = args.iterations if 'batch' not in name else max(args.iterations // args.batch, 1)
+        before = per_call_us(legacy, iterations)
+        after = per_call_us(schema, iterations)
+        print(f"{name:<22}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Set up or prune the change_log table behind /api/sync.
+
+    python useful/change_log.py install [--tenant acme]
+    python useful/change_log.py prune [--days 30] [--tenant acme]
+
+install creates change_log and its triggers in an existing database
+(create_tables.py and create_tenant.py already do this for new ones). Run
+prune from cron; clients whose token was pruned get 410 and sync from
+scratch.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import TENANT_MODE, CHANGE_LOG_RETENTION_DAYS
+from models.change_log import ChangeLog, install_change_triggers
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.tenancy import tenant_context, tenant_schema
+from utils import change_log
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['install', 'prune'])
+    parser.add_argument('--days', type=int, default=CHANGE_LOG_RETENTION_DAYS)
+    parser.add_argument('--tenant', help='Tenant to work on when TENANT_MODE is set')
+    args = parser.parse_args()
+
+    with tenant_context(args.tenant):
+        session = get_session()
+        try:
+            if args.command == 'install':
+                conn = session.connection()
+                ChangeLog.__table__.create(conn, checkfirst=True)
+                install_change_triggers(conn, tenant_schema(args.tenant) if TENANT_MODE == 'schema' else None)
+                session.commit()
+                print("change_log and its triggers are installed")
+            else:
+                deleted = change_log.prune(session, args.days)
+                session.commit()
+                print(f"pruned {deleted} change_log entries older than {args.days} days")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            safe_close(session)
@@ -0,0 +1,102 @@
+"""Check that no pooled DB connection is ever used by two processes.
+
+    python useful/check_fork_safety.py [--workers 4] [--iterations 200] [--database-url URL]
+
+Mimics a preloading server: the parent builds the engine and warms its
+pool, then forks workers that all hammer get_session() while the parent
+keeps using its own connections. Every checkout records which process
+opened the connection and, on Postgres, the server backend pid. Exits
+non-zero if a connection shows up in more than one process.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from config.config import SQLALCHEMY_DATABASE_URI
+from utils import session_manager
+
+
+def _checkout_identity(session):
+    conn = session.connection()
+    opened_by = conn.connection.info['check_opened_by']
+    if conn.dialect.name == 'postgresql':
+        backend = conn.execute(text("SELECT pg_backend_pid()")).scalar()
+    else:
+        conn.execute(text("SELECT 1"))
+        backend = f"{opened_by}:{id(conn.connection.dbapi_connection)}"
+    return os.getpid(), opened_by, backend
+
+
+def _use_pool(iterations):
+    seen = []
+    for _ in range(iterations):
+        session = session_manager.get_session()
+        try:
+            seen.append(_checkout_identity(session))
+        finally:
+            session.close()
+    return seen
+
+
+def _worker(iterations, queue):
+    queue.put(_use_pool(iterations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--database-url', default=SQLALCHEMY_DATABASE_URI)
+    args = parser.parse_args()
+
+    session_manager.configure(args.database_url)
+    engine = session_manager.get_engine()
+
+    # Recorded independently of the pool's own pid guard
+    @event.listens_for(engine, 'connect')
+    def _opened_by(dbapi_connection, connection_record):
+        connection_record.info['check_opened_by'] = os.getpid()
+
+    # Warm the parent's pool with several open connections before forking
+    warm = [session_manager.get_session() for _ in range(3)]
+    parent_seen = [_checkout_identity(s) for s in warm]
+    for s in warm:
+        s.close()
+
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(args.iterations, queue)) for _ in range(args.workers)]
+    for p in workers:
+        p.start()
+    parent_seen += _use_pool(args.iterations)
+    seen = list(parent_seen)
+    for _ in workers:
+        seen += queue.get()
+    for p in workers:
+        p.join()
+
+    problems = []
+    users = {}
+    for pid, opened_by, backend in seen:
+        if opened_by != pid:
+            problems.append(f"pid {pid} checked out a connection opened by pid {opened_by}")
+        users.setdefault(backend, set()).add(pid)
+    for backend, pids in users.items():
+        if len(pids) > 1:
+            problems.append(f"connection {backend} used by pids {sorted(pids)}")
+
+    print(f"{engine.dialect.name}: {len(seen)} checkouts, {len(users)} distinct connections, "
+          f"{args.workers + 1} processes")
+    if problems:
+        for problem in sorted(set(problems)):
+            print(f"FAIL {problem}")
+        sys.exit(1)
+    print("OK no connection was shared between processes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Check that the filtered list routes' queries are answered from indexes.
+
+    python useful/check_list_plans.py [--employees 1000] [--weeks 12] [--database-url URL]
+
+Seeds a fresh database (a throwaway SQLite file unless --database-url is
+given; point it at an empty Postgres database to check production plans)
+with timesheets, daily logs and log changes, builds the SELECT that
+GET /api/timesheets and GET /api/daily-log-changes would run for a set of
+filter/sort/cursor combinations, and EXPLAINs each one. Exits non-zero if
+any plan reads timesheets or daily_log_changes with a full table scan.
+
+On Postgres, sequential scans are disabled for the check so a tiny seeded
+table still shows whether an index *can* serve the query.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHECKED_TABLES = ('timesheets', 'daily_log_changes')
+
+
+def seed(engine, employees, weeks, first_week):
+    from sqlalchemy import insert, text
+    from models.base import Base
+    from models.employee import Employee
+    from models.timesheet import Timesheet
+    from models.dailylogs import DailyLog
+    from models.dailylogschanges import DailyLogChange
+
+    Base.metadata.create_all(engine)
+    people = [{'id': n, 'employee_name': f'Employee {n}', 'email': f'e{n}@plans.test', 'reports_to': None}
+              for n in range(1, employees + 1)]
+    timesheets, logs, changes = [], [], []
+    for n in range(1, employees + 1):
+        for w in range(weeks):
+            ts_id = len(timesheets) + 1
+            week = first_week + timedelta(weeks=w)
+            timesheets.append({'id': ts_id, 'employee_id': n, 'week_starting': week})
+            log_id = len(logs) + 1
+            logs.append({
+                'id': log_id, 'timesheet_id': ts_id, 'log_date': week, 'day_of_week': 'Monday',
+                'morning_in': dtime(9), 'morning_out': dtime(12, 30), 'afternoon_in': dtime(13, 30),
+                'afternoon_out': dtime(17, 30), 'total_hours': dtime(7, 30), 'description': f'Work item {ts_id}'
+            })
+            changes.append({'daily_log_id': log_id, 'new_description': f'Edited {ts_id}',
+                            'changed_at': datetime.combine(week, dtime(18)) + timedelta(seconds=n)})
+    with engine.begin() as conn:
+        conn.execute(insert(Employee.__table__), people)
+        for table, rows in ((Timesheet.__table__, timesheets), (DailyLog.__table__, logs),
+                            (DailyLogChange.__table__, changes)):
+            for start in range(0, len(rows), 5000):
+                conn.execute(insert(table), rows[start:start + 5000])
+        conn.execute(text('ANALYZE'))
+
+
+def cases(first_week, weeks):
+    from handlers.timesheet.timesheet import TIMESHEET_LIST
+    from handlers.dailylogschanges.dailylogschanges import LOG_CHANGE_LIST
+
+    mid = (first_week + timedelta(weeks=weeks // 2)).isoformat()
+    yield 'timesheets: default', TIMESHEET_LIST, {}
+    yield 'timesheets: employee_id', TIMESHEET_LIST, {'employee_id': '7'}
+    yield 'timesheets: employee_id + week range', TIMESHEET_LIST, {
+        'employee_id': '7', 'week_starting[gte]': first_week.isoformat(), 'week_starting[lte]': mid}
+    yield 'timesheets: week_starting', TIMESHEET_LIST, {'week_starting': mid}
+    yield 'timesheets: week range, sort=-week_starting', TIMESHEET_LIST, {
+        'week_starting[gte]': mid, 'sort': '-week_starting'}
+    yield 'log changes: default', LOG_CHANGE_LIST, {}
+    yield 'log changes: daily_log_id', LOG_CHANGE_LIST, {'daily_log_id': '42'}
+    yield 'log changes: employee_id', LOG_CHANGE_LIST, {'employee_id': '7'}
+    yield 'log changes: changed_at[gte], sort=-changed_at', LOG_CHANGE_LIST, {
+        'changed_at[gte]': f'{mid}T00:00:00', 'sort': '-changed_at'}
+    yield 'log changes: sort=-changed_at', LOG_CHANGE_LIST, {'sort': '-changed_at'}
+
+
+def with_cursor(session, spec, args):
+    """The same args plus the cursor of their first page, to check the keyset condition too."""
+    from werkzeug.datastructures import MultiDict
+    from utils.listing import list_query, fetch_page
+    _, cursor = fetch_page(session, spec, list_query(spec, MultiDict({**args, 'limit': '5'})))
+    return {**args, 'limit': '5', 'cursor': cursor} if cursor else None
+
+
+def full_scans(conn, sql, filtered):
+    """Tables from CHECKED_TABLES that the plan reads without an index."""
+    from sqlalchemy import text
+    if conn.dialect.name == 'sqlite':
+        details = [row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+        if not filtered and not any('TEMP B-TREE' in detail for detail in details):
+            # A walk of the rowid b-tree in id order, which the LIMIT stops early
+            return [], details
+        return sorted({table for detail in details for table in CHECKED_TABLES
+                       if detail.startswith(f'SCAN {table}') and ' USING ' not in detail}), details
+    conn.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = conn.execute(text('EXPLAIN (FORMAT JSON) ' + sql)).scalar()
+    plan = plan[0]['Plan'] if isinstance(plan, list) else plan
+    scanned, lines, stack = set(), [], [plan]
+    while stack:
+        node = stack.pop()
+        lines.append(f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip())
+        relation = node.get('Relation Name', '')
+        # Partitions are named <table>_<suffix>
+        if node['Node Type'] == 'Seq Scan' and any(relation == t or relation.startswith(t + '_') for t in CHECKED_TABLES):
+            scanned.add(relation)
+        stack.extend(node.get('Plans', []))
+    return sorted(scanned), lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--weeks', type=int, default=12)
+    parser.add_argument('--database-url')
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='tms-plans-')}/plans.db"
+    # Settings are read at import time
+    os.environ['DATABASE_URL'] = url
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from werkzeug.datastructures import MultiDict
+    from utils.listing import list_query, page_statement
+
+    first_week = date(2026, 1, 5)
+    engine = create_engine(url)
+    seed(engine, args.employees, args.weeks, first_week)
+
+    failures = 0
+    with Session(engine) as session:
+        for name, spec, params in cases(first_week, args.weeks):
+            paged = with_cursor(session, spec, params)
+            for label, query_args in ((name, params), (f'{name} (next page)', paged)):
+                if query_args is None:
+                    continue
+                query = list_query(spec, MultiDict(query_args))
+                stmt = page_statement(spec, query)
+                sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+                with engine.begin() as conn:
+                    scanned, plan = full_scans(conn, sql, bool(query['criteria']) or query['after'] is not None)
+                failures += bool(scanned)
+                print(f"{'FAIL' if scanned else 'ok  '} {label}" + (f"  (full scan of {', '.join(scanned)})" if scanned else ''))
+                if scanned or args.verbose:
+                    for line in plan:
+                        print(f'       {line}')
+    engine.dispose()
+    print(f"{failures} plan(s) with full table scans" if failures else "All list queries use indexes")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""Create any index declared on the models that an existing database lacks.
+
+    python useful/create_indexes.py
+
+create_tables.py covers new databases; this brings older ones up to date.
+Indexes are built with plain CREATE INDEX, which blocks writes to the table
+while it runs, so schedule it outside working hours on large tables.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from config.config import SQLALCHEMY_DATABASE_URI
+from models.base import Base
+
+import models.employee
+import models.timesheet
+import models.dailylogs
+import models.dailylogschanges
+import models.employee_closure
+import models.change_log
+import models.log_finding
+import models.payroll
+
+if __name__ == '__main__':
+    engine = create_engine(SQLALCHEMY_DATABASE_URI)
+    for table in Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            index.create(engine, checkfirst=True)
+            print(f"{table.name}: {index.name} ok")
@@ -1,16 +1,37 @@
 from sqlalchemy import create_engine
-from config.config import SQLALCHEMY_DATABASE_URI
+from datetime import date
+from config.config import SQLALCHEMY_DATABASE_URI, PARTITION_LOGS, PARTITION_MONTHS_AHEAD
 from models.base import Base
+from models.partitioning import PARTITIONED_TABLES, ensure_partitions, month_start, add_months
+from models.change_log import install_change_triggers
+from models.payroll import install_snapshot_guard
 
 # Import all your models so Base knows about them
 import models.employee
 import models.timesheet
 import models.dailylogs
 import models.dailylogschanges
+import models.employee_closure
+import models.change_log
+import models.log_finding
+import models.payroll
 
 engine = create_engine(SQLALCHEMY_DATABASE_URI)
 
 # This will create all tables in the database
 Base.metadata.create_all(engine)
 
+# change_log is filled by triggers so bulk and cascading writes are recorded too
+with engine.begin() as conn:
+    install_change_triggers(conn)
+    # Payroll snapshots are insert-only
+    install_snapshot_guard(conn)
+
+# Partitioned tables need partitions before they can take rows
+if PARTITION_LOGS:
+    with engine.begin() as conn:
+        first = month_start(date.today())
+        for table in PARTITIONED_TABLES:
+            ensure_partitions(conn, table, first, add_months(first, PARTITION_MONTHS_AHEAD))
+
 print("All tables created successfully!")
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""Provision a tenant: its schema (TENANT_MODE=schema) or database (TENANT_MODE=database) and tables.
+
+    python useful/create_tenant.py acme [globex ...]
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from config.config import SQLALCHEMY_DATABASE_URI, TENANT_MODE, PARTITION_LOGS, PARTITION_MONTHS_AHEAD
+from models.base import Base
+from models.partitioning import PARTITIONED_TABLES, ensure_partitions, month_start, add_months
+from models.change_log import install_change_triggers
+from models.payroll import install_snapshot_guard
+from utils import tenancy
+
+import models.employee
+import models.timesheet
+import models.dailylogs
+import models.dailylogschanges
+import models.employee_closure
+import models.change_log
+import models.log_finding
+import models.payroll
+
+
+def _create_tables(engine, schema=None):
+    bind = engine.execution_options(schema_translate_map={None: schema}) if schema else engine
+    Base.metadata.create_all(bind)
+    with engine.begin() as conn:
+        install_change_triggers(conn, schema)
+        install_snapshot_guard(conn, schema)
+    if PARTITION_LOGS:
+        with engine.begin() as conn:
+            if schema:
+                # ensure_partitions issues unqualified DDL
+                conn.execute(text(f'SET LOCAL search_path TO "{schema}"'))
+            first = month_start(date.today())
+            for table in PARTITIONED_TABLES:
+                ensure_partitions(conn, table, first, add_months(first, PARTITION_MONTHS_AHEAD))
+
+
+def create_schema_tenant(tenant):
+    schema = tenancy.tenant_schema(tenant)
+    engine = create_engine(SQLALCHEMY_DATABASE_URI)
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+    _create_tables(engine, schema)
+    engine.dispose()
+    return schema
+
+
+def create_database_tenant(tenant):
+    url = make_url(tenancy.tenant_database_url(tenant))
+    if url.get_backend_name() == 'postgresql':
+        admin = create_engine(SQLALCHEMY_DATABASE_URI, isolation_level='AUTOCOMMIT')
+        with admin.connect() as conn:
+            exists = conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                                  {'name': url.database}).scalar()
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+        admin.dispose()
+    engine = create_engine(url)
+    _create_tables(engine)
+    engine.dispose()
+    return url.database
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('tenants', nargs='+')
+    args = parser.parse_args()
+
+    if TENANT_MODE not in ('schema', 'database'):
+        sys.exit('Set TENANT_MODE to schema or database first.')
+    for tenant in args.tenants:
+        if not tenancy.valid_tenant(tenant):
+            sys.exit(f'Invalid tenant name "{tenant}".')
+        if TENANT_MODE == 'schema':
+            print(f"{tenant}: schema {create_schema_tenant(tenant)} ready")
+        else:
+            print(f"{tenant}: database {create_database_tenant(tenant)} ready")
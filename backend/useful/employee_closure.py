@@ -0,0 +1,48 @@
+"""Rebuild or check the employee_closure table against employees.reports_to.
+
+    python useful/employee_closure.py rebuild [--tenant acme]
+    python useful/employee_closure.py check [--tenant acme]
+
+Run rebuild once before setting EMPLOYEE_CLOSURE_ENABLED, and after any
+write to employees that bypasses the handlers (e.g. insert_employees.py).
+check exits with status 1 when the table has drifted.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.tenancy import tenant_context
+from utils import employee_closure
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['rebuild', 'check'])
+    parser.add_argument('--tenant', help='Tenant to work on when TENANT_MODE is set')
+    args = parser.parse_args()
+
+    with tenant_context(args.tenant):
+        session = get_session()
+        try:
+            if args.command == 'rebuild':
+                rows = employee_closure.rebuild(session)
+                session.commit()
+                print(f"employee_closure rebuilt: {rows} rows")
+            else:
+                result = employee_closure.check(session)
+                if not result['missing'] and not result['unexpected']:
+                    print("employee_closure is consistent with reports_to")
+                else:
+                    for row in result['missing']:
+                        print(f"missing    ancestor={row[0]} descendant={row[1]} depth={row[2]}")
+                    for row in result['unexpected']:
+                        print(f"unexpected ancestor={row[0]} descendant={row[1]} depth={row[2]}")
+                    sys.exit(1)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            safe_close(session)
@@ -0,0 +1,56 @@
+"""Import an org dump of employees in one transaction.
+
+    python useful/import_employees.py employees.csv [--tenant acme] [--dry-run]
+    python useful/import_employees.py employees.json [--tenant acme]
+
+The same import as POST /api/employees/bulk: a CSV with an
+employee_name,email,manager_email header, or a JSON list of objects with
+those keys. manager_email names another row or an existing employee.
+Every row is checked first; if any fails, the per-row errors are printed,
+nothing is written and the exit status is 1. --dry-run stops after the
+checks and prints the insert levels.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.tenancy import tenant_context
+from utils import employee_import
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='.csv or .json org dump')
+    parser.add_argument('--tenant', help='Tenant to work on when TENANT_MODE is set')
+    parser.add_argument('--dry-run', action='store_true', help='check and plan only')
+    args = parser.parse_args()
+
+    with open(args.path, encoding='utf-8-sig') as f:
+        text = f.read()
+    rows = json.loads(text) if args.path.lower().endswith('.json') else employee_import.parse_csv(text)
+
+    with tenant_context(args.tenant):
+        session = get_session()
+        try:
+            levels, errors = employee_import.plan(session, rows)
+            if errors:
+                for error in errors:
+                    print(f"row {error['row']} ({error['email']}): {error['error']}")
+                print(f"{len(errors)} row(s) have errors; nothing was imported")
+                sys.exit(1)
+            if args.dry_run:
+                for depth, level in enumerate(levels):
+                    print(f"level {depth}: {len(level)} employees")
+            else:
+                created = employee_import.insert_levels(session, levels)
+                session.commit()
+                print(f"Imported {len(created)} employees in {len(levels)} levels")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            safe_close(session)
@@ -0,0 +1,102 @@
+"""Run background job workers.
+
+    python useful/job_worker.py [--workers 2] [--poll 1.0]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import JOB_WORKERS, JOB_LEASE_SECONDS, LIST_MAX_PAGE_SIZE
+from utils import job_queue
+from utils.tenancy import tenant_context
+
+
+def run_job(app, job):
+    """(status, body) of the job's route; paged list routes are followed to the last page."""
+    from handlers.batch.batch import dispatch_response
+
+    path = job_queue.job_path(job['kind'], job['params'])
+    query = job['params'].get('query') or {}
+    query = dict(parse_qsl(query) if isinstance(query, str) else query)
+    rows = None
+    with app.app_context(), tenant_context(job['params'].get('tenant')):
+        while True:
+            response = dispatch_response('GET', path, query)
+            status, body = response.status_code, response.get_json(silent=True)
+            cursor = response.headers.get('X-Next-Cursor')
+            if status >= 400 or (rows is None and not cursor):
+                return status, body
+            if rows is None and 'limit' not in query:
+                # An export wants everything; take the largest pages the route allows
+                query['limit'] = LIST_MAX_PAGE_SIZE
+            rows = (rows or []) + body
+            if not cursor:
+                return status, rows
+            query['cursor'] = cursor
+
+
+def keep_leased(job_id, worker, stop):
+    """Renew the job's lease until stop is set, so long jobs are not claimed twice."""
+    while not stop.wait(JOB_LEASE_SECONDS / 3):
+        if not job_queue.renew_lease(job_id, worker):
+            return
+
+
+def worker_loop(poll_interval):
+    # Import the app after the fork so each worker builds its own engine
+    from app import app
+
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"[{name}] worker started")
+    while True:
+        job = job_queue.claim(name)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        started = time.perf_counter()
+        stop = threading.Event()
+        threading.Thread(target=keep_leased, args=(job['id'], name, stop), daemon=True).start()
+        try:
+            status, body = run_job(app, job)
+        except Exception as e:
+            job_queue.fail(job['id'], str(e))
+            print(f"[{name}] job {job['id']} ({job['kind']}) raised: {e}")
+            continue
+        finally:
+            stop.set()
+        if status >= 400:
+            error = body.get('error') if isinstance(body, dict) else f'HTTP {status}'
+            # Client errors will not fix themselves on retry
+            job_queue.fail(job['id'], error, retryable=status >= 500)
+            print(f"[{name}] job {job['id']} ({job['kind']}) failed with {status}: {error}")
+            continue
+        job_queue.complete(job['id'], json.dumps(body).encode('utf-8'))
+        print(f"[{name}] job {job['id']} ({job['kind']}) done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS)
+    parser.add_argument('--poll', type=float, default=1.0)
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=worker_loop, args=(args.poll,), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.terminate()
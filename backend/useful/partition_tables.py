@@ -0,0 +1,172 @@
+"""Monthly partition maintenance for daily_logs and daily_log_changes.
+
+Run with PARTITION_LOGS=true so the models describe the partitioned layout.
+
+    python useful/partition_tables.py migrate    # convert existing heap tables once
+    python useful/partition_tables.py maintain   # create upcoming partitions (cron daily)
+    python useful/partition_tables.py check      # run the week view queries, list partitions read
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+from config.config import SQLALCHEMY_DATABASE_URI, PARTITION_LOGS, PARTITION_MONTHS_AHEAD
+from models.base import Base
+from models.change_log import install_change_triggers
+from models.partitioning import PARTITIONED_TABLES, ensure_partitions, month_start, add_months, partition_name
+import models.employee
+from models.timesheet import Timesheet
+from models.dailylogs import DailyLog
+from models.dailylogschanges import DailyLogChange
+
+
+def is_partitioned(conn, table):
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table"
+    ), {'table': table}).scalar())
+
+
+def retire_heap(conn, table):
+    """Rename a heap table, its sequence, constraints and indexes out of the way."""
+    old = f"{table}_heap"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    conn.execute(text(f"ALTER SEQUENCE IF EXISTS {table}_id_seq RENAME TO {old}_id_seq"))
+    constraints = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass)"
+    ), {'t': old}).scalars().all()
+    for name in constraints:
+        conn.execute(text(f'ALTER TABLE {old} RENAME CONSTRAINT "{name}" TO "{name}_heap"'))
+    indexes = conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :t AND indexname NOT LIKE '%\\_heap'"
+    ), {'t': old}).scalars().all()
+    for name in indexes:
+        conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name}_heap"'))
+    return old
+
+
+def migrate(engine, months_ahead):
+    with engine.begin() as conn:
+        if all(is_partitioned(conn, table) for table in PARTITIONED_TABLES):
+            print("Tables are already partitioned.")
+            return
+
+        # Children first so the foreign key to daily_logs goes with the heap
+        old_changes = retire_heap(conn, 'daily_log_changes')
+        old_logs = retire_heap(conn, 'daily_logs')
+        Base.metadata.create_all(conn, tables=[DailyLog.__table__, DailyLogChange.__table__])
+
+        last = add_months(month_start(date.today()), months_ahead)
+        for table, old, key in (('daily_logs', old_logs, 'log_date'),
+                                ('daily_log_changes', old_changes, 'changed_at')):
+            first = conn.execute(text(f"SELECT min({key}) FROM {old}")).scalar() or date.today()
+            if hasattr(first, 'date'):
+                first = first.date()
+            created = ensure_partitions(conn, table, first, last)
+            print(f"{table}: created {len(created)} partitions")
+
+            columns = ', '.join(c.name for c in Base.metadata.tables[table].columns)
+            moved = conn.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {old}")).rowcount
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+            ))
+            print(f"{table}: moved {moved} rows")
+
+        conn.execute(text(f"DROP TABLE {old_changes}"))
+        conn.execute(text(f"DROP TABLE {old_logs}"))
+        # The change_log triggers went with the heap table; /api/sync needs them back
+        install_change_triggers(conn)
+    print("Migration complete.")
+
+
+def maintain(engine, months_ahead):
+    with engine.begin() as conn:
+        first = month_start(date.today())
+        last = add_months(first, months_ahead)
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(conn, table):
+                print(f"{table} is not partitioned; run 'migrate' first.")
+                continue
+            created = ensure_partitions(conn, table, first, last)
+            print(f"{table}: {', '.join(created) if created else 'partitions up to date'}")
+
+        # No foreign key protects daily_log_changes once partitioned; remove
+        # changes whose log was deleted through a timesheet/employee cascade.
+        if is_partitioned(conn, 'daily_logs'):
+            orphans = conn.execute(text(
+                "DELETE FROM daily_log_changes c WHERE NOT EXISTS "
+                "(SELECT 1 FROM daily_logs l WHERE l.id = c.daily_log_id)"
+            )).rowcount
+            print(f"daily_log_changes: removed {orphans} orphaned rows")
+
+
+def partitions_read(conn, statement):
+    """Names of the partitions the plan of a compiled statement reads."""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    plan = conn.execute(text('EXPLAIN (FORMAT JSON) ' + sql)).scalar()
+    plan = plan[0]['Plan'] if isinstance(plan, list) else plan
+    read, stack = set(), [plan]
+    while stack:
+        node = stack.pop()
+        relation = node.get('Relation Name', '')
+        if any(relation.startswith(table + '_') for table in PARTITIONED_TABLES):
+            read.add(relation)
+        stack.extend(node.get('Plans', []))
+    return sorted(read)
+
+
+def check(engine):
+    """Run the week view and team-week log queries against the partitioned tables.
+
+    Both must execute (a GROUP BY over the composite key would fail here)
+    and read only the week's daily_logs partitions. Returns False if not.
+    """
+    from handlers.weeks.weeks import week_logs_query, team_logs_statement
+
+    with Session(engine) as session:
+        if not is_partitioned(session.connection(), 'daily_logs'):
+            print("daily_logs is not partitioned; run 'migrate' first.")
+            return False
+        ts = session.query(Timesheet).order_by(Timesheet.week_starting.desc()).first()
+        if not ts:
+            print("No timesheets to check against.")
+            return False
+        week = ts.week_starting
+        months = {partition_name('daily_logs', week), partition_name('daily_logs', week + timedelta(days=6))}
+        team = select(Timesheet.employee_id.label('id')).where(Timesheet.id == ts.id).cte(name='team')
+
+        ok = True
+        for label, statement in (('week view', week_logs_query(session, ts.id, week).statement),
+                                 ('team week', team_logs_statement(team, week))):
+            rows = session.execute(statement).all()
+            read = partitions_read(session.connection(), statement)
+            logs_read = [name for name in read if name.startswith('daily_logs_')]
+            pruned = set(logs_read) <= months | {'daily_logs_default'}
+            ok = ok and pruned
+            print(f"{'ok  ' if pruned else 'FAIL'} {label}: {len(rows)} rows for timesheet {ts.id} "
+                  f"week {week}; partitions read: {', '.join(read) or 'none'}")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['migrate', 'maintain', 'check'], nargs='?', default='maintain')
+    parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args()
+
+    if not PARTITION_LOGS:
+        sys.exit("Set PARTITION_LOGS=true so the models use the partitioned layout.")
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URI)
+    if args.command == 'migrate':
+        migrate(engine, args.months_ahead)
+    elif args.command == 'check':
+        sys.exit(0 if check(engine) else 1)
+    else:
+        maintain(engine, args.months_ahead)
@@ -0,0 +1,61 @@
+"""Close payroll periods, or install the snapshot guard on an existing database.
+
+    python useful/payroll.py close --start YYYY-MM-DD --end YYYY-MM-DD [--tenant acme]
+    python useful/payroll.py install [--tenant acme]
+
+close locks timesheets with week_starting in [start, end] against writes
+from the handlers and snapshots their per employee, per week totals (the
+same as POST /api/payroll/periods). install creates the payroll tables and
+the triggers that make payroll_snapshots insert-only in an existing
+database (create_tables.py and create_tenant.py already do this for new
+ones).
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import TENANT_MODE
+from models.payroll import PayrollPeriod, PayrollSnapshot, install_snapshot_guard
+from utils.session_manager import get_session
+from utils.helpers import safe_close
+from utils.tenancy import tenant_context, tenant_schema
+from utils import payroll
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['close', 'install'])
+    parser.add_argument('--start', type=_date)
+    parser.add_argument('--end', type=_date)
+    parser.add_argument('--tenant', help='Tenant to work on when TENANT_MODE is set')
+    args = parser.parse_args()
+
+    with tenant_context(args.tenant):
+        session = get_session()
+        try:
+            if args.command == 'install':
+                conn = session.connection()
+                PayrollPeriod.__table__.create(conn, checkfirst=True)
+                PayrollSnapshot.__table__.create(conn, checkfirst=True)
+                install_snapshot_guard(conn, tenant_schema(args.tenant) if TENANT_MODE == 'schema' else None)
+                session.commit()
+                print("payroll tables and the snapshot guard are installed")
+            else:
+                if not args.start or not args.end:
+                    parser.error('close needs --start and --end')
+                period, snapshots = payroll.close_period(session, args.start, args.end)
+                session.commit()
+                print(f"Closed payroll period {period.id} ({period.start_date}..{period.end_date}): "
+                      f"{snapshots} snapshot rows")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            safe_close(session)
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+from sqlalchemy import Integer, Date, DateTime, Time
+from config.config import ARCHIVE_DIR, ARCHIVE_HORIZON_DAYS, ARCHIVE_COMPRESSION
+from utils import metrics, tenancy
+from models.timesheet import Timesheet
+from models.dailylogs import DailyLog
+from models.dailylogschanges import DailyLogChange
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+
+# Per archive directory (one per tenant): {'mtime': ..., 'data': ...}
+_index_cache = {}
+_index_lock = threading.Lock()
+
+# index.json key holding the latest horizon an archive run actually used;
+# every other key is a timesheet id
+_HORIZON_KEY = '_horizon_start'
+
+
+def hot_window_start(today=None):
+    """First week_starting date still kept in the database.
+
+    The later of the configured horizon and the one the last archive run
+    used, since useful/archive_timesheets.py accepts --horizon-days.
+    """
+    start = (today or date.today()) - timedelta(days=ARCHIVE_HORIZON_DAYS)
+    archived = _load_index().get(_HORIZON_KEY)
+    return max(start, date.fromisoformat(archived)) if archived else start
+
+
+def is_outside_hot_window(d):
+    return d < hot_window_start()
+
+
+def _month_key(d):
+    return f"{d.year}-{d.month:02d}"
+
+
+def _archive_dir():
+    # Each tenant's archive lives in its own directory
+    tenant = tenancy.current_tenant()
+    return os.path.join(ARCHIVE_DIR, 'tenants', tenant) if tenant else ARCHIVE_DIR
+
+
+# One Parquet file per table per month of week_starting
+def _month_path(month, table):
+    return os.path.join(_archive_dir(), month, f"{table}.parquet")
+
+
+def _index_path():
+    return os.path.join(_archive_dir(), 'index.json')
+
+
+def _arrow_schema(model):
+    fields = []
+    for column in model.__table__.columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp('us')
+        elif isinstance(column.type, Date):
+            arrow_type = pa.date32()
+        elif isinstance(column.type, Time):
+            arrow_type = pa.time64('us')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _load_index():
+    """Map of archived timesheet id -> month, reloaded when the file changes."""
+    path = _index_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _index_lock:
+        cached = _index_cache.setdefault(path, {'mtime': None, 'data': {}})
+        hit = cached['mtime'] == mtime
+        metrics.record_cache('archive_index', hit)
+        if not hit:
+            with open(path) as f:
+                cached['data'] = json.load(f)
+            cached['mtime'] = mtime
+        return cached['data']
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    write(tmp)
+    with open(tmp, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _dump_json(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _append_rows(month, model, rows):
+    """Merge rows into the month's file, replacing any earlier copy by id."""
+    path = _month_path(month, model.__tablename__)
+    schema = _arrow_schema(model)
+    new_table = pa.Table.from_pylist(rows, schema=schema)
+    if os.path.exists(path):
+        existing = pq.read_table(path, schema=schema)
+        new_ids = pa.array([row['id'] for row in rows], pa.int64())
+        keep = pc.invert(pc.is_in(existing['id'], value_set=new_ids))
+        new_table = pa.concat_tables([existing.filter(keep), new_table])
+    _write_atomic(path, lambda tmp: pq.write_table(new_table, tmp, compression=ARCHIVE_COMPRESSION))
+
+
+def _rows(session, model, criterion, limit=None):
+    columns = model.__table__.columns
+    result = session.execute(model.__table__.select().where(criterion).order_by(model.__table__.c.id).limit(limit))
+    return [{c.name: row._mapping[c] for c in columns} for row in result]
+
+
+def archive_timesheets(session, horizon_start=None, batch_size=5000):
+    """Move timesheets older than the hot window to Parquet files.
+
+    Works month by month: the files are written and fsynced first, then the
+    rows are deleted with set-based statements and committed. Re-running
+    after a crash rewrites the same ids, so the job is idempotent.
+    Returns the number of timesheets archived per month.
+    """
+    if pa is None:
+        raise RuntimeError('pyarrow is required to archive timesheets.')
+    horizon_start = horizon_start or hot_window_start()
+    archived = {}
+
+    while True:
+        timesheets = _rows(session, Timesheet, Timesheet.week_starting < horizon_start, batch_size)
+        if not timesheets:
+            break
+
+        by_month = {}
+        for ts in timesheets:
+            by_month.setdefault(_month_key(ts['week_starting']), []).append(ts)
+
+        for month, month_timesheets in sorted(by_month.items()):
+            ts_ids = [ts['id'] for ts in month_timesheets]
+            logs = _rows(session, DailyLog, DailyLog.timesheet_id.in_(ts_ids))
+            log_ids = [log['id'] for log in logs]
+            changes = _rows(session, DailyLogChange, DailyLogChange.daily_log_id.in_(log_ids)) if log_ids else []
+
+            _append_rows(month, Timesheet, month_timesheets)
+            if logs:
+                _append_rows(month, DailyLog, logs)
+            if changes:
+                _append_rows(month, DailyLogChange, changes)
+
+            index = dict(_load_index())
+            index.update({str(ts_id): month for ts_id in ts_ids})
+            if index.get(_HORIZON_KEY, '') < horizon_start.isoformat():
+                index[_HORIZON_KEY] = horizon_start.isoformat()
+            _write_atomic(_index_path(), lambda tmp: _dump_json(index, tmp))
+
+            if log_ids:
+                session.query(DailyLogChange).filter(DailyLogChange.daily_log_id.in_(log_ids)) \
+                    .delete(synchronize_session=False)
+                session.query(DailyLog).filter(DailyLog.timesheet_id.in_(ts_ids)) \
+                    .delete(synchronize_session=False)
+            session.query(Timesheet).filter(Timesheet.id.in_(ts_ids)).delete(synchronize_session=False)
+            session.commit()
+            archived[month] = archived.get(month, 0) + len(ts_ids)
+
+    return archived
+
+
+def _read(month, model, filters):
+    path = _month_path(month, model.__tablename__)
+    if pq is None or not os.path.exists(path):
+        return []
+    table = pq.read_table(path, schema=_arrow_schema(model), filters=filters)
+    return table.to_pylist()
+
+
+def find_timesheet(employee_id, week_starting):
+    """Archived timesheet for an employee/week as a dict, or None."""
+    rows = _read(_month_key(week_starting), Timesheet, [
+        ('employee_id', '=', employee_id),
+        ('week_starting', '=', week_starting),
+    ])
+    return Timesheet(**rows[0]).as_dict() if rows else None
+
+
+def find_timesheet_by_id(ts_id):
+    month = _load_index().get(str(ts_id))
+    if not month:
+        return None
+    rows = _read(month, Timesheet, [('id', '=', ts_id)])
+    return Timesheet(**rows[0]).as_dict() if rows else None
+
+
+def find_timesheets_by_week(week_starting):
+    rows = _read(_month_key(week_starting), Timesheet, [('week_starting', '=', week_starting)])
+    return [Timesheet(**row).as_dict() for row in rows]
+
+
+def find_timesheets_by_employee(employee_id):
+    """Archived timesheets of an employee across every archived month."""
+    months = {month for key, month in _load_index().items() if key != _HORIZON_KEY}
+    rows = []
+    for month in sorted(months):
+        rows.extend(_read(month, Timesheet, [('employee_id', '=', employee_id)]))
+    return [Timesheet(**row).as_dict() for row in rows]
+
+
+def find_daily_logs(ts_id):
+    """Archived daily logs of a timesheet, formatted like DailyLog.as_dict."""
+    month = _load_index().get(str(ts_id))
+    if not month:
+        return []
+    rows = _read(month, DailyLog, [('timesheet_id', '=', ts_id)])
+    return [DailyLog(**row).as_dict() for row in sorted(rows, key=lambda r: r['log_date'])]
+
+
+def find_log_changes(log_ids, month):
+    if not log_ids:
+        return []
+    rows = _read(month, DailyLogChange, [('daily_log_id', 'in', list(log_ids))])
+    return [DailyLogChange(**row).as_dict() for row in rows]
+
+
+def archived_month(ts_id):
+    return _load_index().get(str(ts_id))
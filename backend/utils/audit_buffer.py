@@ -0,0 +1,355 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config.config import (
+    AUDIT_BUFFER_MODE,
+    AUDIT_BUFFER_MAX_ROWS,
+    AUDIT_BUFFER_FLUSH_SECONDS,
+    AUDIT_SPOOL_DIR,
+    AUDIT_DEDUPE,
+)
+from models.dailylogschanges import DailyLogChange
+from utils import events, metrics, tenancy
+
+logger = logging.getLogger('tms.audit')
+
+_INSERT_CHUNK = 1000
+
+_lock = threading.Lock()
+_wake = threading.Event()
+# Committed rows waiting for the next flush: (tenant, row)
+_pending = []
+_state = {'pid': None, 'spool': None, 'needs_replay': True}
+# Savepoint -> length of the session's audit_pending when it began
+_savepoint_marks = weakref.WeakKeyDictionary()
+
+
+def enabled():
+    return AUDIT_BUFFER_MODE in ('memory', 'spool')
+
+
+def _is_noop(session, key, description):
+    # Only this transaction's own rows: a process-local memory of earlier
+    # ones goes stale after writes from other workers or other code paths
+    if not AUDIT_DEDUPE:
+        return False
+    for tenant, row in reversed(session.info.get('audit_pending', [])):
+        if (tenant, row['daily_log_id']) == key:
+            return row['new_description'] == description
+    return False
+
+
+def record_change(session, daily_log_id, new_description):
+    """Record a description change as part of session's transaction.
+
+    With buffering off the row is added to the session as before. Otherwise
+    it is queued once the transaction commits (nothing is queued if it rolls
+    back) and written later with multi-row inserts. Returns the change, which
+    has no id yet when buffered, or None for a no-op edit.
+    """
+    tenant = tenancy.current_tenant()
+    if _is_noop(session, (tenant, daily_log_id), new_description):
+        metrics.inc('tms_audit_deduped_total')
+        return None
+
+    row = {'daily_log_id': daily_log_id, 'new_description': new_description}
+    if enabled():
+        # Stamped now, not at flush time
+        row['changed_at'] = datetime.now()
+        change = DailyLogChange(**row)
+        # Never added to the session, so the live feed is told directly
+        events.record(session, {'type': 'log_change', 'action': 'created', 'id': None, 'daily_log_id': daily_log_id})
+    else:
+        change = DailyLogChange(**row)
+        session.add(change)
+    session.info.setdefault('audit_pending', []).append((tenant, row))
+    return change
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    entries = session.info.pop('audit_pending', None)
+    if entries and enabled():
+        _enqueue(entries)
+
+
+@event.listens_for(Session, 'after_transaction_create')
+def _after_transaction_create(session, transaction):
+    if transaction.nested:
+        _savepoint_marks[transaction] = len(session.info.get('audit_pending', ()))
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_soft_rollback(session, previous_transaction):
+    # A rolled back savepoint (a failed continue_on_error batch step) drops
+    # only its own rows; the outer transaction's are still queued at commit
+    if previous_transaction.nested:
+        if 'audit_pending' in session.info:
+            del session.info['audit_pending'][_savepoint_marks.pop(previous_transaction, 0):]
+        return
+    session.info.pop('audit_pending', None)
+
+
+def _spool_line(tenant, row):
+    return json.dumps({'tenant': tenant, **row}, default=lambda d: d.isoformat()) + '\n'
+
+
+def _spool_path():
+    return os.path.join(AUDIT_SPOOL_DIR, f"{os.getpid()}.jsonl")
+
+
+def _enqueue(entries):
+    _ensure_flusher()
+    with _lock:
+        if AUDIT_BUFFER_MODE == 'spool':
+            # Durable before the request returns; replayed if we crash before flushing
+            if _state['spool'] is None:
+                os.makedirs(AUDIT_SPOOL_DIR, exist_ok=True)
+                _state['spool'] = open(_spool_path(), 'a', encoding='utf-8')
+            spool = _state['spool']
+            spool.write(''.join(_spool_line(tenant, row) for tenant, row in entries))
+            spool.flush()
+            os.fsync(spool.fileno())
+        _pending.extend(entries)
+        size = len(_pending)
+    metrics.inc('tms_audit_buffered_total', len(entries))
+    if size >= AUDIT_BUFFER_MAX_ROWS:
+        _wake.set()
+
+
+def _insert(entries, skip_existing=False):
+    """Multi-row INSERT of (tenant, row) entries, one transaction per tenant."""
+    from utils.session_manager import get_session
+    from utils.helpers import safe_close
+
+    by_tenant = {}
+    for tenant, row in entries:
+        by_tenant.setdefault(tenant, []).append(row)
+
+    table = DailyLogChange.__table__
+    for tenant, rows in by_tenant.items():
+        with tenancy.tenant_context(tenant):
+            session = get_session()
+            try:
+                if skip_existing:
+                    rows = _without_existing(session, rows)
+                rejected = []
+                try:
+                    for start in range(0, len(rows), _INSERT_CHUNK):
+                        session.execute(insert(table).values(rows[start:start + _INSERT_CHUNK]))
+                    session.commit()
+                except IntegrityError:
+                    # One bad row (e.g. its daily log was deleted) must not hold back the rest
+                    session.rollback()
+                    rejected = _insert_one_by_one(session, rows)
+                    _quarantine(tenant, rejected)
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                safe_close(session)
+        metrics.inc('tms_audit_flushed_rows_total', len(rows) - len(rejected))
+
+
+def _insert_one_by_one(session, rows):
+    """Insert rows each under a savepoint and commit; returns the ones the database rejected."""
+    table = DailyLogChange.__table__
+    rejected = []
+    for row in rows:
+        try:
+            with session.begin_nested():
+                session.execute(insert(table).values(row))
+        except IntegrityError:
+            rejected.append(row)
+    session.commit()
+    return rejected
+
+
+def _quarantine(tenant, rows):
+    """Park rejected rows in a .rejected spool file, which replay() never picks up."""
+    if not rows:
+        return
+    os.makedirs(AUDIT_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(AUDIT_SPOOL_DIR, f"{os.getpid()}-{time.time_ns()}.rejected")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(_spool_line(tenant, row) for row in rows))
+    metrics.inc('tms_audit_rejected_total', len(rows))
+    logger.error("audit insert rejected %d rows; kept in %s", len(rows), path)
+
+
+def _without_existing(session, rows):
+    # Replayed files may already be partly in the table (crash after commit)
+    table = DailyLogChange.__table__
+    log_ids = sorted({row['daily_log_id'] for row in rows})
+    existing = set()
+    for start in range(0, len(log_ids), _INSERT_CHUNK):
+        existing.update(tuple(r) for r in session.execute(
+            select(table.c.daily_log_id, table.c.changed_at)
+            .where(table.c.daily_log_id.in_(log_ids[start:start + _INSERT_CHUNK]))
+        ))
+    return [row for row in rows if (row['daily_log_id'], row['changed_at']) not in existing]
+
+
+def flush():
+    """Write every pending row now. Returns the number of rows flushed."""
+    with _lock:
+        entries = list(_pending)
+        _pending.clear()
+        in_flight = None
+        if _state['spool'] is not None:
+            _state['spool'].close()
+            _state['spool'] = None
+            in_flight = os.path.join(AUDIT_SPOOL_DIR, f"{os.getpid()}-{time.time_ns()}.flushing")
+            os.replace(_spool_path(), in_flight)
+    if not entries:
+        if in_flight:
+            os.remove(in_flight)
+        return 0
+
+    started = time.perf_counter()
+    try:
+        _insert(entries)
+    except Exception:
+        metrics.inc('tms_audit_flush_failures_total')
+        logger.exception("audit flush of %d rows failed; kept for replay", len(entries))
+        if in_flight is None:
+            # Memory mode: fall back to disk rather than lose the rows
+            os.makedirs(AUDIT_SPOOL_DIR, exist_ok=True)
+            in_flight = os.path.join(AUDIT_SPOOL_DIR, f"{os.getpid()}-{time.time_ns()}.flushing")
+            with open(in_flight, 'w', encoding='utf-8') as f:
+                f.write(''.join(_spool_line(tenant, row) for tenant, row in entries))
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(in_flight, in_flight[:-len('.flushing')] + '.ready')
+        _state['needs_replay'] = True
+        return 0
+
+    if in_flight:
+        os.remove(in_flight)
+    metrics.inc('tms_audit_flushes_total')
+    metrics.observe('tms_audit_flush_seconds', time.perf_counter() - started, metrics.LATENCY_BUCKETS)
+    return len(entries)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def _read_spool(path):
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash mid-write; it was never acknowledged
+                continue
+            tenant = data.pop('tenant', None)
+            data['changed_at'] = datetime.fromisoformat(data['changed_at'])
+            entries.append((tenant, data))
+    return entries
+
+
+def replay():
+    """Insert rows left in the spool by failed flushes or dead processes.
+
+    Each file is claimed with an atomic rename, so concurrent workers never
+    replay the same file; rows already in the table are skipped.
+    """
+    if not os.path.isdir(AUDIT_SPOOL_DIR):
+        return 0
+    replayed = 0
+    for path in sorted(glob.glob(os.path.join(AUDIT_SPOOL_DIR, '*'))):
+        name = os.path.basename(path)
+        owner = name.split('-', 1)[0].split('.', 1)[0]
+        orphaned = name.endswith(('.jsonl', '.flushing')) and owner.isdigit() and not _pid_alive(int(owner))
+        if not (name.endswith('.ready') or orphaned):
+            continue
+        claimed = os.path.join(AUDIT_SPOOL_DIR, f"{name}.replaying-{os.getpid()}")
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            continue
+        try:
+            entries = _read_spool(claimed)
+            if entries:
+                _insert(entries, skip_existing=True)
+        except Exception:
+            logger.exception("audit replay of %s failed", name)
+            os.replace(claimed, os.path.join(AUDIT_SPOOL_DIR, f"{os.getpid()}-{time.time_ns()}.ready"))
+            continue
+        os.remove(claimed)
+        replayed += len(entries)
+    if replayed:
+        logger.warning("replayed %d spooled audit rows", replayed)
+    return replayed
+
+
+def _flush_loop():
+    while True:
+        if _state['needs_replay']:
+            _state['needs_replay'] = False
+            try:
+                replay()
+            except Exception:
+                logger.exception("audit replay failed")
+                _state['needs_replay'] = True
+        _wake.wait(AUDIT_BUFFER_FLUSH_SECONDS)
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception("audit flush failed")
+
+
+def _ensure_flusher():
+    # One flusher thread per process; re-created in forked workers
+    if _state['pid'] != os.getpid():
+        _state['pid'] = os.getpid()
+        threading.Thread(target=_flush_loop, name='audit-flush', daemon=True).start()
+
+
+def _after_fork():
+    # The parent flushes its own rows; the child starts empty
+    global _lock
+    _lock = threading.Lock()
+    _pending.clear()
+    _state['spool'] = None
+    _state['needs_replay'] = True
+
+
+def pending_count():
+    with _lock:
+        return len(_pending)
+
+
+def init_audit_buffer(app):
+    """Start the flusher (which first replays any spool) when buffering is on."""
+    if not enabled():
+        if AUDIT_BUFFER_MODE != 'off':
+            raise RuntimeError(f'Unknown AUDIT_BUFFER_MODE "{AUDIT_BUFFER_MODE}".')
+        return
+    metrics.add_gauge_source(lambda: {('tms_audit_buffer_pending', ()): pending_count()})
+    _ensure_flusher()
+
+
+def _flush_at_exit():
+    if enabled():
+        flush()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(_flush_at_exit)
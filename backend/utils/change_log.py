@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, tuple_, func, text, true
+from sqlalchemy.orm import undefer
+from models.change_log import ChangeLog
+from models.employee import Employee
+from models.timesheet import Timesheet
+from models.dailylogs import DailyLog
+
+SYNC_MODELS = {
+    'employees': Employee,
+    'timesheets': Timesheet,
+    'daily_logs': DailyLog,
+}
+
+# Position before the first change
+START = (0, 0)
+
+
+def encode_token(position):
+    return f"{position[0]}.{position[1]}"
+
+
+def decode_token(token):
+    """(txid, seq) from a token; raises ValueError for anything else."""
+    txid, seq = token.split('.')
+    position = (int(txid), int(seq))
+    if position[0] < 0 or position[1] < 0:
+        raise ValueError(token)
+    return position
+
+
+def _stable_filter(session):
+    """Only transactions older than every running one: their rows can no longer change.
+
+    On SQLite writes are serialized, so every committed row is stable.
+    """
+    if session.get_bind().dialect.name == 'sqlite':
+        return true()
+    xmin = session.execute(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).scalar()
+    return ChangeLog.txid < xmin
+
+
+def head(session):
+    """Position of the newest stable change."""
+    row = session.execute(
+        select(ChangeLog.txid, ChangeLog.seq)
+        .where(_stable_filter(session))
+        .order_by(ChangeLog.txid.desc(), ChangeLog.seq.desc())
+        .limit(1)
+    ).first()
+    return tuple(row) if row else START
+
+
+def is_retained(session, position):
+    """False when the change a token points at has been pruned."""
+    if position == START:
+        # Nothing pruned yet (a rolled-back first insert can make this a false alarm)
+        first = session.query(func.min(ChangeLog.seq)).scalar()
+        return first is None or first == 1
+    return session.execute(
+        select(ChangeLog.seq).where(ChangeLog.txid == position[0], ChangeLog.seq == position[1])
+    ).first() is not None
+
+
+def read_changes(session, since, limit):
+    """Rows changed after since, at most `limit` log entries.
+
+    Returns (changes, position, has_more) where changes maps table name to
+    {'upserted': [row dicts], 'deleted': [ids]}, only for tables that
+    changed. A row's last entry in the page decides which list it is in.
+    """
+    entries = session.execute(
+        select(ChangeLog.txid, ChangeLog.seq, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.action)
+        .where(tuple_(ChangeLog.txid, ChangeLog.seq) > tuple_(*since), _stable_filter(session))
+        .order_by(ChangeLog.txid, ChangeLog.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return {}, since, False
+
+    last_action = {}
+    for entry in entries:
+        last_action[(entry.table_name, entry.row_id)] = entry.action
+
+    changes = {}
+    for table, model in SYNC_MODELS.items():
+        upserted_ids = sorted(row_id for (name, row_id), action in last_action.items()
+                              if name == table and action == 'upsert')
+        deleted_ids = sorted(row_id for (name, row_id), action in last_action.items()
+                             if name == table and action == 'delete')
+        rows = []
+        if upserted_ids:
+            query = session.query(model)
+            if model is DailyLog:
+                query = query.options(undefer(DailyLog.description))
+            rows = query.filter(model.id.in_(upserted_ids)).order_by(model.id).all()
+            # Deleted after this page's entry; the tombstone is in a later page
+            deleted_ids = sorted(set(deleted_ids) | (set(upserted_ids) - {row.id for row in rows}))
+        if rows or deleted_ids:
+            changes[table] = {'upserted': [row.as_dict() for row in rows], 'deleted': deleted_ids}
+
+    last = entries[-1]
+    return changes, (last.txid, last.seq), has_more
+
+
+def prune(session, older_than_days):
+    """Delete log entries older than the cutoff, always keeping the newest one.
+
+    Clients holding a token from a pruned entry get 410 and resync fully.
+    Returns the number of entries deleted.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    newest = session.execute(
+        select(ChangeLog.seq).order_by(ChangeLog.txid.desc(), ChangeLog.seq.desc()).limit(1)
+    ).scalar()
+    if newest is None:
+        return 0
+    result = session.execute(
+        delete(ChangeLog).where(ChangeLog.changed_at < cutoff, ChangeLog.seq != newest)
+    )
+    return result.rowcount
@@ -0,0 +1,236 @@
+import threading
+import time
+import zlib
+from flask import request
+from config.config import (
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_ZSTD_LEVEL,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Server preference when the client accepts several encodings equally
+_PREFERENCE = ['br', 'zstd', 'gzip']
+
+# Flush streamed output after this much input has been compressed
+_STREAM_FLUSH_BYTES = 16384
+
+_COMPRESSIBLE_TYPES = {'application/json', 'text/plain', 'text/csv', 'text/html'}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class _GzipCompressor:
+    def __init__(self):
+        self._obj = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+def available_encodings():
+    """Return the encodings this process can produce, in preference order."""
+    available = {'gzip': True, 'br': brotli is not None, 'zstd': zstandard is not None}
+    return [enc for enc in _PREFERENCE if available[enc]]
+
+
+def _new_compressor(encoding):
+    if encoding == 'br':
+        return _BrotliCompressor()
+    if encoding == 'zstd':
+        return _ZstdCompressor()
+    return _GzipCompressor()
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best encoding from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for enc in available_encodings():
+        q = weights.get(enc, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def _record(route, encoding, bytes_in, bytes_out, cpu_seconds):
+    with _stats_lock:
+        entry = _stats.setdefault(route, {
+            'responses': 0, 'skipped': 0, 'bytes_in': 0, 'bytes_out': 0,
+            'cpu_seconds': 0.0, 'encodings': {}
+        })
+        entry['responses'] += 1
+        entry['bytes_in'] += bytes_in
+        entry['bytes_out'] += bytes_out
+        entry['cpu_seconds'] += cpu_seconds
+        entry['encodings'][encoding] = entry['encodings'].get(encoding, 0) + 1
+
+
+def _record_skipped(route):
+    with _stats_lock:
+        entry = _stats.setdefault(route, {
+            'responses': 0, 'skipped': 0, 'bytes_in': 0, 'bytes_out': 0,
+            'cpu_seconds': 0.0, 'encodings': {}
+        })
+        entry['skipped'] += 1
+
+
+def get_compression_stats():
+    """Per-route compression ratio and CPU cost since process start."""
+    with _stats_lock:
+        result = {}
+        for route, entry in _stats.items():
+            compressed = entry['responses']
+            result[route] = {
+                'compressed_responses': compressed,
+                'skipped_below_threshold': entry['skipped'],
+                'bytes_in': entry['bytes_in'],
+                'bytes_out': entry['bytes_out'],
+                'ratio': round(entry['bytes_in'] / entry['bytes_out'], 3) if entry['bytes_out'] else None,
+                'cpu_ms_total': round(entry['cpu_seconds'] * 1000, 3),
+                'cpu_ms_per_response': round(entry['cpu_seconds'] * 1000 / compressed, 3) if compressed else None,
+                'encodings': dict(entry['encodings']),
+            }
+        return result
+
+
+def _stream(iterable, compressor, route, encoding):
+    """Compress a streamed body incrementally.
+
+    Output is flushed every _STREAM_FLUSH_BYTES of input so clients keep
+    receiving data without the ratio collapsing on many small chunks.
+    """
+    bytes_in = bytes_out = pending = 0
+    cpu = 0.0
+    try:
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            start = time.thread_time()
+            out = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= _STREAM_FLUSH_BYTES:
+                out += compressor.flush()
+                pending = 0
+            cpu += time.thread_time() - start
+            bytes_in += len(chunk)
+            bytes_out += len(out)
+            if out:
+                yield out
+        start = time.thread_time()
+        tail = compressor.finish()
+        cpu += time.thread_time() - start
+        bytes_out += len(tail)
+        if tail:
+            yield tail
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+        _record(route, encoding, bytes_in, bytes_out, cpu)
+
+
+def compress_response(response):
+    """after_request hook: compress the body according to Accept-Encoding."""
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in _COMPRESSIBLE_TYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if not encoding:
+        return response
+
+    route = request.url_rule.rule if request.url_rule else request.path
+
+    if response.is_streamed:
+        response.response = _stream(response.response, _new_compressor(encoding), route, encoding)
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Content-Length', None)
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        _record_skipped(route)
+        return response
+
+    start = time.thread_time()
+    compressor = _new_compressor(encoding)
+    body = compressor.compress(data) + compressor.finish()
+    cpu = time.thread_time() - start
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    _record(route, encoding, len(data), len(body), cpu)
+    return response
+
+
+def init_compression(app):
+    """Register response compression on a Flask app."""
+    app.after_request(compress_response)
@@ -0,0 +1,170 @@
+from sqlalchemy import select, insert, delete, literal, func, text, true
+from sqlalchemy.orm import aliased
+from config.config import EMPLOYEE_CLOSURE_ENABLED
+from models.employee import Employee
+from models.employee_closure import EmployeeClosure
+
+# Guards the rebuild against reports_to cycles
+_MAX_DEPTH = 100
+
+# Any constant works; all closure writers take the same advisory lock
+_LOCK_KEY = 724_001
+
+
+def enabled():
+    return EMPLOYEE_CLOSURE_ENABLED
+
+
+def _lock(session):
+    """Serialize closure writers for the rest of the transaction.
+
+    Two concurrent subtree moves would otherwise each compute their links
+    from a closure the other is changing.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': _LOCK_KEY})
+
+
+def add_employee(session, employee_id, manager_id):
+    """Closure rows for a new leaf: itself, plus every ancestor of its manager."""
+    _lock(session)
+    closure = EmployeeClosure.__table__
+    session.execute(insert(closure).values(ancestor_id=employee_id, descendant_id=employee_id, depth=0))
+    if manager_id is not None:
+        session.execute(insert(closure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(closure.c.ancestor_id, literal(employee_id), closure.c.depth + 1)
+            .where(closure.c.descendant_id == manager_id)
+        ))
+
+
+def add_employees(session, employee_ids):
+    """add_employee for many new leaves at once; their managers need closure rows already."""
+    _lock(session)
+    closure = EmployeeClosure.__table__
+    employees = Employee.__table__
+    session.execute(insert(closure), [
+        {'ancestor_id': employee_id, 'descendant_id': employee_id, 'depth': 0} for employee_id in employee_ids
+    ])
+    session.execute(insert(closure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(closure.c.ancestor_id, employees.c.id, closure.c.depth + 1)
+        .join(employees, employees.c.reports_to == closure.c.descendant_id)
+        .where(employees.c.id.in_(employee_ids))
+    ))
+
+
+def move_subtree(session, employee_id, new_manager_id):
+    """Re-hang employee_id and everyone below it under new_manager_id (or nothing).
+
+    Links from the old ancestors into the subtree are deleted, then every
+    ancestor of the new manager is linked to every subtree member. Links
+    inside the subtree are untouched.
+    """
+    _lock(session)
+    closure = EmployeeClosure.__table__
+    subtree = select(closure.c.descendant_id).where(closure.c.ancestor_id == employee_id)
+    old_ancestors = select(closure.c.ancestor_id).where(
+        closure.c.descendant_id == employee_id, closure.c.ancestor_id != employee_id
+    )
+    session.execute(delete(closure).where(
+        closure.c.descendant_id.in_(subtree.scalar_subquery()),
+        closure.c.ancestor_id.in_(old_ancestors.scalar_subquery())
+    ))
+    if new_manager_id is not None:
+        above = aliased(EmployeeClosure, name='above')
+        below = aliased(EmployeeClosure, name='below')
+        session.execute(insert(closure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .join_from(above, below, true())
+            .where(above.descendant_id == new_manager_id, below.ancestor_id == employee_id)
+        ))
+
+
+def remove_employees(session, ids, reassign_to_id=None):
+    """Closure upkeep for offboarding ids; call before the employees are deleted.
+
+    Each direct report outside ids keeps its subtree and moves under
+    reassign_to_id (or becomes a root), then every row touching ids goes.
+    """
+    _lock(session)
+    orphans = [row.id for row in session.query(Employee.id)
+               .filter(Employee.reports_to.in_(ids), ~Employee.id.in_(ids))
+               .order_by(Employee.id)]
+    for orphan_id in orphans:
+        move_subtree(session, orphan_id, reassign_to_id)
+    closure = EmployeeClosure.__table__
+    session.execute(delete(closure).where(
+        closure.c.ancestor_id.in_(ids) | closure.c.descendant_id.in_(ids)
+    ))
+
+
+def is_descendant(session, employee_id, ancestor_id):
+    """True when employee_id is ancestor_id or anywhere below it."""
+    return session.query(EmployeeClosure.depth).filter_by(
+        ancestor_id=ancestor_id, descendant_id=employee_id
+    ).first() is not None
+
+
+def ancestors(session, employee_id):
+    """Managers above employee_id, nearest first, as Employee rows."""
+    return session.query(Employee) \
+        .join(EmployeeClosure, EmployeeClosure.ancestor_id == Employee.id) \
+        .filter(EmployeeClosure.descendant_id == employee_id, EmployeeClosure.depth > 0) \
+        .order_by(EmployeeClosure.depth) \
+        .all()
+
+
+def descendants(session, employee_id, max_depth=None):
+    """(Employee, depth) for everyone below employee_id, shallowest first."""
+    query = session.query(Employee, EmployeeClosure.depth) \
+        .join(EmployeeClosure, EmployeeClosure.descendant_id == Employee.id) \
+        .filter(EmployeeClosure.ancestor_id == employee_id, EmployeeClosure.depth > 0)
+    if max_depth is not None:
+        query = query.filter(EmployeeClosure.depth <= max_depth)
+    return query.order_by(EmployeeClosure.depth, Employee.id).all()
+
+
+def _expected():
+    """Closure rows derived from reports_to with a recursive CTE."""
+    employees = Employee.__table__
+    paths = select(
+        employees.c.id.label('ancestor_id'), employees.c.id.label('descendant_id'), literal(0).label('depth')
+    ).cte(name='paths', recursive=True)
+    return paths.union_all(
+        select(paths.c.ancestor_id, employees.c.id, paths.c.depth + 1)
+        .join(employees, employees.c.reports_to == paths.c.descendant_id)
+        .where(paths.c.depth < _MAX_DEPTH)
+    )
+
+
+def rebuild(session):
+    """Recompute the whole table from reports_to. Returns the row count."""
+    _lock(session)
+    closure = EmployeeClosure.__table__
+    session.execute(delete(closure))
+    paths = _expected()
+    session.execute(insert(closure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth)
+    ))
+    return session.query(func.count()).select_from(closure).scalar()
+
+
+def check(session, sample=20):
+    """Compare the table with reports_to.
+
+    Returns {'missing': [...], 'unexpected': [...]} of (ancestor, descendant,
+    depth) tuples, at most `sample` each; both empty means consistent.
+    """
+    closure = EmployeeClosure.__table__
+    paths = _expected()
+    expected = select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth)
+    actual = select(closure.c.ancestor_id, closure.c.descendant_id, closure.c.depth)
+    missing = session.execute(expected.except_(actual).limit(sample)).all()
+    unexpected = session.execute(actual.except_(expected).limit(sample)).all()
+    return {
+        'missing': [tuple(row) for row in missing],
+        'unexpected': [tuple(row) for row in unexpected],
+    }
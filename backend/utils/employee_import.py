@@ -0,0 +1,161 @@
+"""Bulk import of an org dump (POST /api/employees/bulk, useful/import_employees.py).
+
+Rows carry employee_name, email and an optional manager_email naming
+either another row of the same dump or an existing employee. Everything
+is checked before anything is written: bad fields, duplicate or existing
+emails, unknown managers and reporting cycles all become per-row errors,
+and a row whose manager row failed fails too. A clean dump is then
+inserted level by level in dependency order (top managers first), one
+multi-row INSERT per batch, so a level's reports_to ids are known before
+the next level is written. The caller owns the transaction.
+"""
+import csv
+import io
+from sqlalchemy import insert, select
+from config.config import EMPLOYEE_IMPORT_MAX_ROWS, EMPLOYEE_IMPORT_BATCH_SIZE
+from models.employee import Employee
+from utils import employee_closure, schemas
+
+
+def parse_csv(text):
+    """Rows of a CSV dump with a header line, as dicts."""
+    reader = csv.DictReader(io.StringIO(text), skipinitialspace=True)
+    if not reader.fieldnames or 'email' not in reader.fieldnames:
+        raise ValueError('CSV needs a header row with employee_name, email and manager_email.')
+    return [{key: value for key, value in row.items() if key is not None} for row in reader]
+
+
+def _existing_ids(session, emails):
+    """{email: id} of employees already in the database, in IN-list chunks."""
+    emails = list(emails)
+    found = {}
+    for start in range(0, len(emails), EMPLOYEE_IMPORT_BATCH_SIZE):
+        chunk = emails[start:start + EMPLOYEE_IMPORT_BATCH_SIZE]
+        found.update(session.execute(select(Employee.email, Employee.id).where(Employee.email.in_(chunk))).all())
+    return found
+
+
+def _cycle(start, manager_of):
+    """The reporting loop reached from start, as a list of emails ending where it began.
+
+    None when the chain leaves manager_of first (a manager above failed).
+    """
+    path, seen = [], {}
+    current = start
+    while current not in seen:
+        if current not in manager_of:
+            return None
+        seen[current] = len(path)
+        path.append(current)
+        current = manager_of[current]
+    return path[seen[current]:] + [current]
+
+
+def plan(session, rows):
+    """Validate rows and order them for insert.
+
+    Returns (levels, errors): levels is a list of lists of valid rows,
+    each row's manager in an earlier level or already in the database;
+    errors is [{'row': n, 'email': ..., 'error': ...}] with n counted from
+    1. Any error means nothing should be inserted.
+    """
+    if not isinstance(rows, list) or not rows:
+        raise ValueError('Provide a non-empty list of employees.')
+    if len(rows) > EMPLOYEE_IMPORT_MAX_ROWS:
+        raise ValueError(f'At most {EMPLOYEE_IMPORT_MAX_ROWS} employees per import.')
+
+    errors = {}
+    valid = {}
+    for number, raw in enumerate(rows, start=1):
+        try:
+            row = schemas.load(schemas.EMPLOYEE_IMPORT, raw)
+        except schemas.SchemaError as e:
+            errors[number] = str(e)
+            continue
+        if row['email'] in valid:
+            errors[number] = f"Duplicate email; also on row {valid[row['email']]['row']}."
+            continue
+        if row.get('manager_email') == row['email']:
+            errors[number] = 'Employee cannot report to themselves.'
+            continue
+        valid[row['email']] = dict(row, row=number)
+
+    existing = _existing_ids(session, valid)
+    for email in existing:
+        errors[valid.pop(email)['row']] = 'An employee with this email already exists.'
+
+    # Managers named by the dump that are not rows of it must already exist;
+    # rows dropped above still count as "in the dump" so their reports fail below
+    dumped = {raw['email'] for raw in rows if isinstance(raw, dict) and isinstance(raw.get('email'), str)}
+    outside = {row['manager_email'] for row in valid.values()
+               if row.get('manager_email') and row['manager_email'] not in dumped}
+    managers = _existing_ids(session, outside)
+
+    # Kahn's algorithm over the in-dump edges, one level at a time
+    reports = {}
+    waiting = {}
+    level = []
+    for email, row in valid.items():
+        manager_email = row.get('manager_email')
+        if not manager_email or manager_email in managers:
+            row['reports_to'] = managers.get(manager_email)
+            level.append(row)
+        elif manager_email in valid:
+            reports.setdefault(manager_email, []).append(row)
+            waiting[email] = row
+        elif manager_email in dumped:
+            errors[row['row']] = f'Manager {manager_email} is on a row with errors.'
+        else:
+            errors[row['row']] = f'Manager {manager_email} not found.'
+
+    levels = []
+    while level:
+        levels.append(level)
+        level = [report for row in level for report in reports.pop(row['email'], [])]
+        for row in level:
+            waiting.pop(row['email'])
+
+    # Still waiting: on a loop, below one, or below a manager row that failed
+    manager_of = {email: row['manager_email'] for email, row in waiting.items()}
+    for email, row in waiting.items():
+        loop = _cycle(email, manager_of)
+        if loop is None:
+            errors[row['row']] = f"Manager {row['manager_email']} is on a row with errors, or under one."
+        elif loop[0] == email:
+            errors[row['row']] = 'Reporting cycle: ' + ' -> '.join(loop)
+        else:
+            errors[row['row']] = 'Reports into a reporting cycle: ' + ' -> '.join(loop)
+
+    report = [{'row': number, 'email': rows[number - 1].get('email') if isinstance(rows[number - 1], dict) else None,
+               'error': message} for number, message in sorted(errors.items())]
+    return levels, report
+
+
+def insert_levels(session, levels):
+    """Insert planned rows; returns [{'row', 'id', 'email', 'reports_to'}] in insert order."""
+    employees = Employee.__table__
+    ids = {}
+    created = []
+    for level in levels:
+        level_ids = []
+        for start in range(0, len(level), EMPLOYEE_IMPORT_BATCH_SIZE):
+            batch = level[start:start + EMPLOYEE_IMPORT_BATCH_SIZE]
+            values = [{
+                'employee_name': row['employee_name'],
+                'email': row['email'],
+                # The first level's managers were resolved by plan()
+                'reports_to': row['reports_to'] if 'reports_to' in row else ids[row['manager_email']],
+            } for row in batch]
+            # RETURNING over a multi-row insert; rows come back in input order
+            result = session.execute(
+                insert(employees).returning(employees.c.id, employees.c.email, sort_by_parameter_order=True),
+                values
+            )
+            for row, value, (new_id, email) in zip(batch, values, result):
+                ids[email] = new_id
+                level_ids.append(new_id)
+                created.append({'row': row['row'], 'id': new_id, 'email': email, 'reports_to': value['reports_to']})
+        if employee_closure.enabled():
+            # Each level's managers already have their closure rows
+            employee_closure.add_employees(session, level_ids)
+    return created
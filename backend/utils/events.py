@@ -0,0 +1,431 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import re
+import select as select_module
+import socket
+import threading
+import time
+import weakref
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+from config.config import (
+    EVENTS_BACKEND,
+    EVENTS_SOCKET_DIR,
+    EVENTS_CHANNEL,
+    EVENTS_HEARTBEAT_SECONDS,
+    EVENTS_MAX_STREAM_SECONDS,
+    EVENTS_QUEUE_SIZE,
+    EVENTS_MAX_STREAMS,
+)
+from models.timesheet import Timesheet
+from models.dailylogs import DailyLog
+from models.dailylogschanges import DailyLogChange
+from utils import metrics, tenancy
+
+logger = logging.getLogger('tms.events')
+
+_CHANNEL_PATTERN = re.compile(r'^[a-z_][a-z0-9_]{0,62}$')
+# NOTIFY payloads are limited to 8000 bytes; unix datagrams are kept well below their limit too
+_MAX_PAYLOAD = {'postgres': 7900, 'socket': 60000}
+_RECONNECT_SECONDS = 2.0
+
+_lock = threading.Lock()
+_subscribers = set()
+_state = {'listener_pid': None, 'sender': None, 'sender_pid': None, 'socket_path': None}
+
+
+def enabled():
+    return EVENTS_BACKEND in ('memory', 'socket', 'postgres')
+
+
+class Subscription:
+    """One open stream: its tenant, the employees it follows and a bounded queue."""
+
+    def __init__(self, tenant, employee_ids):
+        self.tenant = tenant
+        self.employee_ids = employee_ids
+        self.queue = queue.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, change):
+        if change['tenant'] != self.tenant:
+            return False
+        return self.employee_ids is None or change.get('employee_id') in self.employee_ids
+
+
+# ---------------- Capturing changes ----------------
+
+def _describe(obj, action):
+    if isinstance(obj, Timesheet):
+        return {'type': 'timesheet', 'action': action, 'id': obj.id,
+                'employee_id': obj.employee_id, 'version': obj.version}
+    if isinstance(obj, DailyLog):
+        return {'type': 'daily_log', 'action': action, 'id': obj.id, 'timesheet_id': obj.timesheet_id,
+                'log_date': obj.log_date.isoformat() if obj.log_date else None, 'version': obj.version}
+    if isinstance(obj, DailyLogChange):
+        return {'type': 'log_change', 'action': action, 'id': obj.id, 'daily_log_id': obj.daily_log_id}
+    return None
+
+
+def _resolve_owners(session, changes):
+    """Fill in employee_id (and timesheet_id for log changes) from the session, else the database."""
+    log_timesheet = {}
+    timesheet_owner = {}
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, DailyLog):
+            log_timesheet[obj.id] = obj.timesheet_id
+        elif isinstance(obj, Timesheet):
+            timesheet_owner[obj.id] = obj.employee_id
+    for change in changes:
+        if change['type'] == 'daily_log':
+            log_timesheet[change['id']] = change['timesheet_id']
+        elif change['type'] == 'timesheet':
+            timesheet_owner[change['id']] = change['employee_id']
+
+    missing_logs = {c['daily_log_id'] for c in changes if c['type'] == 'log_change'} - set(log_timesheet)
+    if missing_logs:
+        log_timesheet.update(session.execute(
+            select(DailyLog.id, DailyLog.timesheet_id).where(DailyLog.id.in_(missing_logs))
+        ).all())
+    for change in changes:
+        if change['type'] == 'log_change':
+            change['timesheet_id'] = log_timesheet.get(change['daily_log_id'])
+
+    missing_timesheets = {c['timesheet_id'] for c in changes if c['type'] != 'timesheet'} \
+        - set(timesheet_owner) - {None}
+    if missing_timesheets:
+        timesheet_owner.update(session.execute(
+            select(Timesheet.id, Timesheet.employee_id).where(Timesheet.id.in_(missing_timesheets))
+        ).all())
+    for change in changes:
+        if change['type'] != 'timesheet':
+            change['employee_id'] = timesheet_owner.get(change['timesheet_id'])
+
+
+def record(session, change):
+    """Queue a change made outside the ORM unit of work (e.g. a buffered audit row).
+
+    Published with the session's other changes once it commits.
+    """
+    if not enabled():
+        return
+    change['tenant'] = tenancy.current_tenant()
+    session.info.setdefault('events_unresolved', []).append(change)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    if not enabled():
+        return
+    changes = []
+    for objects, action in ((session.new, 'created'), (session.dirty, 'updated'), (session.deleted, 'deleted')):
+        for obj in objects:
+            if action == 'updated' and not session.is_modified(obj, include_collections=False):
+                continue
+            change = _describe(obj, action)
+            if change is not None:
+                changes.append(change)
+    if not changes:
+        return
+    tenant = tenancy.current_tenant()
+    for change in changes:
+        change['tenant'] = tenant
+    _resolve_owners(session, changes)
+    session.info.setdefault('events_pending', []).extend(changes)
+
+
+@event.listens_for(Session, 'before_commit')
+def _before_commit(session):
+    unresolved = session.info.pop('events_unresolved', None)
+    if unresolved:
+        _resolve_owners(session, unresolved)
+        session.info.setdefault('events_pending', []).extend(unresolved)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    changes = session.info.pop('events_pending', None)
+    if changes:
+        publish(changes)
+
+
+_QUEUES = ('events_pending', 'events_unresolved')
+# Savepoint -> how much of each queue existed when it began
+_savepoint_marks = weakref.WeakKeyDictionary()
+
+
+@event.listens_for(Session, 'after_transaction_create')
+def _after_transaction_create(session, transaction):
+    if transaction.nested:
+        _savepoint_marks[transaction] = {key: len(session.info.get(key, ())) for key in _QUEUES}
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_soft_rollback(session, previous_transaction):
+    # A savepoint rollback drops only what was queued inside it (it fires
+    # after_rollback as well, so that hook cannot tell the two apart)
+    if previous_transaction.nested:
+        for key, mark in _savepoint_marks.pop(previous_transaction, {}).items():
+            if key in session.info:
+                del session.info[key][mark:]
+        return
+    for key in _QUEUES:
+        session.info.pop(key, None)
+
+
+# ---------------- Fan-out ----------------
+
+def _chunks(changes, limit):
+    """JSON arrays of changes, each under limit bytes."""
+    batch, size = [], 2
+    for change in changes:
+        encoded = json.dumps(change, separators=(',', ':'))
+        if batch and size + len(encoded) + 1 > limit:
+            yield '[' + ','.join(batch) + ']'
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield '[' + ','.join(batch) + ']'
+
+
+def publish(changes):
+    """Hand committed changes to every subscriber, in this process or (per backend) others."""
+    for change in changes:
+        metrics.inc('tms_events_published_total', type=change['type'], action=change['action'])
+    try:
+        if EVENTS_BACKEND == 'memory':
+            _dispatch(changes)
+        elif EVENTS_BACKEND == 'socket':
+            for payload in _chunks(changes, _MAX_PAYLOAD['socket']):
+                _socket_send(payload.encode('utf-8'))
+        elif EVENTS_BACKEND == 'postgres':
+            _notify(list(_chunks(changes, _MAX_PAYLOAD['postgres'])))
+    except Exception:
+        # The transaction is already committed; a missed event only delays a client refresh
+        metrics.inc('tms_events_publish_failures_total')
+        logger.exception("publishing %d events failed", len(changes))
+
+
+def _dispatch(changes):
+    with _lock:
+        subscribers = list(_subscribers)
+    for sub in subscribers:
+        for change in changes:
+            if change['type'] == 'resync' or sub.wants(change):
+                try:
+                    sub.queue.put_nowait(change)
+                except queue.Full:
+                    sub.overflowed = True
+
+
+def _resync_all():
+    # Events may have been missed (listener reconnect); clients should reload
+    _dispatch([{'type': 'resync', 'action': 'reload'}])
+
+
+# Unix datagram sockets: one per listening worker in EVENTS_SOCKET_DIR
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def _socket_send(data):
+    if _state['sender_pid'] != os.getpid():
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        _state['sender'], _state['sender_pid'] = sender, os.getpid()
+    for path in glob.glob(os.path.join(EVENTS_SOCKET_DIR, '*.sock')):
+        try:
+            _state['sender'].sendto(data, path)
+        except BlockingIOError:
+            # That worker is not keeping up; its streams will miss this one
+            metrics.inc('tms_events_dropped_total')
+        except (ConnectionRefusedError, FileNotFoundError):
+            owner = os.path.basename(path)[:-len('.sock')]
+            if owner.isdigit() and not _pid_alive(int(owner)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _socket_listen(sock):
+    while True:
+        data = sock.recv(_MAX_PAYLOAD['socket'] + 4096)
+        try:
+            _dispatch(json.loads(data))
+        except ValueError:
+            logger.warning("ignored malformed event datagram")
+
+
+def _start_socket_listener():
+    os.makedirs(EVENTS_SOCKET_DIR, exist_ok=True)
+    path = os.path.join(EVENTS_SOCKET_DIR, f"{os.getpid()}.sock")
+    if os.path.exists(path):
+        os.remove(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    _state['socket_path'] = path
+    threading.Thread(target=_socket_listen, args=(sock,), name='events-socket', daemon=True).start()
+
+
+# Postgres LISTEN/NOTIFY on the main database
+
+def _notify(payloads):
+    from utils.session_manager import get_engine
+
+    with get_engine().connect() as conn:
+        for payload in payloads:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': EVENTS_CHANNEL, 'payload': payload})
+        conn.commit()
+
+
+def _notifications(dbapi_connection, timeout):
+    if hasattr(dbapi_connection, 'poll'):
+        # psycopg2
+        if select_module.select([dbapi_connection], [], [], timeout)[0]:
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                yield dbapi_connection.notifies.pop(0).payload
+    else:
+        # psycopg 3
+        for notify in dbapi_connection.notifies(timeout=timeout):
+            yield notify.payload
+
+
+def _pg_listen():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+    from utils.session_manager import get_engine
+
+    # A dedicated, unpooled connection: it stays in LISTEN for the life of the worker
+    listener = create_engine(get_engine().url, poolclass=NullPool)
+    connected_before = False
+    while True:
+        try:
+            raw = listener.raw_connection()
+            try:
+                dbapi_connection = raw.driver_connection
+                dbapi_connection.autocommit = True
+                cursor = dbapi_connection.cursor()
+                cursor.execute(f'LISTEN "{EVENTS_CHANNEL}"')
+                cursor.close()
+                if connected_before:
+                    _resync_all()
+                connected_before = True
+                while True:
+                    for payload in _notifications(dbapi_connection, EVENTS_HEARTBEAT_SECONDS):
+                        _dispatch(json.loads(payload))
+            finally:
+                raw.close()
+        except Exception:
+            logger.exception("event listener lost its connection; reconnecting")
+            time.sleep(_RECONNECT_SECONDS)
+
+
+def _ensure_listener():
+    # One listener per process; re-created in forked workers
+    if EVENTS_BACKEND == 'memory' or _state['listener_pid'] == os.getpid():
+        return
+    _state['listener_pid'] = os.getpid()
+    if EVENTS_BACKEND == 'socket':
+        _start_socket_listener()
+    else:
+        threading.Thread(target=_pg_listen, name='events-listen', daemon=True).start()
+
+
+# ---------------- Streams ----------------
+
+def subscribe(tenant, employee_ids=None):
+    """Register a stream for tenant's changes (to employee_ids only, if given).
+
+    Returns None when this worker already has EVENTS_MAX_STREAMS open.
+    """
+    with _lock:
+        if len(_subscribers) >= EVENTS_MAX_STREAMS:
+            metrics.inc('tms_event_streams_rejected_total')
+            return None
+        _ensure_listener()
+        sub = Subscription(tenant, employee_ids)
+        _subscribers.add(sub)
+    return sub
+
+
+def unsubscribe(sub):
+    with _lock:
+        _subscribers.discard(sub)
+
+
+def _format(change):
+    data = {key: value for key, value in change.items() if key != 'tenant'}
+    return f"event: {change['type']}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(sub):
+    """text/event-stream body for sub.
+
+    Comments keep idle connections open (and reveal closed ones); the stream
+    ends after EVENTS_MAX_STREAM_SECONDS, or with a resync event if the
+    client fell too far behind, and EventSource reconnects on its own.
+    """
+    try:
+        yield f"retry: {int(_RECONNECT_SECONDS * 1000)}\n\n"
+        deadline = time.monotonic() + EVENTS_MAX_STREAM_SECONDS
+        while True:
+            if sub.overflowed:
+                metrics.inc('tms_events_dropped_total')
+                yield _format({'type': 'resync', 'action': 'reload'})
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                change = sub.queue.get(timeout=min(EVENTS_HEARTBEAT_SECONDS, remaining))
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield _format(change)
+    finally:
+        unsubscribe(sub)
+
+
+def stream_count():
+    with _lock:
+        return len(_subscribers)
+
+
+def _after_fork():
+    # Streams belong to the parent; the child starts with none
+    global _lock
+    _lock = threading.Lock()
+    _subscribers.clear()
+
+
+def _remove_socket():
+    path = _state['socket_path']
+    if path and os.path.basename(path) == f"{os.getpid()}.sock" and os.path.exists(path):
+        os.remove(path)
+
+
+def init_events(app):
+    """Validate EVENTS_BACKEND and report open streams in /metrics."""
+    if not enabled():
+        if EVENTS_BACKEND != 'off':
+            raise RuntimeError(f'Unknown EVENTS_BACKEND "{EVENTS_BACKEND}".')
+        return
+    if not _CHANNEL_PATTERN.match(EVENTS_CHANNEL):
+        raise RuntimeError(f'EVENTS_CHANNEL "{EVENTS_CHANNEL}" is not a valid channel name.')
+    metrics.add_gauge_source(lambda: {('tms_event_streams', ()): stream_count()})
+
+
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(_remove_socket)
@@ -1,12 +1,18 @@
 from datetime import datetime,timedelta,date
 import re
+from flask import jsonify
+from sqlalchemy import func, cast, Float
+from utils import metrics
+from utils.session_manager import SharedSession
+
+_EMAIL_PATTERN = re.compile(r"^[^@]+@[^@]+\.[^@]+$")
+_TIME_PATTERN = re.compile(r'^\d{2}:\d{2}$')
 
 
 def is_valid_email(email):
     """Check if the email is valid using regex.
     """
-    pattern = r"^[^@]+@[^@]+\.[^@]+$"
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_PATTERN.match(email))
 
 def get_day_of_week(date_obj):
     """Return the day of the week for a given date object (e.g., 'Monday').
@@ -27,14 +33,23 @@ def format_datetime(dt):
         return None
     return dt.isoformat()
 
+def version_conflict(current):
+    """409 response for a stale write, carrying the row as it is now."""
+    return jsonify({
+        'error': 'This record was changed by someone else. Reload it and try again.',
+        'current': current.as_dict() if current is not None else None
+    }), 409
+
 def safe_close(session):
+    if isinstance(session, SharedSession):
+        # Handed out uncounted by get_session; shared_session closes and counts it
+        return
     try:
         session.close()
+        metrics.inc('tms_db_sessions_closed_total')
     except:
         pass
 
-    
-from datetime import timedelta
 
 def calculate_total_hours(morning_in, morning_out, afternoon_in, afternoon_out):
     total = timedelta()
@@ -44,6 +59,13 @@ def calculate_total_hours(morning_in, morning_out, afternoon_in, afternoon_out):
         total += datetime.combine(date.min, afternoon_out) - datetime.combine(date.min, afternoon_in)
     return total  # <-- Make sure this is a timedelta, not a string
 
+def time_seconds_sql(column, dialect):
+    """SQL for the seconds since midnight of a TIME column; NULL stays NULL."""
+    if dialect == 'sqlite':
+        return (func.julianday(column) - func.julianday('00:00:00')) * 86400
+    # EXTRACT returns numeric, which would arrive as Decimal
+    return cast(func.extract('epoch', column), Float)
+
 def format_timedelta_to_time(td):
     if not isinstance(td, timedelta):
         return "0:00"
@@ -63,4 +85,4 @@ def parse_time(time_str):
 def validate_time(time_str):
     if not time_str:
         return True  # Allow null/empty
-    return bool(re.match(r'^\d{2}:\d{2}$', time_str))
\ No newline at end of file
+    return bool(_TIME_PATTERN.match(time_str))
\ No newline at end of file
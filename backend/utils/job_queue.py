@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import time
+from config.config import JOB_DB_PATH, JOB_RESULT_DIR, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS, JOB_CONCURRENCY_CAPS
+
+# Report-style routes that may run as background jobs. The worker calls the
+# existing handler through its route, so no query logic is duplicated here.
+JOB_KINDS = {
+    'export_employees': '/api/employees',
+    'export_timesheets': '/api/timesheets',
+    'export_daily_logs': '/api/daily-logs',
+    'export_log_changes': '/api/daily-log-changes',
+    'employee_tree': '/api/employees/{employee_id}/tree',
+    'employee_dashboard': '/api/employees/dashboard',
+    'team_week': '/api/employees/{employee_id}/team-week',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    lease_expires_at REAL,
+    worker TEXT,
+    error TEXT,
+    result_path TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_claim ON jobs (status, priority DESC, id);
+"""
+
+
+def job_path(kind, params):
+    """Route path for a job, filled from its params (everything except 'query')."""
+    path_params = {k: v for k, v in params.items() if k != 'query'}
+    try:
+        return JOB_KINDS[kind].format(**path_params)
+    except KeyError as e:
+        raise ValueError(f'Job kind "{kind}" needs param {e}.')
+
+
+def _connect():
+    os.makedirs(os.path.dirname(JOB_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(JOB_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _as_dict(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job.pop('result_path', None)
+    return job
+
+
+def submit(kind, params=None, priority=0, max_attempts=None):
+    """Queue a job and return its id."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f'Unknown job kind "{kind}".')
+    job_path(kind, params or {})
+    conn = _connect()
+    try:
+        now = time.time()
+        cur = conn.execute(
+            "INSERT INTO jobs (kind, params, priority, max_attempts, run_after, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(params or {}), int(priority), max_attempts or JOB_MAX_ATTEMPTS, now, now)
+        )
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def get_job(job_id):
+    conn = _connect()
+    try:
+        return _as_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def result_path(job_id):
+    """Path of a finished job's result file, or None."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT result_path FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+        ).fetchone()
+        return row['result_path'] if row else None
+    finally:
+        conn.close()
+
+
+def claim(worker):
+    """Take the highest-priority runnable job, honouring per-kind caps.
+
+    Jobs whose lease expired (their worker died) are picked up again while
+    they have attempts left, and marked failed once they have none.
+    """
+    conn = _connect()
+    try:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        # A job that keeps killing its worker must not be retried forever
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, "
+            "error = 'Lease expired on the last attempt; the worker stopped without finishing.' "
+            "WHERE status = 'running' AND lease_expires_at <= ? AND attempts >= max_attempts",
+            (now, now)
+        )
+        running = dict(conn.execute(
+            "SELECT kind, count(*) FROM jobs WHERE status = 'running' AND lease_expires_at > ? GROUP BY kind",
+            (now,)
+        ).fetchall())
+        full = [kind for kind, cap in JOB_CONCURRENCY_CAPS.items() if running.get(kind, 0) >= cap]
+        placeholders = ','.join('?' * len(full))
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE ((status = 'queued' AND run_after <= ?) "
+            "OR (status = 'running' AND lease_expires_at <= ? AND attempts < max_attempts)) "
+            + (f"AND kind NOT IN ({placeholders}) " if full else "")
+            + "ORDER BY priority DESC, id LIMIT 1",
+            (now, now, *full)
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+            "started_at = ?, lease_expires_at = ? WHERE id = ?",
+            (worker, now, now + JOB_LEASE_SECONDS, row['id'])
+        )
+        conn.execute("COMMIT")
+        job = _as_dict(row)
+        job['attempts'] += 1
+        return job
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def renew_lease(job_id, worker):
+    """Push a running job's lease forward; False if the job is no longer this worker's."""
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + JOB_LEASE_SECONDS, job_id, worker)
+        )
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def complete(job_id, body):
+    """Store a job's JSON result and mark it done."""
+    os.makedirs(JOB_RESULT_DIR, exist_ok=True)
+    path = os.path.join(JOB_RESULT_DIR, f"{job_id}.json")
+    with open(path, 'wb') as f:
+        f.write(body)
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'done', result_path = ?, error = NULL, finished_at = ? WHERE id = ?",
+            (path, time.time(), job_id)
+        )
+    finally:
+        conn.close()
+
+
+def fail(job_id, error, retryable=True):
+    """Record a failure; retry with exponential backoff until attempts run out."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        now = time.time()
+        if retryable and row['attempts'] < row['max_attempts']:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, run_after = ?, lease_expires_at = NULL WHERE id = ?",
+                (error, now + 2 ** row['attempts'], job_id)
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, now, job_id)
+            )
+    finally:
+        conn.close()
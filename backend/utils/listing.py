@@ -0,0 +1,134 @@
+import base64
+import binascii
+import json
+import operator
+import re
+from datetime import datetime
+from sqlalchemy import select, and_, or_
+from config.config import LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE
+from utils.projection import _to_dict
+
+OPERATORS = {
+    'eq': operator.eq,
+    'gte': operator.ge,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'lt': operator.lt,
+}
+
+# name or name[op]
+_PARAM = re.compile(r'^(\w+)(?:\[(\w+)\])?$')
+_RESERVED = {'fields', 'sort', 'limit', 'cursor'}
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value)
+
+
+def _encode_cursor(sort, value, row_id):
+    raw = json.dumps([sort, value.isoformat() if hasattr(value, 'isoformat') else value, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token, sort, parse):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        cursor_sort, value, row_id = json.loads(raw)
+        if cursor_sort != sort:
+            raise ValueError
+        return (parse(value) if isinstance(value, str) else value), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError('Invalid cursor (it must come from a response with the same sort).')
+
+
+def list_query(spec, args):
+    """Criteria, sort and page position for a list route, from its query string.
+
+    spec holds:
+      model
+      filters       {name: (parse, ops)} or {name: (parse, ops, build)} where
+                    build(op, value) returns the criterion for a non-column filter
+      sorts         {column name: parse}; every sort is tie-broken by id
+      default_sort  e.g. 'id' or '-changed_at'
+
+    Raises ValueError for anything outside the spec.
+    """
+    criteria = []
+    for key, values in args.lists():
+        if key in _RESERVED:
+            continue
+        match = _PARAM.match(key)
+        name, op = (match.group(1), match.group(2) or 'eq') if match else (key, None)
+        if name not in spec['filters']:
+            raise ValueError(f"Unknown filter: {key}. Filters: {', '.join(sorted(spec['filters']))}.")
+        parse, ops = spec['filters'][name][:2]
+        if op not in ops:
+            raise ValueError(f"{name} supports {', '.join(f'{name}[{o}]' for o in ops)}.")
+        for raw in values:
+            try:
+                value = parse(raw)
+            except ValueError:
+                raise ValueError(f"Invalid value for {key}: {raw!r}.")
+            if len(spec['filters'][name]) > 2:
+                criteria.append(spec['filters'][name][2](op, value))
+            else:
+                criteria.append(OPERATORS[op](spec['model'].__table__.c[name], value))
+
+    sort = args.get('sort') or spec['default_sort']
+    if sort.lstrip('-') not in spec['sorts']:
+        raise ValueError(f"Unknown sort: {sort}. Sorts: {', '.join(sorted(spec['sorts']))} (prefix - for descending).")
+
+    try:
+        limit = int(args.get('limit', LIST_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer.')
+    if not 1 <= limit <= LIST_MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {LIST_MAX_PAGE_SIZE}.')
+
+    after = None
+    if args.get('cursor'):
+        after = _decode_cursor(args['cursor'], sort, spec['sorts'][sort.lstrip('-')])
+    return {'criteria': criteria, 'sort': sort, 'limit': limit, 'after': after}
+
+
+def page_statement(spec, query, fields=None):
+    """SELECT for one page: the requested columns plus the sort key, limit + 1 rows."""
+    table = spec['model'].__table__
+    descending = query['sort'].startswith('-')
+    key = table.c[query['sort'].lstrip('-')]
+    columns = [table.c[name] for name in fields] if fields else list(table.columns)
+    extra = [c for c in (key, table.c.id) if c not in columns]
+
+    criteria = list(query['criteria'])
+    if query['after'] is not None:
+        value, row_id = query['after']
+        past_id = table.c.id < row_id if descending else table.c.id > row_id
+        if key is table.c.id:
+            criteria.append(past_id)
+        else:
+            # The redundant bound keeps the condition usable as an index range
+            criteria.append(and_(
+                key <= value if descending else key >= value,
+                or_(key < value if descending else key > value, and_(key == value, past_id))
+            ))
+    order = [key.desc(), table.c.id.desc()] if descending else [key, table.c.id]
+    if key is table.c.id:
+        order = order[:1]
+    return select(*columns, *extra).where(*criteria).order_by(*order).limit(query['limit'] + 1)
+
+
+def fetch_page(session, spec, query, fields=None):
+    """(rows, next_cursor) for a page; rows are column dicts, next_cursor None on the last page."""
+    table = spec['model'].__table__
+    names = fields or [c.name for c in table.columns]
+    rows = session.execute(page_statement(spec, query, fields)).mappings().all()
+    next_cursor = None
+    if len(rows) > query['limit']:
+        rows = rows[:query['limit']]
+        sort = query['sort']
+        next_cursor = _encode_cursor(sort, rows[-1][sort.lstrip('-')], rows[-1]['id'])
+    return [_to_dict(table, {name: row[name] for name in names}) for row in rows], next_cursor
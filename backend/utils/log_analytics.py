@@ -0,0 +1,157 @@
+from datetime import date, timedelta
+from sqlalchemy import select, delete, insert, func, literal
+from config.config import (ANALYTICS_CHUNK_TIMESHEETS, OVERTIME_DAILY_HOURS, OVERTIME_WEEKLY_HOURS,
+                           UNUSUAL_BEFORE_HOUR, UNUSUAL_AFTER_HOUR)
+from models.timesheet import Timesheet
+from models.dailylogs import DailyLog
+from models.log_finding import LogFinding
+from utils.helpers import time_seconds_sql
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RULES = (
+    'missed_punch',          # a session with an in but no out, or the reverse
+    'reversed_session',      # out before in
+    'overlapping_sessions',  # morning ends after the afternoon starts
+    'daily_overtime',        # more than OVERTIME_DAILY_HOURS in a day
+    'weekly_overtime',       # more than OVERTIME_WEEKLY_HOURS on a timesheet
+    'unusual_hours',         # a punch before UNUSUAL_BEFORE_HOUR or after UNUSUAL_AFTER_HOUR
+)
+
+_EPOCH = date(1970, 1, 1)
+# Column order of a chunk array
+_ID, _TIMESHEET, _EMPLOYEE, _WEEK, _DAY, _MORNING_IN, _MORNING_OUT, _AFTERNOON_IN, _AFTERNOON_OUT = range(9)
+
+
+def previous_week(today=None):
+    """(start, end) of last Monday-to-Sunday week."""
+    today = today or date.today()
+    monday = today - timedelta(days=today.weekday())
+    return monday - timedelta(days=7), monday - timedelta(days=1)
+
+
+def _day_number(column, dialect):
+    """Days since 1970-01-01 of a DATE column."""
+    if dialect == 'sqlite':
+        return func.julianday(column) - 2440587.5
+    return column - literal(_EPOCH)
+
+
+def _timesheet_blocks(session, start, end, size):
+    """(first_id, last_id) ranges covering the timesheets of [start, end], size timesheets each."""
+    ids = session.execute(
+        select(Timesheet.id).where(Timesheet.week_starting.between(start, end)).order_by(Timesheet.id)
+    ).scalars().all()
+    return [(ids[i], ids[min(i + size, len(ids)) - 1]) for i in range(0, len(ids), size)]
+
+
+def _load_chunk(session, start, end, first_id, last_id):
+    """Daily logs of one block of timesheets as a float64 array, one row per log."""
+    dialect = session.get_bind().dialect.name
+    stmt = select(
+        DailyLog.id, DailyLog.timesheet_id, Timesheet.employee_id,
+        _day_number(Timesheet.week_starting, dialect), _day_number(DailyLog.log_date, dialect),
+        time_seconds_sql(DailyLog.morning_in, dialect), time_seconds_sql(DailyLog.morning_out, dialect),
+        time_seconds_sql(DailyLog.afternoon_in, dialect), time_seconds_sql(DailyLog.afternoon_out, dialect),
+    ).join(Timesheet, Timesheet.id == DailyLog.timesheet_id).where(
+        Timesheet.id.between(first_id, last_id),
+        DailyLog.timesheet_id.between(first_id, last_id),
+        Timesheet.week_starting.between(start, end),
+        # Lets a partitioned daily_logs skip partitions outside the range
+        DailyLog.log_date.between(start, end + timedelta(days=6)),
+    )
+    # Plain tuples: numpy probes Row objects attribute by attribute. None becomes NaN;
+    # rounding drops float noise from the SQLite julianday arithmetic
+    rows = [tuple(row) for row in session.execute(stmt)]
+    return np.round(np.array(rows, dtype=np.float64).reshape(-1, 9))
+
+
+def _dates(day_numbers):
+    return (np.datetime64(_EPOCH, 'D') + day_numbers.astype('timedelta64[D]')).tolist()
+
+
+def check_rules(data):
+    """{rule: (row indices, hours)} for one chunk; every rule runs over whole columns at once."""
+    mi, mo = data[:, _MORNING_IN], data[:, _MORNING_OUT]
+    ai, ao = data[:, _AFTERNOON_IN], data[:, _AFTERNOON_OUT]
+    morning = ~np.isnan(mi) & ~np.isnan(mo)
+    afternoon = ~np.isnan(ai) & ~np.isnan(ao)
+    # Comparisons with NaN are False, so incomplete sessions drop out below
+    worked = np.where(morning & (mo >= mi), mo - mi, 0) + np.where(afternoon & (ao >= ai), ao - ai, 0)
+
+    hits = {}
+    missed = (np.isnan(mi) != np.isnan(mo)) | (np.isnan(ai) != np.isnan(ao))
+    hits['missed_punch'] = (np.flatnonzero(missed), None)
+    reversed_ = (mo < mi) | (ao < ai)
+    hits['reversed_session'] = (np.flatnonzero(reversed_), None)
+    overlapping = morning & afternoon & (mo > ai)
+    hits['overlapping_sessions'] = (np.flatnonzero(overlapping), (mo - ai) / 3600)
+    hits['daily_overtime'] = (np.flatnonzero(worked > OVERTIME_DAILY_HOURS * 3600), worked / 3600)
+
+    punches = data[:, _MORNING_IN:_AFTERNOON_OUT + 1]
+    earliest = np.fmin.reduce(punches, axis=1)
+    latest = np.fmax.reduce(punches, axis=1)
+    early = earliest < UNUSUAL_BEFORE_HOUR * 3600
+    late = latest > UNUSUAL_AFTER_HOUR * 3600
+    hits['unusual_hours'] = (np.flatnonzero(early | late), np.where(early, earliest, latest) / 3600)
+
+    # Weekly totals per timesheet; the row index of each timesheet's first log stands for it
+    _, first_rows, inverse = np.unique(data[:, _TIMESHEET], return_index=True, return_inverse=True)
+    weekly = np.bincount(inverse, weights=worked)
+    over = weekly > OVERTIME_WEEKLY_HOURS * 3600
+    weekly_hours = np.zeros(len(data))
+    weekly_hours[first_rows] = weekly / 3600
+    hits['weekly_overtime'] = (first_rows[over], weekly_hours)
+    return hits
+
+
+def _finding_rows(data, hits):
+    rows = []
+    for rule, (indices, hours) in hits.items():
+        if not len(indices):
+            continue
+        picked = data[indices]
+        weeks = _dates(picked[:, _WEEK])
+        days = _dates(picked[:, _DAY])
+        values = hours[indices].tolist() if hours is not None else [None] * len(indices)
+        weekly = rule == 'weekly_overtime'
+        ids = picked[:, :_WEEK].astype(np.int64).tolist()
+        for row, week, day, value in zip(ids, weeks, days, values):
+            rows.append({
+                'employee_id': row[_EMPLOYEE],
+                'timesheet_id': row[_TIMESHEET],
+                'daily_log_id': None if weekly else row[_ID],
+                'week_starting': week,
+                'log_date': None if weekly else day,
+                'rule': rule,
+                'hours': round(value, 2) if value is not None else None,
+            })
+    return rows
+
+
+def analyze(session, start, end, chunk_size=ANALYTICS_CHUNK_TIMESHEETS):
+    """Re-run every rule for timesheets with week_starting in [start, end].
+
+    Findings already stored for that range are replaced in the same
+    transaction; the caller commits. Returns {'logs': n, rule: count, ...}.
+    """
+    if np is None:
+        raise RuntimeError('numpy is required for daily-log analytics.')
+    counts = dict.fromkeys(RULES, 0)
+    counts['logs'] = 0
+    session.execute(delete(LogFinding).where(LogFinding.week_starting.between(start, end))
+                    .execution_options(synchronize_session=False))
+    for first_id, last_id in _timesheet_blocks(session, start, end, chunk_size):
+        data = _load_chunk(session, start, end, first_id, last_id)
+        if not len(data):
+            continue
+        counts['logs'] += len(data)
+        rows = _finding_rows(data, check_rules(data))
+        for row in rows:
+            counts[row['rule']] += 1
+        for i in range(0, len(rows), 5000):
+            session.execute(insert(LogFinding), rows[i:i + 5000])
+    return counts
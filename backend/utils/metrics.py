@@ -0,0 +1,256 @@
+import glob
+import json
+import os
+import threading
+import time
+from flask import request, g
+from config.config import METRICS_DIR, METRICS_FLUSH_SECONDS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 10240, 102400, 1048576, 10485760)
+
+HELP = {
+    'tms_http_requests_total': ('counter', 'HTTP requests by route, method and status.'),
+    'tms_http_request_errors_total': ('counter', 'HTTP responses with a 5xx status.'),
+    'tms_http_request_duration_seconds': ('histogram', 'Time spent in the Flask handler.'),
+    'tms_http_response_size_bytes': ('histogram', 'Response body size as sent.'),
+    'tms_db_sessions_opened_total': ('counter', 'Sessions handed out by get_session.'),
+    'tms_db_sessions_closed_total': ('counter', 'Sessions closed through safe_close.'),
+    'tms_cache_requests_total': ('counter', 'Cache lookups by cache and result.'),
+    'tms_db_pool_size': ('gauge', 'Configured pool size per worker.'),
+    'tms_db_pool_checked_out': ('gauge', 'Connections currently checked out.'),
+    'tms_db_pool_checked_in': ('gauge', 'Idle connections in the pool.'),
+    'tms_db_pool_overflow': ('gauge', 'Connections open beyond pool_size.'),
+    'tms_tenant_requests_total': ('counter', 'HTTP requests by tenant and status.'),
+    'tms_tenant_request_duration_seconds': ('histogram', 'Time spent in the Flask handler per tenant.'),
+    'tms_tenant_engines_created_total': ('counter', 'Tenant engines created (including re-creation after eviction).'),
+    'tms_tenant_engines_evicted_total': ('counter', 'Tenant engines evicted from the LRU.'),
+    'tms_audit_buffered_total': ('counter', 'Audit rows queued for write-behind insert.'),
+    'tms_audit_deduped_total': ('counter', 'No-op description edits skipped.'),
+    'tms_audit_flushed_rows_total': ('counter', 'Audit rows written by flushes and replays.'),
+    'tms_audit_flushes_total': ('counter', 'Successful audit buffer flushes.'),
+    'tms_audit_flush_failures_total': ('counter', 'Audit flushes that failed and were spooled for replay.'),
+    'tms_audit_rejected_total': ('counter', 'Audit rows the database rejected, kept in .rejected spool files.'),
+    'tms_audit_flush_seconds': ('histogram', 'Time to write one audit flush.'),
+    'tms_audit_buffer_pending': ('gauge', 'Audit rows waiting for the next flush.'),
+    'tms_events_published_total': ('counter', 'Committed changes published to the live feed, by type and action.'),
+    'tms_events_publish_failures_total': ('counter', 'Commits whose live events could not be published.'),
+    'tms_events_dropped_total': ('counter', 'Events lost to a slow stream or a full worker socket.'),
+    'tms_event_streams_rejected_total': ('counter', 'Streams refused because EVENTS_MAX_STREAMS were open.'),
+    'tms_event_streams': ('gauge', 'Open /api/events streams in this worker.'),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+# Callables returning {(name, labels): value}, evaluated at scrape/flush time
+_gauge_sources = []
+_flusher = {'pid': None}
+
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = (name, _labels(**labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets, **labels):
+    key = (name, _labels(**labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(hist['buckets']):
+            if value <= bound:
+                hist['counts'][i] += 1
+                break
+        hist['sum'] += value
+        hist['count'] += 1
+
+
+def record_cache(cache, hit):
+    inc('tms_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def add_gauge_source(source):
+    _gauge_sources.append(source)
+
+
+def remove_gauge_source(source):
+    try:
+        _gauge_sources.remove(source)
+    except ValueError:
+        pass
+
+
+def _gauges():
+    values = {}
+    for source in _gauge_sources:
+        try:
+            values.update(source())
+        except Exception:
+            pass
+    return values
+
+
+def _snapshot():
+    with _lock:
+        counters = [[name, list(labels), value] for (name, labels), value in _counters.items()]
+        histograms = [[name, list(labels), dict(h, counts=list(h['counts']))] for (name, labels), h in _histograms.items()]
+    gauges = [[name, list(labels), value] for (name, labels), value in _gauges().items()]
+    return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+
+def _flush():
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            _flush()
+        except OSError:
+            pass
+
+
+def _ensure_flusher():
+    # One flusher thread per process; re-created in forked workers
+    if METRICS_DIR and _flusher['pid'] != os.getpid():
+        _flusher['pid'] = os.getpid()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def _collect():
+    """Merge this process's live values with the snapshots of other workers."""
+    snapshots = [_snapshot()]
+    if METRICS_DIR:
+        for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+            try:
+                with open(path) as f:
+                    snap = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snap['pid'] == os.getpid():
+                continue
+            if not _pid_alive(snap['pid']):
+                # Counters of exited workers still count; their gauges do not
+                snap['gauges'] = []
+            snapshots.append(snap)
+
+    counters, histograms, gauges = {}, {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, hist in snap['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, {'buckets': hist['buckets'], 'counts': [0] * len(hist['buckets']), 'sum': 0.0, 'count': 0})
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], hist['counts'])]
+            merged['sum'] += hist['sum']
+            merged['count'] += hist['count']
+        for name, labels, value in snap['gauges']:
+            key = (name, tuple(tuple(pair) for pair in labels) + (('pid', str(snap['pid'])),))
+            gauges[key] = value
+    return counters, histograms, gauges
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def render():
+    """Prometheus text exposition of all metrics."""
+    counters, histograms, gauges = _collect()
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), value in gauges.items():
+        by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), hist in histograms.items():
+        lines = by_name.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(hist['buckets'], hist['counts']):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    out = []
+    for name in sorted(by_name):
+        kind, help_text = HELP.get(name, ('untyped', name))
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(by_name[name])
+    return '\n'.join(out) + '\n'
+
+
+def _before_request():
+    _ensure_flusher()
+    g._metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('_metrics_start', None)
+    if start is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method = request.method
+    status = response.status_code
+    observe('tms_http_request_duration_seconds', time.perf_counter() - start, LATENCY_BUCKETS, route=route, method=method)
+    inc('tms_http_requests_total', route=route, method=method, status=str(status))
+    if status >= 500:
+        inc('tms_http_request_errors_total', route=route, method=method)
+    size = response.content_length
+    if size is not None:
+        observe('tms_http_response_size_bytes', size, SIZE_BUCKETS, route=route, method=method)
+    return response
+
+
+def pool_gauges(engine, **labels):
+    """Gauge source reading a QueuePool's current state."""
+    def source():
+        pool = engine.pool
+        if not hasattr(pool, 'checkedout'):
+            return {}
+        key = _labels(**labels)
+        return {
+            ('tms_db_pool_size', key): pool.size(),
+            ('tms_db_pool_checked_out', key): pool.checkedout(),
+            ('tms_db_pool_checked_in', key): pool.checkedin(),
+            ('tms_db_pool_overflow', key): pool.overflow(),
+        }
+    return source
+
+
+
+def init_metrics(app):
+    """Register the request metrics hooks on a Flask app; GET /metrics is in ROUTES.
+
+    Call before other after_request hooks (e.g. compression) so that
+    response sizes are measured as sent.
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
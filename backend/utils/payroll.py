@@ -0,0 +1,164 @@
+from sqlalchemy import event, select, insert, func, literal, text, or_, and_, inspect
+from sqlalchemy.orm import Session
+from models.employee import Employee
+from models.timesheet import Timesheet
+from models.dailylogs import DailyLog
+from models.payroll import PayrollPeriod, PayrollSnapshot
+from utils import archive
+from utils.helpers import time_seconds_sql
+
+# Writers take it shared after their writes, close takes it exclusive
+_LOCK_KEY = 724_002
+
+
+class PeriodClosedError(Exception):
+    """A write touched a week inside a closed payroll period."""
+
+
+def _lock(session, shared):
+    if session.get_bind().dialect.name == 'postgresql':
+        fn = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+        session.execute(text(f"SELECT {fn}(:key)"), {'key': _LOCK_KEY})
+
+
+def closed_period(session, weeks):
+    """The closed period containing any of the week_starting dates, or None."""
+    weeks = {w for w in weeks if w is not None}
+    if not weeks:
+        return None
+    return session.query(PayrollPeriod).filter(
+        PayrollPeriod.start_date <= max(weeks),
+        PayrollPeriod.end_date >= min(weeks),
+        or_(*[and_(PayrollPeriod.start_date <= w, PayrollPeriod.end_date >= w) for w in weeks])
+    ).order_by(PayrollPeriod.start_date).first()
+
+
+def ensure_open(session, weeks):
+    """Raise PeriodClosedError if any of the weeks is in a closed period."""
+    period = closed_period(session, weeks)
+    if period is not None:
+        raise PeriodClosedError(
+            f'Payroll period {period.start_date.isoformat()} to {period.end_date.isoformat()} is closed; '
+            f'its timesheets and daily logs can no longer change.'
+        )
+
+
+def guard_writes(session, weeks):
+    """Call after writing rows of these weeks, before commit; raises PeriodClosedError."""
+    _lock(session, shared=True)
+    ensure_open(session, weeks)
+
+
+def _history_values(obj, name):
+    history = inspect(obj).attrs[name].history
+    return list(history.added or ()) + list(history.deleted or ()) + list(history.unchanged or ())
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    # Runs after the rows are written, so a concurrent close either sees
+    # this transaction's writes or this check sees the closed period
+    weeks = set()
+    timesheet_ids = set()
+    for objects, modified_only in ((session.new, False), (session.dirty, True), (session.deleted, False)):
+        for obj in objects:
+            if modified_only and not session.is_modified(obj, include_collections=False):
+                continue
+            if isinstance(obj, Timesheet):
+                # A timesheet moved between weeks must be open at both ends
+                weeks.update(_history_values(obj, 'week_starting'))
+            elif isinstance(obj, DailyLog):
+                timesheet_ids.update(_history_values(obj, 'timesheet_id'))
+    timesheet_ids.discard(None)
+    if timesheet_ids:
+        weeks.update(session.execute(
+            select(Timesheet.week_starting).where(Timesheet.id.in_(timesheet_ids))
+        ).scalars())
+    if weeks:
+        guard_writes(session, weeks)
+
+
+def close_period(session, start, end):
+    """Close [start, end] and snapshot its per employee, per week totals.
+
+    Returns (period, snapshot_rows); the caller commits. Raises ValueError
+    for a bad range and PeriodClosedError if it overlaps a closed period.
+    """
+    if end < start:
+        raise ValueError('end_date must not be before start_date.')
+    if start < archive.hot_window_start():
+        # Archived timesheets are no longer in the database to snapshot
+        raise ValueError(f'Weeks before {archive.hot_window_start().isoformat()} are archived and cannot be closed.')
+
+    _lock(session, shared=False)
+    overlapping = session.query(PayrollPeriod).filter(
+        PayrollPeriod.start_date <= end, PayrollPeriod.end_date >= start
+    ).first()
+    if overlapping:
+        raise PeriodClosedError(
+            f'Overlaps the closed period {overlapping.start_date.isoformat()} to {overlapping.end_date.isoformat()}.'
+        )
+
+    period = PayrollPeriod(start_date=start, end_date=end)
+    session.add(period)
+    session.flush()
+
+    seconds = time_seconds_sql(DailyLog.total_hours, session.get_bind().dialect.name)
+    totals = select(
+        literal(period.id), Timesheet.employee_id, Employee.employee_name, Timesheet.id, Timesheet.week_starting,
+        func.count(DailyLog.id), func.coalesce(func.sum(seconds), 0) / 3600.0
+    ).select_from(Timesheet) \
+        .join(Employee, Employee.id == Timesheet.employee_id) \
+        .outerjoin(DailyLog, DailyLog.timesheet_id == Timesheet.id) \
+        .where(Timesheet.week_starting.between(start, end)) \
+        .group_by(Timesheet.id, Timesheet.employee_id, Employee.employee_name, Timesheet.week_starting)
+    result = session.execute(insert(PayrollSnapshot).from_select(
+        ['period_id', 'employee_id', 'employee_name', 'timesheet_id', 'week_starting', 'days_logged', 'total_hours'],
+        totals
+    ))
+    return period, result.rowcount
+
+
+def hours_report(session, start, end, employee_ids=None):
+    """Per employee and week totals for [start, end].
+
+    Weeks in closed periods come from payroll_snapshots only; the rest are
+    summed from daily_logs. employee_ids (a collection or a SELECT of ids)
+    limits the report; None means everyone.
+    """
+    periods = session.query(PayrollPeriod).filter(
+        PayrollPeriod.start_date <= end, PayrollPeriod.end_date >= start
+    ).all()
+
+    snapshots = select(
+        PayrollSnapshot.employee_id, PayrollSnapshot.employee_name, PayrollSnapshot.week_starting,
+        PayrollSnapshot.days_logged, PayrollSnapshot.total_hours
+    ).where(
+        # period_id leads ix_payroll_snapshots_period_week, so only the
+        # overlapping periods' snapshots are read, not the whole table
+        PayrollSnapshot.period_id.in_([period.id for period in periods]),
+        PayrollSnapshot.week_starting.between(start, end)
+    )
+    if employee_ids is not None:
+        snapshots = snapshots.where(PayrollSnapshot.employee_id.in_(employee_ids))
+    rows = [dict(row._mapping, source='snapshot') for row in session.execute(snapshots)] if periods else []
+
+    seconds = time_seconds_sql(DailyLog.total_hours, session.get_bind().dialect.name)
+    live = select(
+        Timesheet.employee_id, Employee.employee_name, Timesheet.week_starting,
+        func.count(DailyLog.id).label('days_logged'),
+        (func.coalesce(func.sum(seconds), 0) / 3600.0).label('total_hours')
+    ).select_from(Timesheet) \
+        .join(Employee, Employee.id == Timesheet.employee_id) \
+        .outerjoin(DailyLog, DailyLog.timesheet_id == Timesheet.id) \
+        .where(Timesheet.week_starting.between(start, end),
+               *[~Timesheet.week_starting.between(p.start_date, p.end_date) for p in periods]) \
+        .group_by(Timesheet.id, Timesheet.employee_id, Employee.employee_name, Timesheet.week_starting)
+    if employee_ids is not None:
+        live = live.where(Timesheet.employee_id.in_(employee_ids))
+    rows.extend(dict(row._mapping, source='live') for row in session.execute(live))
+
+    for row in rows:
+        row['total_hours'] = round(row['total_hours'], 2)
+    rows.sort(key=lambda r: (r['week_starting'], r['employee_id']))
+    return rows, periods
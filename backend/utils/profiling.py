@@ -0,0 +1,126 @@
+import cProfile
+import hashlib
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from flask import request, g
+from config.config import PROFILE_SECRET, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_KEEP
+
+_NAME_PATTERN = re.compile(r'^[\w.\-]+\.prof$')
+# Keys accepted by profile_text (?sort= on GET /admin/profiles/<name>)
+SORT_KEYS = frozenset(key.value for key in pstats.SortKey)
+# cProfile can only profile one thread at a time on newer Pythons
+_busy = threading.Lock()
+
+
+def sign_profile_token(expires_at, secret=PROFILE_SECRET):
+    """Header value that enables profiling until expires_at (unix time)."""
+    digest = hmac.new(secret.encode(), str(int(expires_at)).encode(), hashlib.sha256).hexdigest()
+    return f"{int(expires_at)}.{digest}"
+
+
+def _valid_token(token):
+    if not PROFILE_SECRET or not token or '.' not in token:
+        return False
+    expires, _, digest = token.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(PROFILE_SECRET.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+def _should_profile():
+    if _valid_token(request.headers.get('X-Profile')):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _start():
+    if request.path.startswith('/api/admin/profiles') or not _should_profile():
+        return
+    if not _busy.acquire(blocking=False):
+        return
+    profiler = cProfile.Profile()
+    g._profiler = profiler
+    profiler.enable()
+
+
+def _stop():
+    profiler = g.pop('_profiler', None)
+    if profiler is None:
+        return None
+    profiler.disable()
+    _busy.release()
+    return profiler
+
+
+def _dump(profiler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = (request.url_rule.rule if request.url_rule else request.path).strip('/')
+    slug = re.sub(r'[^\w\-]+', '_', route) or 'root'
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{slug}-{os.getpid()}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+
+    profiles = sorted(os.listdir(PROFILE_DIR))
+    for old in profiles[:max(0, len(profiles) - PROFILE_KEEP)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError:
+            pass
+    return name
+
+
+def _after_request(response):
+    profiler = _stop()
+    if profiler is not None:
+        response.headers['X-Profile-Id'] = _dump(profiler)
+    return response
+
+
+def _teardown(exc):
+    # Request failed before after_request ran
+    _stop()
+
+
+def list_profiles():
+    """Saved profiles, newest first, as dicts."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not _NAME_PATTERN.match(name):
+            continue
+        stat = os.stat(os.path.join(PROFILE_DIR, name))
+        profiles.append({'name': name, 'size': stat.st_size, 'created_at': stat.st_mtime})
+    return profiles
+
+
+def profile_exists(name):
+    """False for unknown names and for anything that is not a plain profile file name."""
+    return bool(_NAME_PATTERN.match(name)) and os.path.exists(os.path.join(PROFILE_DIR, name))
+
+
+def profile_text(name, sort, limit):
+    """pstats report of a saved profile: the top limit functions by sort (a SORT_KEYS value)."""
+    out = io.StringIO()
+    stats = pstats.Stats(os.path.join(PROFILE_DIR, name), stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def init_profiling(app):
+    """Register the profiling hooks only when profiling can be triggered.
+
+    With no PROFILE_SECRET and a zero sample rate nothing is added to the
+    request path.
+    """
+    if not PROFILE_SECRET and PROFILE_SAMPLE_RATE <= 0:
+        return
+    app.before_request(_start)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown)
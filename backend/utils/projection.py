@@ -0,0 +1,51 @@
+from flask import request
+from sqlalchemy import select
+
+# DailyLog.as_dict turns dates and times into ISO strings; the other models leave them to jsonify
+_ISO_TABLES = {'daily_logs'}
+
+
+def requested_fields(model):
+    """Columns named by ?fields=a,b in table order, or None when the parameter is absent.
+
+    Raises ValueError for names that are not columns of model.
+    """
+    raw = request.args.get('fields')
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    columns = model.__table__.columns
+    unknown = sorted(names - set(columns.keys()))
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                         f"Available: {', '.join(columns.keys())}.")
+    return [column.name for column in columns if column.name in names]
+
+
+def _to_dict(table, row):
+    if table.name not in _ISO_TABLES:
+        return dict(row)
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value for key, value in row.items()}
+
+
+def projected_rows(session, model, fields, *criteria, order_by=None):
+    """Just the requested columns as dicts, read with a Core select (no ORM objects)."""
+    table = model.__table__
+    stmt = select(*[table.c[name] for name in fields]).where(*criteria)
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    return [_to_dict(table, row) for row in session.execute(stmt).mappings()]
+
+
+def projected_row(session, model, fields, *criteria):
+    """First projected row matching criteria, or None."""
+    table = model.__table__
+    row = session.execute(select(*[table.c[name] for name in fields]).where(*criteria).limit(1)).mappings().first()
+    return _to_dict(table, row) if row is not None else None
+
+
+def pick(data, fields):
+    """Restrict an already built dict (e.g. an archived row) to fields."""
+    if fields is None:
+        return data
+    return {name: data.get(name) for name in fields}
@@ -0,0 +1,272 @@
+"""Declarative request schemas for the JSON payloads of the write endpoints.
+
+A schema is declared as {field: spec} with the builders below and compiled
+once at import into a tuple of (name, coerce, required, message, status,
+blank) entries; load() then checks presence and coerces every field in a
+single pass, so a handler gets a dict of dates, times and ints back or one
+SchemaError with every bad field. Only fields present in the payload end
+up in the result, which keeps "was it sent" checks (partial updates)
+working.
+"""
+import re
+from datetime import date, time as dtime
+from flask import jsonify
+
+_DATE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+# Same leniency as strptime('%H:%M'): one or two digits each side
+_TIME = re.compile(r'^(\d{1,2}):(\d{1,2})$')
+_EMAIL = re.compile(r'^[^@]+@[^@]+\.[^@]+$')
+_DIGITS = re.compile(r'^\d+$')
+
+
+class SchemaError(ValueError):
+    """Payload failed a schema; errors maps field (or item index) to its message."""
+
+    def __init__(self, errors, status=400):
+        self.errors = errors
+        self.status = status
+        first = next(iter(errors.values()))
+        while isinstance(first, dict):
+            first = next(iter(first.values()))
+        super().__init__(first)
+
+
+def schema_error(e):
+    """Response for a SchemaError: the first message as error, plus every field's."""
+    return jsonify({'error': str(e), 'errors': e.errors}), e.status
+
+
+# -----------------------------
+# Field builders
+# -----------------------------
+def _field(coerce, required, message, status=400, blank=False):
+    return {'coerce': coerce, 'required': required, 'message': message, 'status': status, 'blank': blank}
+
+
+def date_field(required=False, message=None):
+    def coerce(value):
+        match = _DATE.match(value) if isinstance(value, str) else None
+        if not match:
+            raise ValueError
+        return date(int(match[1]), int(match[2]), int(match[3]))
+    return _field(coerce, required, message or 'Invalid {name} format. Use YYYY-MM-DD.')
+
+
+def time_field(required=False, message='Invalid time format. Use HH:MM.'):
+    def coerce(value):
+        match = _TIME.match(value) if isinstance(value, str) else None
+        if not match:
+            raise ValueError
+        return dtime(int(match[1]), int(match[2]))
+    return _field(coerce, required, message)
+
+
+def int_field(required=False, message='{name} must be an integer.'):
+    def coerce(value):
+        if isinstance(value, bool):
+            raise ValueError
+        if isinstance(value, int):
+            return value
+        if isinstance(value, str) and _DIGITS.match(value):
+            return int(value)
+        raise ValueError
+    return _field(coerce, required, message)
+
+
+def str_field(required=False, max_length=None, strip=False, message='{name} must be a string.'):
+    def coerce(value):
+        if not isinstance(value, str):
+            raise ValueError
+        if strip:
+            value = value.strip()
+        return value[:max_length] if max_length else value
+    # An optional string may be sent as '' and is kept as ''
+    return _field(coerce, required, message, blank=not required)
+
+
+def email_field(required=False, message='Invalid email format'):
+    def coerce(value):
+        if not isinstance(value, str) or not _EMAIL.match(value):
+            raise ValueError
+        return value
+    # Handlers have always answered a malformed email with 422
+    return _field(coerce, required, message, status=422)
+
+
+def any_field(required=False):
+    return _field(None, required, None)
+
+
+def compile_schema(fields):
+    """Turn {name: spec} into the tuple load() walks; messages are formatted here, once."""
+    return tuple(
+        (name, spec['coerce'], spec['required'], spec['message'].format(name=name) if spec['message'] else None,
+         spec['status'], spec['blank'])
+        for name, spec in fields.items()
+    )
+
+
+def load(schema, data, partial=False):
+    """Coerced copy of data's schema fields; raises SchemaError listing every bad one.
+
+    Empty values (None, or '' outside optional strings) become None, or a
+    "required" error. Missing required fields are an error unless partial.
+    Fields not in the schema are dropped.
+    """
+    if not isinstance(data, dict):
+        raise SchemaError({'_body': 'Request body must be a JSON object.'})
+    result = {}
+    errors = {}
+    status = None
+    for name, coerce, required, message, field_status, blank in schema:
+        if name not in data:
+            if required and not partial:
+                errors[name] = f'{name} is required'
+                status = status or 400
+            continue
+        value = data[name]
+        if value is None or (value == '' and not blank):
+            if required:
+                errors[name] = f'{name} is required'
+                status = status or 400
+                continue
+            result[name] = None
+            continue
+        if coerce is None:
+            result[name] = value
+            continue
+        try:
+            result[name] = coerce(value)
+        except (ValueError, TypeError):
+            errors[name] = message
+            status = status or field_status
+    if errors:
+        raise SchemaError(errors, status)
+    return result
+
+
+def load_many(schema, items, partial=False):
+    """load() over a list payload in one call; errors are keyed by item index."""
+    if not isinstance(items, list) or not items:
+        raise SchemaError({'_body': 'Request body must be a non-empty JSON array.'})
+    results = []
+    errors = {}
+    status = None
+    for index, item in enumerate(items):
+        try:
+            results.append(load(schema, item, partial))
+        except SchemaError as e:
+            errors[index] = e.errors
+            status = status or e.status
+    if errors:
+        raise SchemaError(errors, status)
+    return results
+
+
+# -----------------------------
+# Payload schemas
+# -----------------------------
+_DAILY_LOG_TIMES = {
+    'morning_in': time_field(),
+    'morning_out': time_field(),
+    'afternoon_in': time_field(),
+    'afternoon_out': time_field(),
+}
+
+DAILY_LOG_CREATE = compile_schema({
+    'timesheet_id': int_field(required=True),
+    'log_date': date_field(required=True),
+    **_DAILY_LOG_TIMES,
+    'description': str_field(),
+})
+
+DAILY_LOG_UPDATE = compile_schema({
+    'log_date': date_field(),
+    **_DAILY_LOG_TIMES,
+    'description': str_field(),
+    'version': int_field(message='version must be an integer.'),
+})
+
+# One entry of POST /daily-logs/save, in the page's own field names; id is
+# a log id or a 'temp-...' placeholder for a new log
+SAVE_DAILY_LOG = compile_schema({
+    'id': any_field(required=True),
+    'employee_id': int_field(),
+    'week_starting': date_field(),
+    'date': date_field(),
+    'time_in_am': time_field(),
+    'time_out_am': time_field(),
+    'time_in_pm': time_field(),
+    'time_out_pm': time_field(),
+    'description': str_field(),
+    'version': int_field(message='version must be an integer.'),
+})
+
+TIMESHEET_CREATE = compile_schema({
+    'employee_name': str_field(required=True),
+    'week_starting': date_field(required=True),
+})
+
+TIMESHEET_UPDATE = compile_schema({
+    'employee_name': str_field(required=True),
+    'week_starting': date_field(required=True, message='Invalid date format. Use YYYY-MM-DD.'),
+    'new_week_starting': date_field(required=True, message='Invalid date format. Use YYYY-MM-DD.'),
+    'version': int_field(message='version must be an integer.'),
+})
+
+# Query strings of the timesheet lookups
+TIMESHEET_WEEK = compile_schema({
+    'week_starting': date_field(required=True),
+})
+
+TIMESHEET_KEY = compile_schema({
+    'employee_name': str_field(required=True),
+    'week_starting': date_field(required=True),
+})
+
+TEAM_WEEK = compile_schema({
+    'week_starting': date_field(required=True),
+    'depth': int_field(),
+})
+
+EMPLOYEE_CREATE = compile_schema({
+    'employee_name': str_field(required=True, strip=True),
+    'email': email_field(required=True),
+    'reports_to': any_field(),
+    'manager_name': str_field(strip=True),
+})
+
+EMPLOYEE_UPDATE = compile_schema({
+    'employee_name': str_field(required=True, strip=True),
+    'email': email_field(required=True),
+    'reports_to_email': str_field(strip=True),
+    'manager_name': str_field(strip=True),
+})
+
+LOG_CHANGE_CREATE = compile_schema({
+    'daily_log_id': int_field(required=True),
+    'new_description': str_field(required=True, strip=True, max_length=1000),
+})
+
+LOG_CHANGE_UPDATE = compile_schema({
+    'new_description': str_field(strip=True, max_length=1000),
+})
+
+PAYROLL_CLOSE = compile_schema({
+    'start_date': date_field(required=True),
+    'end_date': date_field(required=True),
+})
+
+HOURS_REPORT = compile_schema({
+    'start': date_field(required=True),
+    'end': date_field(required=True),
+    'employee_id': int_field(),
+    'manager_id': int_field(),
+})
+
+# One row of an org dump for POST /api/employees/bulk
+EMPLOYEE_IMPORT = compile_schema({
+    'employee_name': str_field(required=True, strip=True),
+    'email': email_field(required=True),
+    'manager_email': email_field(message='Invalid manager_email format'),
+})
@@ -1,10 +1,283 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from config.config import SQLALCHEMY_DATABASE_URI
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config.config import (
+    SQLALCHEMY_DATABASE_URI,
+    WEB_CONCURRENCY,
+    DB_CONNECTION_BUDGET,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    TENANT_MODE,
+    TENANT_MAX_ENGINES,
+)
+from utils import metrics, tenancy
+
+# The engine (and SQLAlchemy itself) is loaded on first use so importing
+# the app never touches the database
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+_database_uri = SQLALCHEMY_DATABASE_URI
+
+# tenant -> (bind, gauge source), least recently used first
+_tenant_binds = OrderedDict()
+_tenant_lock = threading.Lock()
+
+# Set while a batch of handlers runs against one shared session
+_shared_session = ContextVar('shared_session', default=None)
+
+
+def configure(database_uri):
+    """Point the lazily created engine at another database (e.g. from create_app)."""
+    global _database_uri, _engine
+    with _engine_lock:
+        if database_uri == _database_uri:
+            return
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        _database_uri = database_uri
+
+
+def pool_options(database_uri, workers=None, budget=None):
+    """Pool arguments for one worker process.
+
+    With DB_CONNECTION_BUDGET set, the budget is split evenly across
+    WEB_CONCURRENCY workers and overflow is disabled, so the server as a
+    whole never opens more connections than the database allows.
+    """
+    if database_uri.startswith('sqlite'):
+        return {}
+    options = {'pool_pre_ping': True, 'pool_timeout': DB_POOL_TIMEOUT, 'pool_recycle': DB_POOL_RECYCLE}
+    workers = workers or WEB_CONCURRENCY
+    budget = DB_CONNECTION_BUDGET if budget is None else budget
+    if budget:
+        options['pool_size'] = max(1, budget // max(1, workers))
+        options['max_overflow'] = 0
+    return options
+
+
+def _install_pid_guard(engine):
+    """Refuse to hand out a pooled connection that was opened by another process.
+
+    Belt and braces for after_fork: if a connection from the parent slips
+    through, the pool discards it and opens a fresh one instead of sharing
+    the parent's socket.
+    """
+    from sqlalchemy import event, exc
+
+    @event.listens_for(engine, 'connect')
+    def _record_pid(dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+
+    @event.listens_for(engine, 'checkout')
+    def _check_pid(dbapi_connection, connection_record, connection_proxy):
+        pid = os.getpid()
+        if connection_record.info['pid'] != pid:
+            connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+            raise exc.DisconnectionError(
+                f"Connection record belongs to pid {connection_record.info['pid']}, "
+                f"attempting to check out in pid {pid}"
+            )
+
+
+def get_engine():
+    """Return the process-wide engine, creating it on first call."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+                from sqlalchemy.orm import sessionmaker
+                from utils.slow_query import install_slow_query_log
+
+                # Handlers load lazily and each imports only its own models; the
+                # mappers reference each other by name, so all must be registered
+                import models.employee
+                import models.timesheet
+                import models.dailylogs
+                import models.dailylogschanges
+                import models.employee_closure
+                import models.change_log
+                import models.log_finding
+                import models.payroll
+
+                engine = create_engine(_database_uri, **pool_options(_database_uri))
+                _install_pid_guard(engine)
+                metrics.add_gauge_source(metrics.pool_gauges(engine))
+                install_slow_query_log(engine)
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                _engine = engine
+    return _engine
+
+
+def _new_tenant_bind(tenant):
+    from sqlalchemy import create_engine
+    from utils.slow_query import install_slow_query_log
+
+    if TENANT_MODE == 'schema':
+        # Shares the main pool; table names are rewritten to the tenant's schema
+        return get_engine().execution_options(schema_translate_map={None: tenancy.tenant_schema(tenant)})
+    uri = tenancy.tenant_database_url(tenant)
+    budget = DB_CONNECTION_BUDGET // TENANT_MAX_ENGINES if DB_CONNECTION_BUDGET else None
+    engine = create_engine(uri, **pool_options(uri, budget=budget))
+    _install_pid_guard(engine)
+    install_slow_query_log(engine)
+    return engine
+
+
+def tenant_bind(tenant):
+    """Engine for a tenant, created on first use.
+
+    At most TENANT_MAX_ENGINES are kept; the least recently used one is
+    evicted and, in database mode, its pool disposed, so hundreds of
+    tenants never hold hundreds of pools open.
+    """
+    with _tenant_lock:
+        entry = _tenant_binds.get(tenant)
+        if entry is not None:
+            _tenant_binds.move_to_end(tenant)
+            return entry[0]
+
+        bind = _new_tenant_bind(tenant)
+        source = None
+        if TENANT_MODE == 'database':
+            source = metrics.pool_gauges(bind, tenant=tenant)
+            metrics.add_gauge_source(source)
+        _tenant_binds[tenant] = (bind, source)
+        metrics.inc('tms_tenant_engines_created_total')
+
+        while len(_tenant_binds) > TENANT_MAX_ENGINES:
+            _, (old_bind, old_source) = _tenant_binds.popitem(last=False)
+            if old_source is not None:
+                metrics.remove_gauge_source(old_source)
+                old_bind.dispose()
+            metrics.inc('tms_tenant_engines_evicted_total')
+        return bind
+
+
+def _current_bind():
+    tenant = tenancy.current_tenant()
+    if tenant is None:
+        if tenancy.enabled():
+            raise RuntimeError('No tenant set for this request or job.')
+        return get_engine()
+    return tenant_bind(tenant)
+
+
+def after_fork():
+    """Drop the pooled connections inherited from the parent process.
+
+    close=False leaves the parent's sockets alone (closing them here would
+    send a terminate message on a connection the parent still uses); the
+    child simply forgets them and opens its own on first checkout.
+    """
+    global _engine_lock, _tenant_lock
+    _engine_lock = threading.Lock()
+    _tenant_lock = threading.Lock()
+    if _engine is not None:
+        _engine.dispose(close=False)
+    for bind, source in _tenant_binds.values():
+        if source is not None:
+            bind.dispose(close=False)
+
+
+def dispose_engine():
+    """Close every pooled connection of this process (e.g. on worker exit)."""
+    if _engine is not None:
+        _engine.dispose()
+    for bind, source in _tenant_binds.values():
+        if source is not None:
+            bind.dispose()
+
+
+# Covers gunicorn --preload, multiprocessing and plain os.fork alike
+os.register_at_fork(after_in_child=after_fork)
+
+
+def SessionLocal():
+    """New session bound to the current tenant's engine (or the only engine)."""
+    get_engine()
+    return _session_factory(bind=_current_bind())
+
+
+class SharedSession:
+    """Session wrapper handed to handlers that run inside a shared transaction.
+
+    Handlers keep calling commit/rollback/close as usual; commit only flushes
+    so later handlers see the rows, and the owner of the transaction decides
+    whether to really commit at the end.
+    """
+
+    def __init__(self, session):
+        self._session = session
+        self._step = None
+        self.failed = False
+
+    def begin_step(self):
+        """Run the next handler under a savepoint that end_step can undo on its own."""
+        self._step = self._session.begin_nested()
+
+    def end_step(self, keep):
+        """Release the step's savepoint, or roll back just that step's writes."""
+        step, self._step = self._step, None
+        if step is None or not step.is_active:
+            return
+        if keep:
+            step.commit()
+        else:
+            step.rollback()
+
+    def commit(self):
+        self._session.flush()
+
+    def rollback(self):
+        if self._step is not None:
+            # Inside a step only its savepoint is undone; the batch goes on
+            self.end_step(keep=False)
+            return
+        self.failed = True
+        self._session.rollback()
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URI)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_session():
     """Utility function to get a new SQLAlchemy session."""
-    return SessionLocal()
\ No newline at end of file
+    shared = _shared_session.get()
+    if shared is not None:
+        return shared
+    metrics.inc('tms_db_sessions_opened_total')
+    return SessionLocal()
+
+
+@contextmanager
+def shared_session():
+    """Run every get_session() call in this block against one transaction.
+
+    Commits when the block exits normally unless a handler rolled back,
+    rolls back on error.
+    """
+    metrics.inc('tms_db_sessions_opened_total')
+    session = SessionLocal()
+    shared = SharedSession(session)
+    token = _shared_session.set(shared)
+    try:
+        yield shared
+        if shared.failed:
+            session.rollback()
+        else:
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        _shared_session.reset(token)
+        session.close()
+        metrics.inc('tms_db_sessions_closed_total')
@@ -0,0 +1,152 @@
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from flask import has_request_context, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+from config.config import SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN, SLOW_QUERY_MAX_ENTRIES
+
+logger = logging.getLogger('tms.slow_query')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|\?|:\w+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ('select', 'insert', 'update', 'delete', 'with')
+
+_lock = threading.Lock()
+_entries = {}
+_explain_queue = queue.Queue(maxsize=100)
+# engine.url -> unpooled engine for EXPLAIN; one per database, so tenant engines explain against their own
+_side = {'engines': {}, 'pid': None}
+
+
+def normalize_sql(statement):
+    """Collapse literals, placeholders and IN lists so similar queries group together."""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _POSTCOMPILE.sub('(?)', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _shape(value):
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, str):
+        return f"str({len(value)})"
+    return type(value).__name__
+
+
+def param_shapes(parameters, executemany):
+    """Types (and sizes) of bind parameters, never their values."""
+    if executemany and parameters:
+        return {'rows': len(parameters), 'row': param_shapes(parameters[0], False)}
+    if isinstance(parameters, dict):
+        return {key: _shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_shape(value) for value in parameters]
+    return None
+
+
+def _explain_worker():
+    while True:
+        key, statement, parameters, url = _explain_queue.get()
+        try:
+            with _side['engines'][url].connect() as conn:
+                conn.info['slow_query_side'] = True
+                rows = conn.exec_driver_sql("EXPLAIN (ANALYZE off) " + statement, parameters or {}).fetchall()
+                plan = '\n'.join(row[0] for row in rows)
+        except Exception as e:
+            plan = f'EXPLAIN failed: {e}'
+        with _lock:
+            if key in _entries:
+                _entries[key]['plan'] = plan
+
+
+def _queue_explain(key, statement, parameters, url):
+    if url not in _side['engines'] or not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return
+    if _side['pid'] != os.getpid():
+        # Threads do not survive fork; start one per worker process
+        _side['pid'] = os.getpid()
+        threading.Thread(target=_explain_worker, name='slow-query-explain', daemon=True).start()
+    try:
+        _explain_queue.put_nowait((key, statement, parameters, url))
+    except queue.Full:
+        pass
+
+
+def record(statement, parameters, duration_ms, executemany, url=None):
+    key = normalize_sql(statement)
+    route = request.url_rule.rule if has_request_context() and request.url_rule else None
+    shapes = param_shapes(parameters, executemany)
+    needs_plan = False
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            if len(_entries) >= SLOW_QUERY_MAX_ENTRIES:
+                # Forget the entry that cost the least overall
+                del _entries[min(_entries, key=lambda k: _entries[k]['total_ms'])]
+            entry = _entries[key] = {
+                'sql': key, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'routes': {}, 'param_shapes': shapes, 'plan': None, 'last_seen': None
+            }
+            needs_plan = SLOW_QUERY_EXPLAIN and not executemany
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['max_ms'] = max(entry['max_ms'], duration_ms)
+        entry['param_shapes'] = shapes
+        entry['last_seen'] = time.time()
+        if route:
+            entry['routes'][route] = entry['routes'].get(route, 0) + 1
+
+    logger.warning("slow query %.1fms route=%s params=%s sql=%s", duration_ms, route, shapes, key)
+    if needs_plan:
+        _queue_explain(key, statement, parameters, url)
+
+
+def top_queries(n=20, sort='total_ms'):
+    """Top-N normalized statements by total time (or max_ms / count)."""
+    with _lock:
+        entries = [dict(e, routes=dict(e['routes'])) for e in _entries.values()]
+    for e in entries:
+        e['mean_ms'] = round(e['total_ms'] / e['count'], 3)
+        e['total_ms'] = round(e['total_ms'], 3)
+        e['max_ms'] = round(e['max_ms'], 3)
+    return sorted(entries, key=lambda e: e[sort], reverse=True)[:n]
+
+
+def reset():
+    with _lock:
+        _entries.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_slow_query_start', None)
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms >= SLOW_QUERY_MS and not conn.info.get('slow_query_side'):
+        record(statement, parameters, duration_ms, executemany, conn.engine.url)
+
+
+def install_slow_query_log(engine):
+    """Time every statement on engine and record those over SLOW_QUERY_MS."""
+    if SLOW_QUERY_MS <= 0:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    if SLOW_QUERY_EXPLAIN and engine.dialect.name == 'postgresql' and engine.url not in _side['engines']:
+        # Plans come from a separate, unpooled connection so the request's pool is untouched
+        _side['engines'][engine.url] = create_engine(engine.url, poolclass=NullPool)
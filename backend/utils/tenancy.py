@@ -0,0 +1,94 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request, g, jsonify
+from config.config import TENANT_MODE, TENANT_HEADER, TENANT_BASE_DOMAIN, TENANT_SCHEMA_PREFIX, TENANT_DATABASE_URL
+from utils import metrics
+
+_TENANT_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_]{0,39}$')
+
+# Tenant of the request (or job) being handled; None when tenancy is off
+_current_tenant = ContextVar('current_tenant', default=None)
+
+
+def enabled():
+    return TENANT_MODE != 'off'
+
+
+def current_tenant():
+    return _current_tenant.get()
+
+
+def valid_tenant(name):
+    return bool(name) and bool(_TENANT_PATTERN.match(name))
+
+
+def tenant_schema(tenant):
+    return f"{TENANT_SCHEMA_PREFIX}{tenant}"
+
+
+def tenant_database_url(tenant):
+    return TENANT_DATABASE_URL.format(tenant=tenant)
+
+
+@contextmanager
+def tenant_context(tenant):
+    """Route get_session() calls in this block to tenant (for scripts and workers)."""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def resolve_tenant():
+    """Tenant named by the tenant header, else by the request's subdomain."""
+    tenant = request.headers.get(TENANT_HEADER)
+    if not tenant and TENANT_BASE_DOMAIN:
+        host = request.host.split(':', 1)[0].lower()
+        suffix = '.' + TENANT_BASE_DOMAIN.lower()
+        if host.endswith(suffix):
+            tenant = host[:-len(suffix)]
+    return tenant.strip().lower() if tenant else None
+
+
+def _before_request():
+    # /metrics is scraped per process, not per tenant
+    if request.path == '/metrics' or request.method == 'OPTIONS':
+        return None
+    tenant = resolve_tenant()
+    if not valid_tenant(tenant):
+        return jsonify({'error': f'A valid tenant is required ({TENANT_HEADER} header or subdomain).'}), 400
+    g._tenant_token = _current_tenant.set(tenant)
+    g._tenant_start = time.perf_counter()
+    return None
+
+
+def _after_request(response):
+    tenant = current_tenant()
+    start = g.pop('_tenant_start', None)
+    if tenant and start is not None:
+        metrics.inc('tms_tenant_requests_total', tenant=tenant, status=str(response.status_code))
+        metrics.observe('tms_tenant_request_duration_seconds', time.perf_counter() - start,
+                        metrics.LATENCY_BUCKETS, tenant=tenant)
+    return response
+
+
+def _teardown(exc):
+    token = g.pop('_tenant_token', None)
+    if token is not None:
+        _current_tenant.reset(token)
+
+
+def init_tenancy(app):
+    """Resolve the tenant of every request when TENANT_MODE is schema or database."""
+    if not enabled():
+        return
+    if TENANT_MODE not in ('schema', 'database'):
+        raise RuntimeError(f'Unknown TENANT_MODE "{TENANT_MODE}".')
+    if TENANT_MODE == 'database' and not TENANT_DATABASE_URL:
+        raise RuntimeError('TENANT_MODE=database needs TENANT_DATABASE_URL.')
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown)
@@ -1,5 +1,5 @@
 "use client";
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useMemo, useRef } from "react";
 import {
   Card,
   CardHeader,
@@ -58,6 +58,34 @@ function normalizeTime(timeStr) {
   return timeStr.split(":").slice(0, 2).join(":");
 }
 
+// Daily log from the API as an editable row
+function toEditedLog(log) {
+  return {
+    id: log.id,
+    time_in_am: normalizeTime(log.morning_in) || "",
+    time_out_am: normalizeTime(log.morning_out) || "",
+    time_in_pm: normalizeTime(log.afternoon_in) || "",
+    time_out_pm: normalizeTime(log.afternoon_out) || "",
+    description: log.description || "",
+    total_hours: log.total_hours || "0:00",
+    date: toMMDDYYYY(log.log_date),
+  };
+}
+
+// Empty editable row for a day without a log
+function emptyLog(dateKey) {
+  return {
+    id: `temp-${Date.now()}-${dateKey}`,
+    time_in_am: "",
+    time_out_am: "",
+    time_in_pm: "",
+    time_out_pm: "",
+    description: "",
+    total_hours: "0:00",
+    date: dateKey,
+  };
+}
+
 // Get the next Monday's date in YYYY-MM-DD format
 function getNextMonday() {
   const today = new Date();
@@ -103,6 +131,9 @@ export default function Home() {
   const [selectedLogId, setSelectedLogId] = useState(null);
   const [logChanges, setLogChanges] = useState([]);
   const [timesheetId, setTimesheetId] = useState(null);
+  // Latest logs for the live-update listener, which outlives renders
+  const dailyLogsRef = useRef([]);
+  dailyLogsRef.current = dailyLogs;
 
   // Memoize week dates
   const weekDates = useMemo(() => {
@@ -362,6 +393,8 @@ export default function Home() {
         afternoon_out: normalizeTime(log.time_out_pm) || null,
         description: log.description || "",
         total_hours: log.total_hours,
+        // Row version we last read; the server answers 409 if someone saved in between
+        version: (existingLog || log).version,
       };
 
       let res;
@@ -386,51 +419,8 @@ export default function Home() {
 
       toast.success("Log saved successfully!");
 
-      // Refetch logs
-      const logsUrl = `${BASE_URL}/api/daily-logs?timesheet_id=${timesheetId}`;
-      const logsRes = await fetch(logsUrl, {
-        method: "GET",
-        headers: { "Content-Type": "application/json" },
-        cache: "no-store",
-      });
-      let logsData = [];
-      if (logsRes.ok) {
-        logsData = await logsRes.json();
-      }
-      setDailyLogs(logsData);
-
-      const logsMap = {};
-      logsData.forEach((log) => {
-        const dateKey = toMMDDYYYY(log.log_date);
-        if (dateKey) {
-          logsMap[dateKey] = {
-            id: log.id,
-            time_in_am: normalizeTime(log.morning_in) || "",
-            time_out_am: normalizeTime(log.morning_out) || "",
-            time_in_pm: normalizeTime(log.afternoon_in) || "",
-            time_out_pm: normalizeTime(log.afternoon_out) || "",
-            description: log.description || "",
-            total_hours: log.total_hours || "0:00",
-            date: dateKey,
-          };
-        }
-      });
-      weekDates.forEach((day) => {
-        const dateKey = toMMDDYYYY(day.date);
-        if (!logsMap[dateKey]) {
-          logsMap[dateKey] = {
-            id: `temp-${Date.now()}-${dateKey}`,
-            time_in_am: "",
-            time_out_am: "",
-            time_in_pm: "",
-            time_out_pm: "",
-            description: "",
-            total_hours: "0:00",
-            date: dateKey,
-          };
-        }
-      });
-      setEditedLogs(logsMap);
+      // The response is the saved row; no need to reload the week
+      mergeLog(await res.json());
     } catch (error) {
       toast.error(`Error saving log: ${error.message}`);
     } finally {
@@ -438,6 +428,51 @@ export default function Home() {
     }
   };
 
+  // Put a log from the API into both the saved and the editable rows
+  const mergeLog = (log) => {
+    setDailyLogs((prev) => [...prev.filter((l) => l.id !== log.id), log]);
+    setEditedLogs((prev) => ({ ...prev, [toMMDDYYYY(log.log_date)]: toEditedLog(log) }));
+  };
+
+  const removeLog = (logId) => {
+    const removed = dailyLogsRef.current.find((l) => l.id === logId);
+    if (!removed) return;
+    const dateKey = toMMDDYYYY(removed.log_date);
+    setDailyLogs((prev) => prev.filter((l) => l.id !== logId));
+    setEditedLogs((prev) => ({ ...prev, [dateKey]: emptyLog(dateKey) }));
+  };
+
+  // Live updates: logs saved elsewhere (another tab, a manager) show up without polling
+  useEffect(() => {
+    if (!employee?.id || !timesheetId) return;
+    const source = new EventSource(`${BASE_URL}/api/events?employee_id=${employee.id}`);
+
+    const reloadLog = async (logId) => {
+      const res = await fetch(`${BASE_URL}/api/daily-logs/${logId}`, { cache: "no-store" });
+      if (res.ok) mergeLog(await res.json());
+    };
+
+    source.addEventListener("daily_log", (e) => {
+      const change = JSON.parse(e.data);
+      if (change.timesheet_id !== timesheetId) return;
+      if (change.action === "deleted") {
+        removeLog(change.id);
+        return;
+      }
+      // Our own saves arrive here too; skip versions we already have
+      const known = dailyLogsRef.current.find((l) => l.id === change.id);
+      if (!known || known.version !== change.version) reloadLog(change.id);
+    });
+
+    source.addEventListener("resync", () => {
+      // Events were missed; reload every log of the week
+      dailyLogsRef.current.forEach((l) => reloadLog(l.id));
+    });
+
+    // If the feed is disabled (503) the browser gives up on its own; saving still works
+    return () => source.close();
+  }, [employee?.id, timesheetId]);
+
   // Fetch log changes
   const fetchLogChanges = async (logId) => {
     try {